@@ -1,7 +1,8 @@
+import json
 import os
 from dataclasses import dataclass
 from pathlib import Path
-from typing import Literal, Optional
+from typing import Any, Dict, Literal, Optional
 
 
 Mode = Literal["dev", "prod"]
@@ -29,10 +30,40 @@ class AppConfig:
     enable_autopatcher: bool
     elevenlabs_api_key: Optional[str] = None
     elevenlabs_voice_id: Optional[str] = None
-    stt_engine: str = "google"  # "google" или "whisper"
+    stt_engine: str = "google"  # "google", "whisper" или "race" (оба параллельно, первый уверенный ответ)
+    whisper_input_mode: str = "array"  # "array" (из памяти) или "file" (через временный WAV)
+    stt_streaming: bool = False  # Промежуточные гипотезы по растущему окну (для бэкендов с supports_streaming)
+    stt_stream_interval_ms: int = 300  # Как часто переоценивать окно в потоковом режиме
+    stt_reuse_partial: bool = False  # Финал — последняя жадная гипотеза без повторного beam search (быстрее, менее точно)
+    google_deadline_s: float = 5.0  # Срок на распознавание фразы через Google
+    google_hedge: bool = True  # Дублирующий запрос к Google, если ответ дольше p95
+    stt_workers: int = 0  # Процессы-воркеры Whisper (0 — распознавание в потоке диалога)
+    whisper_model: str = "base"  # Модель Whisper для распознавания (в каскаде — точная модель)
+    whisper_compute_type: str = "int8"  # int8, int8_float32, int16, float32 (подбирается --tune-stt)
+    whisper_beam_size: int = 5  # Ширина beam search финального распознавания
+    whisper_cpu_threads: int = 0  # Потоки CTranslate2 (0 — по умолчанию библиотеки)
+    whisper_num_workers: int = 1  # Параллельные декодирования одной модели
+    stt_tuned: bool = False  # Параметры Whisper загружены из jarvis/data/stt_tuning.json
+    stt_cascade: bool = False  # Каскад: сначала быстрая модель, точная — только при низкой уверенности
+    whisper_fast_model: str = "tiny"  # Быстрая модель каскада (жадный поиск)
+    whisper_commands: bool = False  # Whisper сначала оценивает закрытый набор команд, открытое распознавание — запасной путь
+    offline_models: bool = False  # Whisper и SentenceTransformer только из jarvis/data/models, без сети (JARVIS_OFFLINE_MODELS=1)
+    vosk_model_path: str = ""  # Каталог модели Vosk: потоковое распознавание команд перед основным движком
+    vosk_grammar: bool = True  # Vosk ограничен фразами команд и wake word (остальное — основному движку)
+    wake_spotter: bool = False  # Детектор wake word по аудио: STT только после «джарвис» (шаблоны в jarvis/data/wake_word)
+    wake_threshold: float = 0.0  # Порог DTW-расстояния детектора (0 — подбирается по шаблонам)
+    audio_source: str = "mic"  # mic, mic:N, wav:PATH, wavdir:DIR, stdin, synthetic (см. make_audio_source)
+    capture_process: bool = False  # Захват аудио в отдельном процессе (разделяемая память)
+    noise_suppression: bool = False  # Спектральный гейт шума перед STT
+    idle_after_s: float = 60.0  # Через сколько секунд тишины слушатель уходит в режим простоя (0 — никогда)
     github_repo_owner: str = "yourusername"  # Владелец репозитория на GitHub
     github_repo_name: str = "jarvis-voice-assistant"  # Название репозитория
 
+    @property
+    def models_dir(self) -> Path:
+        """Локальное хранилище моделей (manifest.json и каталоги моделей)"""
+        return self.data_dir / "models"
+
     @staticmethod
     def _detect_root_dir() -> Path:
         # Корень проекта находится на два уровня выше этого файла (jarvis/app/)
@@ -76,6 +107,18 @@ class AppConfig:
         except FileNotFoundError:
             return None
 
+    @staticmethod
+    def _read_stt_tuning(data_dir: Path) -> Dict[str, Any]:
+        """Конфигурация Whisper, подобранная --tune-stt (переменные окружения важнее)"""
+        try:
+            tuning = json.loads((data_dir / "stt_tuning.json").read_text(encoding="utf-8"))
+        except (FileNotFoundError, ValueError):
+            return {}
+        if tuning.get("host", {}).get("cpu_count") != os.cpu_count():
+            # Потоки подбирались под другое железо — настройка недействительна, нужен новый --tune-stt
+            return {}
+        return tuning.get("config", {})
+
     @classmethod
     def load(cls) -> "AppConfig":
         root_dir = cls._detect_root_dir()
@@ -92,6 +135,7 @@ class AppConfig:
         profile = os.getenv("JARVIS_PROFILE", "0") in ("1", "true", "True")
         neuro_enabled = os.getenv("JARVIS_NEURO", "0") in ("1", "true", "True")
         interactive_mode = os.getenv("JARVIS_INTERACTIVE", "1") in ("1", "true", "True")
+        tuning = cls._read_stt_tuning(data_dir)
 
         return cls(
             root_dir=root_dir,
@@ -114,6 +158,31 @@ class AppConfig:
             elevenlabs_api_key=cls._read_api_key(data_dir),
             elevenlabs_voice_id=cls._read_voice_id(data_dir),
             stt_engine=os.getenv("STT_ENGINE", "google").strip().lower(),
+            whisper_input_mode=os.getenv("JARVIS_WHISPER_INPUT", "array").strip().lower(),
+            stt_streaming=os.getenv("JARVIS_STT_STREAMING", "0") in ("1", "true", "True"),
+            stt_stream_interval_ms=int(os.getenv("JARVIS_STT_STREAM_INTERVAL_MS", "300")),
+            stt_reuse_partial=os.getenv("JARVIS_STT_REUSE_PARTIAL", "0") in ("1", "true", "True"),
+            google_deadline_s=float(os.getenv("JARVIS_GOOGLE_DEADLINE_S", "5.0")),
+            google_hedge=os.getenv("JARVIS_GOOGLE_HEDGE", "1") in ("1", "true", "True"),
+            stt_workers=int(os.getenv("JARVIS_STT_WORKERS", "0")),
+            whisper_model=os.getenv("JARVIS_WHISPER_MODEL", str(tuning.get("model_size", "base"))).strip(),
+            whisper_compute_type=os.getenv("JARVIS_WHISPER_COMPUTE_TYPE", str(tuning.get("compute_type", "int8"))).strip(),
+            whisper_beam_size=int(os.getenv("JARVIS_WHISPER_BEAM_SIZE", str(tuning.get("beam_size", 5)))),
+            whisper_cpu_threads=int(os.getenv("JARVIS_WHISPER_CPU_THREADS", str(tuning.get("cpu_threads", 0)))),
+            whisper_num_workers=int(os.getenv("JARVIS_WHISPER_NUM_WORKERS", str(tuning.get("num_workers", 1)))),
+            stt_tuned=bool(tuning),
+            stt_cascade=os.getenv("JARVIS_STT_CASCADE", "0") in ("1", "true", "True"),
+            whisper_fast_model=os.getenv("JARVIS_WHISPER_FAST_MODEL", "tiny").strip(),
+            whisper_commands=os.getenv("JARVIS_WHISPER_COMMANDS", "0") in ("1", "true", "True"),
+            offline_models=os.getenv("JARVIS_OFFLINE_MODELS", "0") in ("1", "true", "True"),
+            vosk_model_path=os.getenv("JARVIS_VOSK_MODEL", "").strip(),
+            vosk_grammar=os.getenv("JARVIS_VOSK_GRAMMAR", "1") in ("1", "true", "True"),
+            wake_spotter=os.getenv("JARVIS_WAKE_SPOTTER", "0") in ("1", "true", "True"),
+            wake_threshold=float(os.getenv("JARVIS_WAKE_THRESHOLD", "0")),
+            audio_source=os.getenv("JARVIS_AUDIO_SOURCE", "mic").strip(),
+            capture_process=os.getenv("JARVIS_CAPTURE_PROCESS", "0") in ("1", "true", "True"),
+            noise_suppression=os.getenv("JARVIS_NOISE_SUPPRESSION", "0") in ("1", "true", "True"),
+            idle_after_s=float(os.getenv("JARVIS_IDLE_AFTER_S", "60")),
             github_repo_owner=os.getenv("GITHUB_REPO_OWNER", "yourusername").strip(),
             github_repo_name=os.getenv("GITHUB_REPO_NAME", "jarvis-voice-assistant").strip(),
         )
@@ -47,11 +47,171 @@ def _print_health() -> int:
     return 0
 
 
+def _transcribe_directory(config: AppConfig, logger, directory: Path, output: str | None, workers: int) -> int:
+    # Команда --transcribe: пакетное распознавание каталога WAV через Whisper
+    import os
+    from jarvis.core.batch_stt import BatchTranscriber, default_workers
+    from jarvis.core.speech_to_text import FASTER_WHISPER_AVAILABLE, WhisperSTTBackend
+
+    if not directory.is_dir():
+        print(f"ОШИБКА: Каталог не найден: {directory}")  # noqa: T201
+        return 1
+    if not FASTER_WHISPER_AVAILABLE:
+        print("ОШИБКА: faster-whisper не установлен. Установите: pip install faster-whisper")  # noqa: T201
+        return 1
+    workers = workers or default_workers()
+    transcriber = BatchTranscriber(
+        WhisperSTTBackend,
+        dict(
+            model_size=config.whisper_model,
+            device="cpu",
+            compute_type=config.whisper_compute_type,
+            language="ru",
+            beam_size=config.whisper_beam_size,
+            model_root=str(config.models_dir) if config.offline_models else "",
+            # Ядра делятся между процессами, чтобы потоки CTranslate2 не конкурировали
+            cpu_threads=max(1, (os.cpu_count() or 1) // workers),
+        ),
+        workers=workers,
+    )
+    out_path = Path(output) if output else directory / "transcripts.jsonl"
+    try:
+        summary = transcriber.transcribe_directory(directory, out_path)
+    except Exception as e:
+        logger.error(f"Ошибка пакетного распознавания: {e}", exc_info=True)
+        return 1
+    print(  # noqa: T201
+        f"Распознано файлов: {summary['files']} (пропущено: {summary['skipped']}, ошибок: {summary['failed']}), "
+        f"аудио: {summary['audio_s']} с за {summary['wall_s']} с "
+        f"(x{summary.get('realtime_factor', 0.0)} от реального времени) -> {out_path}"
+    )
+    return 0 if summary["failed"] == 0 else 1
+
+
+def _tune_stt(config: AppConfig, logger, directory: Path, floor: float) -> int:
+    # Команда --tune-stt: подбор модели, типа вычислений, потоков и beam для Whisper на этой машине
+    from jarvis.core.speech_to_text import FASTER_WHISPER_AVAILABLE, WhisperSTTBackend
+    from jarvis.core.stt_tuner import STTTuner
+
+    if not directory.is_dir():
+        print(f"ОШИБКА: Каталог с WAV для настройки не найден: {directory}")  # noqa: T201
+        return 1
+    if not FASTER_WHISPER_AVAILABLE:
+        print("ОШИБКА: faster-whisper не установлен. Установите: pip install faster-whisper")  # noqa: T201
+        return 1
+    tuner = STTTuner(
+        WhisperSTTBackend,
+        floor=floor,
+        model_root=str(config.models_dir) if config.offline_models else "",
+    )
+    try:
+        best = tuner.tune(directory)
+    except Exception as e:
+        logger.error(f"Ошибка настройки STT: {e}", exc_info=True)
+        return 1
+    for result in sorted(tuner.results, key=lambda r: (r.error is not None, r.avg_ms)):
+        status = result.error or f"точность {result.accuracy:.3f}, {result.avg_ms:.0f} мс/фраза, x{result.realtime_factor}"
+        print(f"  {result.candidate.label:<32} {status}")  # noqa: T201
+    if best is None:
+        print(f"Ни одна конфигурация не достигла точности {floor:.2f}, настройка не сохранена")  # noqa: T201
+        return 1
+    path = tuner.save(best, config.data_dir)
+    print(f"Лучшая конфигурация: {best.candidate.label} ({best.avg_ms:.0f} мс/фраза) -> {path}")  # noqa: T201
+    return 0
+
+
+def _import_model(config: AppConfig, logger, archive: Path, name: str | None, revision: str) -> int:
+    # Команда --import-model: установка модели из локального архива в jarvis/data/models
+    from jarvis.core.model_store import ModelStore
+
+    if not archive.exists():
+        print(f"ОШИБКА: Архив не найден: {archive}")  # noqa: T201
+        return 1
+    try:
+        entry = ModelStore(config.models_dir).import_archive(archive, name=name, revision=revision)
+    except Exception as e:
+        logger.error(f"Ошибка установки модели: {e}", exc_info=True)
+        return 1
+    print(  # noqa: T201
+        f"Модель {entry.name} ({entry.revision}) установлена: {len(entry.files)} файлов, "
+        f"{entry.size / 1e6:.1f} МБ, sha256 {entry.sha256}"
+    )
+    return 0
+
+
+def _verify_models(config: AppConfig) -> int:
+    # Команда --verify-models: полная перепроверка sha256 всех моделей хранилища
+    from jarvis.core.model_store import ModelStore
+
+    store = ModelStore(config.models_dir)
+    entries = store.entries()
+    if not entries:
+        print(f"Хранилище моделей пусто: {config.models_dir}")  # noqa: T201
+        return 0
+    failed = 0
+    for name, entry in entries.items():
+        ok = store.verify(name, force=True)
+        failed += not ok
+        print(f"{name} ({entry.revision}, {entry.size / 1e6:.1f} МБ): {'OK' if ok else 'ПОВРЕЖДЕНА'}")  # noqa: T201
+    return 1 if failed else 0
+
+
+def _eval_spotter(config: AppConfig, logger, directory: Path) -> int:
+    # Команда --eval-spotter: пропуски и ложные срабатывания детектора wake word на записях
+    from jarvis.core.audio import TARGET_RATE, AudioFrame, read_wav
+    from jarvis.core.batch_stt import find_wavs
+    from jarvis.core.keyword_spotter import WAKE_TEMPLATES_DIR, KeywordSpotter
+
+    def load(subdir: str):
+        return [AudioFrame(read_wav(path, TARGET_RATE), TARGET_RATE, 2, segmented=True) for path in find_wavs(directory / subdir)]
+
+    try:
+        spotter = KeywordSpotter.from_directory(
+            config.data_dir / WAKE_TEMPLATES_DIR,
+            threshold=config.wake_threshold or None,
+        )
+        positives, negatives = load("positive"), load("negative")
+    except Exception as e:
+        logger.error(f"Ошибка подготовки детектора wake word: {e}", exc_info=True)
+        return 1
+    if not positives and not negatives:
+        print(f"ОШИБКА: Нет записей в {directory}/positive и {directory}/negative")  # noqa: T201
+        return 1
+    report = spotter.evaluate(positives, negatives)
+    print(  # noqa: T201
+        f"Детектор wake word (порог {report['threshold']}): пропуски {report['false_reject_rate']:.1%} "
+        f"из {report['positives']}, ложные срабатывания {report['false_accept_rate']:.1%} "
+        f"из {report['negatives']} ({report['false_accepts_per_hour']} в час), "
+        f"CPU {report['avg_cpu_ms']} мс на фразу ({report['cpu_share']:.2%} ядра)"
+    )
+    return 0
+
+
 def main() -> int:
     parser = argparse.ArgumentParser(description="Jarvis голосовой ассистент")
     parser.add_argument("--health", action="store_true", help="Показать статус системы и выйти")
     parser.add_argument("--check-update", action="store_true", help="Проверить обновления и выйти")
     parser.add_argument("--update", action="store_true", help="Обновить до последней версии и выйти")
+    parser.add_argument("--transcribe", metavar="DIR", help="Распознать все WAV-файлы каталога в JSONL и выйти")
+    parser.add_argument("--output", metavar="FILE", help="Файл JSONL для --transcribe (по умолчанию DIR/transcripts.jsonl)")
+    parser.add_argument("--workers", type=int, default=0, help="Процессы Whisper для --transcribe (0 — по числу ядер)")
+    parser.add_argument(
+        "--tune-stt",
+        metavar="DIR",
+        nargs="?",
+        const="",
+        help="Подобрать параметры Whisper на WAV-наборе (по умолчанию jarvis/data/stt_bench) и выйти",
+    )
+    parser.add_argument("--import-model", metavar="ARCHIVE", help="Установить модель из локального архива (.zip/.tar.gz) и выйти")
+    parser.add_argument("--model-name", help="Имя модели для --import-model (например, faster-whisper-base, all-MiniLM-L6-v2)")
+    parser.add_argument("--model-revision", default="local", help="Ревизия модели для манифеста (--import-model)")
+    parser.add_argument("--verify-models", action="store_true", help="Перепроверить sha256 всех моделей хранилища и выйти")
+    parser.add_argument(
+        "--eval-spotter",
+        metavar="DIR",
+        help="Проверить детектор wake word на записях DIR/positive и DIR/negative (*.wav) и выйти",
+    )
+    parser.add_argument("--tune-floor", type=float, default=0.9, help="Минимальная точность (1 - WER) для --tune-stt")
     args = parser.parse_args()
 
     if args.health:
@@ -59,6 +219,18 @@ def main() -> int:
     
     config = AppConfig.load()
     logger = get_logger(config)
+
+    if args.transcribe:
+        return _transcribe_directory(config, logger, Path(args.transcribe), args.output, args.workers)
+    if args.import_model:
+        return _import_model(config, logger, Path(args.import_model), args.model_name, args.model_revision)
+    if args.verify_models:
+        return _verify_models(config)
+    if args.eval_spotter:
+        return _eval_spotter(config, logger, Path(args.eval_spotter))
+    if args.tune_stt is not None:
+        bench_dir = Path(args.tune_stt) if args.tune_stt else config.data_dir / "stt_bench"
+        return _tune_stt(config, logger, bench_dir, args.tune_floor)
     
     # Команды обновления
     if args.check_update or args.update:
@@ -154,6 +326,11 @@ def main() -> int:
             perf_callback=runtime.dump_performance_json if config.profile else None,
             tts_external=runtime.tts,
             stt_external=runtime.stt,
+            listener_external=runtime.listener,
+            stt_executor=runtime.stt_executor,
+            spotter=runtime.spotter,
+            router_external=runtime.router,
+            prewarm=runtime.prewarm,
         )
         # Fail-safe: защищаем главный цикл
         try:
@@ -169,6 +346,11 @@ def main() -> int:
                 perf_callback=runtime.dump_performance_json if config.profile else None,
                 tts_external=runtime.tts,
                 stt_external=runtime.stt,
+                listener_external=runtime.listener,
+                stt_executor=runtime.stt_executor,
+                spotter=runtime.spotter,
+                router_external=runtime.router,
+                prewarm=runtime.prewarm,
             )
             conversation.run()
     except KeyboardInterrupt:
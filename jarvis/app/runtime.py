@@ -2,27 +2,41 @@ from __future__ import annotations
 
 import json
 import os
+import time
 from datetime import datetime, timedelta
 from pathlib import Path
-from typing import Optional
+from typing import List, Optional
 
 from jarvis.app.config import AppConfig
 from jarvis.app.logger import get_logger
 from jarvis.core.command_router import CommandRouter
 from jarvis.core.health import run_healthcheck
+from jarvis.core.jarvis_voice import JarvisVoice
+from jarvis.core.keyword_spotter import WAKE_TEMPLATES_DIR, KeywordSpotter
+from jarvis.core.model_store import SENTENCE_MODEL, ModelStore
 from jarvis.core.performance import PerformanceStats
-from jarvis.core.record import RecordConfig, SpeechListener
-from jarvis.core.speech_to_text import SpeechToText, GoogleSTTBackend, WhisperSTTBackend
+from jarvis.core.record import AudioSource, RecordConfig, SpeechListener, make_audio_source
+from jarvis.core.speech_to_text import (
+    CascadeSTTBackend,
+    GoogleSTTBackend,
+    RacingSTTBackend,
+    SpeechToText,
+    STTBackend,
+    VoskSTTBackend,
+    WhisperSTTBackend,
+)
+from jarvis.core.stt_executor import STTExecutor
 from jarvis.core.text_to_speech import Pyttsx3Backend, TextToSpeech, ElevenLabsBackend
 from jarvis.core.semantic_router import SemanticRouter
-from jarvis.core.context_aware import ContextAware
+from jarvis.core.context_aware import CONTEXT_KEYWORDS, ContextAware
 from jarvis.core.updater import Updater
+from jarvis.core.wake_word import WAKE_WORD, command_after, find_wake_word
 from jarvis.memory.memory import SimpleMemory
 
 
 class JarvisRuntime:
     # Центральный объект, объединяющий подсистемы: конфиг, логи, производительность, здоровье, память, команды
-    def __init__(self, config: Optional[AppConfig] = None) -> None:
+    def __init__(self, config: Optional[AppConfig] = None, audio_source: Optional[AudioSource] = None) -> None:
         self.logger = get_logger(config or AppConfig.load())
         self.logger.info("=" * 60)
         self.logger.info("JarvisRuntime: Инициализация системы...")
@@ -38,11 +52,14 @@ class JarvisRuntime:
         
         self.router = CommandRouter(runtime=self)
         self.logger.debug("JarvisRuntime: CommandRouter инициализирован")
+
+        # Локальное хранилище моделей: загрузка без сети, проверка целостности по манифесту
+        self.model_store = ModelStore(self.config.models_dir)
         
         # Инициализация SemanticRouter для умного понимания команд
         self.logger.info("JarvisRuntime: Инициализация SemanticRouter...")
         try:
-            self.semantic = SemanticRouter()
+            self.semantic = SemanticRouter(model_path=self._sentence_model_path())
             self._setup_semantic_intents()
             self.logger.info("JarvisRuntime: SemanticRouter успешно инициализирован")
         except Exception as e:
@@ -120,33 +137,41 @@ class JarvisRuntime:
             if self.config.stt_engine == "whisper":
                 try:
                     self.logger.info("JarvisRuntime: Использую Whisper STT (локальное распознавание)")
-                    stt_backend = WhisperSTTBackend(
-                        model_size="base",  # Можно настроить через переменные окружения
-                        device="cpu",  # cpu или cuda
-                        compute_type="int8",  # int8 для быстрой работы
-                        language="ru"
-                    )
-                    self.stt = SpeechToText(backend=stt_backend)
+                    self.stt = SpeechToText(backend=self._create_whisper_backend())
                     self.logger.info("JarvisRuntime: Whisper STT успешно инициализирован")
                 except Exception as e:
                     self.logger.error(f"JarvisRuntime: Ошибка инициализации Whisper: {e}", exc_info=True)
                     self.logger.warning("JarvisRuntime: Переключаюсь на Google STT...")
-                    self.stt = SpeechToText(backend=GoogleSTTBackend())
+                    self.stt = SpeechToText(backend=self._create_google_backend())
                     self.logger.info("JarvisRuntime: Google STT инициализирован (fallback)")
+            elif self.config.stt_engine == "race":
+                try:
+                    self.logger.info("JarvisRuntime: Использую гонку Google и Whisper (первый уверенный ответ)")
+                    self.stt = SpeechToText(backend=self._create_racing_backend())
+                    self.logger.info("JarvisRuntime: Гонка STT инициализирована")
+                except Exception as e:
+                    self.logger.error(f"JarvisRuntime: Ошибка инициализации гонки STT: {e}", exc_info=True)
+                    self.logger.warning("JarvisRuntime: Переключаюсь на Google STT...")
+                    self.stt = SpeechToText(backend=self._create_google_backend())
             else:
                 # По умолчанию Google STT
                 self.logger.info("JarvisRuntime: Использую Google STT (онлайн распознавание)")
-                self.stt = SpeechToText(backend=GoogleSTTBackend())
+                self.stt = SpeechToText(backend=self._create_google_backend())
                 self.logger.info("JarvisRuntime: Google STT инициализирован")
         except Exception as e:
             self.logger.error(f"JarvisRuntime: Критическая ошибка инициализации STT: {e}", exc_info=True)
             # Fallback на Google STT
-            self.stt = SpeechToText(backend=GoogleSTTBackend())
+            self.stt = SpeechToText(backend=self._create_google_backend())
             self.logger.warning("JarvisRuntime: Использую Google STT (fallback после ошибки)")
+        self.stt = SpeechToText(backend=self._create_vosk_backend(self.stt.backend))
         
+        self.stt_executor = self._create_stt_executor()
+
         self.logger.info("JarvisRuntime: Инициализация SpeechListener...")
-        self.listener = SpeechListener(config=RecordConfig())
-        self.logger.info("JarvisRuntime: SpeechListener инициализирован")
+        self.audio_source = audio_source
+        self.listener = self._create_listener()
+        self.logger.info(f"JarvisRuntime: SpeechListener инициализирован (источник: {type(self.listener.source).__name__})")
+        self.spotter = self._create_spotter()
         
         self._ensure_dirs()
         self.logger.info("JarvisRuntime: Все директории проверены/созданы")
@@ -156,14 +181,17 @@ class JarvisRuntime:
         
         # Предзагрузка STT — холодный старт распознавания
         try:
-            if isinstance(self.stt.backend, WhisperSTTBackend):
-                # Для Whisper предзагружаем модель
+            if self.stt_executor is not None:
+                # Модель уже загружена в воркерах (_create_stt_executor дождался их) — в основном процессе она не нужна
+                self.logger.debug("JarvisRuntime: Воркеры STT готовы")
+            elif isinstance(self.stt.backend, (WhisperSTTBackend, VoskSTTBackend)):
+                # Для Whisper (и Vosk вместе с основным бэкендом) предзагружаем модель
                 _ = self.stt.backend._get_model()
                 self.logger.debug("JarvisRuntime: Whisper модель предзагружена")
             elif isinstance(self.stt.backend, GoogleSTTBackend):
                 # Для Google просто проверяем recognizer
-                _ = self.stt.backend.recognizer
-                self.logger.debug("JarvisRuntime: Google STT recognizer предзагружен")
+                _ = self.stt.backend.client
+                self.logger.debug("JarvisRuntime: Google STT клиент создан")
         except Exception as e:
             self.logger.warning(f"JarvisRuntime: Ошибка предзагрузки STT: {e}")
         
@@ -179,6 +207,185 @@ class JarvisRuntime:
         self.logger.info("JarvisRuntime: Инициализация завершена успешно")
         self.logger.info("=" * 60)
 
+    def prewarm(self) -> None:
+        """Прогрев после wake word: пока пользователь говорит команду, остывшие подсистемы
+        оживают, и первая команда после простоя выполняется так же быстро, как обычная
+
+        Вызывается из фонового потока Conversation; время каждого шага пишется в perf.
+        """
+        steps = []
+        if self.stt_executor is None:
+            # Модели воркеров пула резидентны в своих процессах — прогревается только локальный бэкенд
+            steps.append(("prewarm_stt_ms", self.stt.backend.warmup))
+        if self.semantic:
+            steps.append(("prewarm_semantic_ms", self.semantic.warmup))
+        if self.context_aware:
+            steps.append(("prewarm_context_ms", self.context_aware.refresh))
+        steps.append(("prewarm_tts_ms", lambda: self.tts.preload(JarvisVoice.likely_responses())))
+        total_start = time.perf_counter()
+        for name, step in steps:
+            start = time.perf_counter()
+            try:
+                step()
+            except Exception as e:
+                self.logger.warning(f"JarvisRuntime: Ошибка прогрева ({name}): {e}")
+            self.perf.record(name, (time.perf_counter() - start) * 1000.0)
+        total_ms = (time.perf_counter() - total_start) * 1000.0
+        self.perf.record("prewarm_ms", total_ms)
+        self.logger.debug(f"JarvisRuntime: Прогрев после wake word за {total_ms:.0f} мс")
+
+    def _sentence_model_path(self) -> Optional[str]:
+        """Каталог модели SemanticRouter из хранилища (None — загрузка по имени, если хранилище отключено)"""
+        if not self.config.offline_models:
+            return None
+        return str(self.model_store.resolve(SENTENCE_MODEL))
+
+    def _create_google_backend(self) -> GoogleSTTBackend:
+        """Google STT со сроком запроса и хеджированием из конфига"""
+        return GoogleSTTBackend(deadline_s=self.config.google_deadline_s, hedge=self.config.google_hedge)
+
+    def _create_whisper_backend(self) -> STTBackend:
+        """Whisper-бэкенд из конфига: одна модель или каскад быстрая -> точная (JARVIS_STT_CASCADE)"""
+        def whisper(model_size: str) -> WhisperSTTBackend:
+            return WhisperSTTBackend(
+                model_size=model_size,
+                device="cpu",  # cpu или cuda
+                compute_type=self.config.whisper_compute_type,  # int8 по умолчанию, --tune-stt подбирает под машину
+                language="ru",
+                input_mode=self.config.whisper_input_mode,
+                beam_size=self.config.whisper_beam_size,
+                cpu_threads=self.config.whisper_cpu_threads,
+                num_workers=self.config.whisper_num_workers,
+                model_root=str(self.config.models_dir) if self.config.offline_models else "",
+                commands=self._command_phrases() if self.config.whisper_commands else [],
+            )
+
+        if self.config.stt_tuned:
+            self.logger.info(
+                f"JarvisRuntime: Параметры Whisper из stt_tuning.json: {self.config.whisper_model}/"
+                f"{self.config.whisper_compute_type}, потоков {self.config.whisper_cpu_threads}, "
+                f"beam {self.config.whisper_beam_size}"
+            )
+        if not self.config.stt_cascade:
+            return whisper(self.config.whisper_model)
+        self.logger.info(
+            f"JarvisRuntime: Каскад Whisper: {self.config.whisper_fast_model} -> {self.config.whisper_model}"
+        )
+        return CascadeSTTBackend(
+            fast=whisper(self.config.whisper_fast_model),
+            accurate=whisper(self.config.whisper_model),
+            route_check=self._routes,
+        )
+
+    def _create_racing_backend(self) -> RacingSTTBackend:
+        """Google и Whisper параллельно (STT_ENGINE=race)"""
+        return RacingSTTBackend(backends={
+            "google": self._create_google_backend(),
+            "whisper": self._create_whisper_backend(),
+        })
+
+    def _create_vosk_backend(self, fallback: STTBackend) -> STTBackend:
+        """Vosk с грамматикой команд перед основным бэкендом (JARVIS_VOSK_MODEL); без модели — основной бэкенд"""
+        if not self.config.vosk_model_path:
+            return fallback
+        try:
+            backend = VoskSTTBackend(
+                model_path=self.config.vosk_model_path,
+                grammar=self._command_phrases() if self.config.vosk_grammar else [],
+                fallback=fallback,
+            )
+        except Exception as e:
+            self.logger.error(f"JarvisRuntime: Vosk недоступен, использую {type(fallback).__name__}: {e}")
+            return fallback
+        self.logger.info(
+            f"JarvisRuntime: Vosk STT перед {type(fallback).__name__} "
+            f"(грамматика команд: {'да' if self.config.vosk_grammar else 'нет'})"
+        )
+        return backend
+
+    def _command_phrases(self) -> List[str]:
+        """Закрытый словарь команд: фразы CommandRouter, контекстные команды, примеры SemanticRouter и wake word"""
+        phrases = [WAKE_WORD] + CommandRouter.phrases()
+        phrases += [keyword for keywords in CONTEXT_KEYWORDS.values() for keyword in keywords]
+        if self.semantic:
+            phrases += [phrase for examples in self.semantic.commands.values() for phrase in examples]
+        return list(dict.fromkeys(phrase.lower().strip() for phrase in phrases if phrase.strip()))
+
+    def _routes(self, text: str) -> bool:
+        """Проходит ли распознанный текст маршрутизацию (для эскалации каскада)"""
+        match = find_wake_word(text)
+        if match is not None:
+            command = command_after(text, match)
+            # Одно ключевое слово — нормальная фраза: команда придёт следующей
+            return command is None or self.router.can_route(command)
+        return self.router.can_route(text)
+
+    def _create_stt_executor(self) -> STTExecutor | None:
+        """Пул процессов Whisper (JARVIS_STT_WORKERS > 0), чтобы распознавание не блокировало диалог"""
+        backend = self.stt.backend
+        if self.config.stt_workers <= 0 or not isinstance(backend, WhisperSTTBackend):
+            return None
+        try:
+            executor = STTExecutor(
+                WhisperSTTBackend,
+                dict(
+                    model_size=backend.model_size,
+                    device=backend.device,
+                    compute_type=backend.compute_type,
+                    language=backend.language,
+                    input_mode=backend.input_mode,
+                    beam_size=backend.beam_size,
+                    cpu_threads=backend.cpu_threads,
+                    num_workers=backend.num_workers,
+                    model_root=backend.model_root,
+                    commands=backend.commands,
+                ),
+                workers=self.config.stt_workers,
+                stats=self.stt.stats,
+            )
+        except Exception as e:
+            self.logger.error(f"JarvisRuntime: Не удалось запустить пул STT, распознаю в потоке диалога: {e}", exc_info=True)
+            return None
+        # Пул без загруженной модели вернул бы None на каждую фразу
+        if not executor.wait_ready():
+            self.logger.error("JarvisRuntime: Воркеры STT не загрузили модель, распознаю в потоке диалога")
+            executor.shutdown()
+            return None
+        return executor
+
+    def _create_spotter(self) -> Optional[KeywordSpotter]:
+        """Детектор wake word по аудио (JARVIS_WAKE_SPOTTER); без шаблонов — выключен"""
+        if not self.config.wake_spotter:
+            return None
+        try:
+            return KeywordSpotter.from_directory(
+                self.config.data_dir / WAKE_TEMPLATES_DIR,
+                threshold=self.config.wake_threshold or None,
+                noise_floor=self.listener.noise_floor,
+            )
+        except Exception as e:
+            self.logger.warning(f"JarvisRuntime: Детектор wake word не запущен, распознаю каждую фразу: {e}")
+            return None
+
+    def _create_listener(self) -> SpeechListener:
+        """Создаёт SpeechListener с переданным источником или источником из конфига (JARVIS_AUDIO_SOURCE)"""
+        source = self.audio_source
+        if source is None:
+            try:
+                source = make_audio_source(self.config.audio_source)
+            except Exception as e:
+                self.logger.warning(f"JarvisRuntime: Неверный источник аудио '{self.config.audio_source}': {e}. Использую микрофон")
+                source = None
+        listener = SpeechListener(config=RecordConfig(
+            source=source,
+            capture_process=self.config.capture_process,
+            noise_suppression=self.config.noise_suppression,
+            idle_after_s=self.config.idle_after_s,
+        ))
+        # Время восстановления микрофона (mic_recover_ms) попадает в общую статистику
+        listener.perf_callback = lambda name, duration_ms: self.perf.record(name, duration_ms)
+        return listener
+
     def _ensure_dirs(self) -> None:
         self.config.logs_dir.mkdir(parents=True, exist_ok=True)
         self.config.data_dir.mkdir(parents=True, exist_ok=True)
@@ -318,13 +525,42 @@ class JarvisRuntime:
         avg_stt = snapshot.get("stt_ms", {}).get("avg_ms", 0.0)
         avg_tts = snapshot.get("tts_ms", {}).get("avg_ms", 0.0)
         cmd_latency = snapshot.get("command_ms", {}).get("avg_ms", 0.0)
+        avg_denoise = snapshot.get("denoise_ms", {}).get("avg_ms", 0.0)
         payload = {
             "avg_stt": round(avg_stt / 1000.0, 3) if avg_stt else 0.0,  # секунды
             "avg_tts": round(avg_tts / 1000.0, 3) if avg_tts else 0.0,
             "cmd_latency": round(cmd_latency / 1000.0, 3) if cmd_latency else 0.0,
+            "avg_denoise": round(avg_denoise / 1000.0, 4) if avg_denoise else 0.0,
             "fps_screen": 0,  # зарезервировано под будущий трекер FPS
+            "capture": self.listener.capture_stats(),  # Потери кадров и задержки захвата
+            "power": self.listener.power_stats(),  # CPU-секунды в час в простое и при активном прослушивании
             "timestamp": datetime.utcnow().strftime("%Y-%m-%dT%H:%M:%SZ"),
         }
+        backend_perf = getattr(self.stt.backend, "perf", None)
+        if isinstance(backend_perf, PerformanceStats):
+            # Разбивка времени STT по фразам (например, whisper_array_* против whisper_file_*)
+            payload["stt_backend"] = backend_perf.snapshot()
+        if isinstance(self.stt.backend, CascadeSTTBackend):
+            # Частота эскалаций на точную модель и сэкономленное время
+            payload["stt_cascade"] = self.stt.backend.snapshot()
+        if isinstance(self.stt.backend, WhisperSTTBackend) and self.stt.backend.commands:
+            # Доля фраз, распознанных как известные команды
+            payload["stt_commands"] = self.stt.backend.command_snapshot()
+        if isinstance(self.stt.backend, GoogleSTTBackend):
+            # p50/p95, дубли и переиспользование соединений
+            payload["stt_google"] = self.stt.backend.snapshot()
+        if isinstance(self.stt.backend, RacingSTTBackend):
+            # Доля побед и задержка каждого участника гонки
+            payload["stt_race"] = self.stt.backend.snapshot()
+        if isinstance(self.stt.backend, VoskSTTBackend):
+            # Доля команд из грамматики и переходы к основному бэкенду
+            payload["stt_vosk"] = self.stt.backend.snapshot()
+        if self.spotter is not None:
+            # Стоимость детектора wake word и фразы, не дошедшие до STT
+            payload["wake_spotter"] = self.spotter.snapshot()
+        if self.stt_executor is not None:
+            # Глубина очереди и загрузка каждого воркера
+            payload["stt_pool"] = self.stt_executor.snapshot()
         dst = self.config.logs_dir / "performance.json"
         try:
             dst.write_text(json.dumps(payload, ensure_ascii=False, indent=2), encoding="utf-8")
@@ -353,21 +589,26 @@ class JarvisRuntime:
             # Переинициализация STT с тем же движком
             if self.config.stt_engine == "whisper":
                 try:
-                    stt_backend = WhisperSTTBackend(
-                        model_size="base",
-                        device="cpu",
-                        compute_type="int8",
-                        language="ru"
-                    )
-                    self.stt = SpeechToText(backend=stt_backend)
+                    self.stt = SpeechToText(backend=self._create_whisper_backend())
+                except Exception:
+                    self.stt = SpeechToText(backend=self._create_google_backend())
+            elif self.config.stt_engine == "race":
+                try:
+                    self.stt = SpeechToText(backend=self._create_racing_backend())
                 except Exception:
-                    self.stt = SpeechToText(backend=GoogleSTTBackend())
+                    self.stt = SpeechToText(backend=self._create_google_backend())
             else:
-                self.stt = SpeechToText(backend=GoogleSTTBackend())
-            self.listener = SpeechListener(config=RecordConfig())
+                self.stt = SpeechToText(backend=self._create_google_backend())
+            self.stt = SpeechToText(backend=self._create_vosk_backend(self.stt.backend))
+            if self.stt_executor is not None:
+                self.stt_executor.shutdown()
+            self.stt_executor = self._create_stt_executor()
+            self.listener.close()
+            self.listener = self._create_listener()
+            self.spotter = self._create_spotter()
             # Переинициализация SemanticRouter
             try:
-                self.semantic = SemanticRouter()
+                self.semantic = SemanticRouter(model_path=self._sentence_model_path())
                 self._setup_semantic_intents()
             except Exception as e:
                 self.logger.warning(f"Не удалось переинициализировать SemanticRouter: {e}")
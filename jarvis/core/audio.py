@@ -0,0 +1,223 @@
+from __future__ import annotations
+
+import io
+import wave
+from functools import lru_cache
+from math import gcd
+from pathlib import Path
+from typing import Dict, Optional, Tuple
+
+import numpy as np
+import speech_recognition as sr
+
+# Частота, с которой работают Whisper, VAD и фронтенд признаков
+TARGET_RATE = 16000
+
+
+def to_mono_float32(data: bytes, sample_width: int, channels: int = 1) -> np.ndarray:
+    """Переводит PCM любой разрядности в float32 [-1, 1] и сводит каналы в моно"""
+    if sample_width == 2:
+        x = np.frombuffer(data, dtype=np.int16).astype(np.float32) / 32768.0
+    elif sample_width == 1:
+        x = (np.frombuffer(data, dtype=np.uint8).astype(np.float32) - 128.0) / 128.0
+    elif sample_width == 3:
+        raw = np.frombuffer(data, dtype=np.uint8)
+        raw = raw[: len(raw) - len(raw) % 3].reshape(-1, 3).astype(np.int32)
+        ints = raw[:, 0] | (raw[:, 1] << 8) | (raw[:, 2] << 16)
+        ints = np.where(ints & 0x800000, ints - 0x1000000, ints)
+        x = ints.astype(np.float32) / 8388608.0
+    elif sample_width == 4:
+        x = np.frombuffer(data, dtype=np.int32).astype(np.float32) / 2147483648.0
+    else:
+        raise ValueError(f"Неподдерживаемая разрядность: {sample_width} байт")
+    if channels > 1:
+        x = x[: len(x) - len(x) % channels].reshape(-1, channels).mean(axis=1, dtype=np.float32)
+    return x
+
+
+def float32_to_pcm16(x: np.ndarray) -> bytes:
+    return (np.clip(x, -1.0, 1.0) * 32767.0).astype(np.int16).tobytes()
+
+
+@lru_cache(maxsize=16)
+def _filter_bank(up: int, down: int, taps_per_phase: int = 32) -> np.ndarray:
+    """Полифазный ФНЧ (оконный sinc) для передискретизации в up/down раз
+
+    Фильтр считается один раз на пару частот и кэшируется. Возвращает
+    матрицу (up, taps_per_phase): строка p — коэффициенты фазы p.
+    """
+    n = taps_per_phase * up
+    cutoff = 1.0 / max(up, down)
+    # Симметричный фильтр нечётной длины n-1 с центром в целом отсчёте (n-1)//2,
+    # дополненный нулём до n — так задержка ровно целая и совпадает с StreamResampler.delay
+    t = np.arange(n - 1, dtype=np.float64) - (n - 2) / 2.0
+    h = cutoff * np.sinc(cutoff * t) * np.kaiser(n - 1, 8.0)
+    h = np.append(h * (up / h.sum()), 0.0)
+    bank = h.reshape(taps_per_phase, up).T.astype(np.float32)
+    bank.setflags(write=False)
+    return bank
+
+
+class StreamResampler:
+    """Потоковый полифазный ресемплер: кадры можно подавать кусками любой длины
+
+    Выход совпадает с разовой передискретизацией всего сигнала, потому что
+    между вызовами сохраняется хвост входа и номер следующего выходного отсчёта.
+    """
+
+    _CHUNK = 8192  # Выходных отсчётов за один векторный проход (ограничивает память)
+
+    def __init__(self, src_rate: int, dst_rate: int, taps_per_phase: int = 32) -> None:
+        g = gcd(int(src_rate), int(dst_rate))
+        self.up = int(dst_rate) // g
+        self.down = int(src_rate) // g
+        self.taps = taps_per_phase
+        self.bank = _filter_bank(self.up, self.down, taps_per_phase)
+        self.delay = (taps_per_phase * self.up - 2) // 2  # Групповая задержка фильтра
+        self._buf = np.zeros(self.taps - 1, dtype=np.float32)
+        self._buf_start = -(self.taps - 1)  # Глобальный индекс _buf[0]
+        self._total_in = 0
+        self._next_out = 0
+
+    def process(self, x: np.ndarray) -> np.ndarray:
+        x = np.asarray(x, dtype=np.float32)
+        if self.up == self.down:
+            return x
+        self._buf = np.concatenate([self._buf, x])
+        self._total_in += len(x)
+        # Выходной отсчёт n требует входа до индекса (n*down + delay) // up включительно
+        n_end = max(self._next_out, -((self.delay - self._total_in * self.up) // self.down))
+        offsets = np.arange(self.taps)
+        out = []
+        for start in range(self._next_out, n_end, self._CHUNK):
+            n = np.arange(start, min(start + self._CHUNK, n_end), dtype=np.int64)
+            m = n * self.down + self.delay
+            idx = (m // self.up - self._buf_start)[:, None] - offsets[None, :]
+            out.append(np.einsum("nk,nk->n", self._buf[idx], self.bank[m % self.up]))
+        self._next_out = n_end
+        # Выбрасываем вход, который больше не понадобится
+        cut = (n_end * self.down + self.delay) // self.up - (self.taps - 1) - self._buf_start
+        if cut > 0:
+            self._buf = self._buf[cut:]
+            self._buf_start += cut
+        return np.concatenate(out) if out else np.zeros(0, dtype=np.float32)
+
+    def flush(self) -> np.ndarray:
+        """Выдаёт отсчёты, задержанные фильтром (вход дополняется нулями)
+
+        После flush ресемплер считается завершённым.
+        """
+        if self.up == self.down:
+            return np.zeros(0, dtype=np.float32)
+        expected = -(-self._total_in * self.up // self.down)
+        produced = self._next_out
+        tail = self.process(np.zeros(self.delay // self.up + self.taps, dtype=np.float32))
+        return tail[: max(0, expected - produced)]
+
+
+def resample(x: np.ndarray, src_rate: int, dst_rate: int) -> np.ndarray:
+    """Разовая векторная передискретизация float32-сигнала"""
+    if int(src_rate) == int(dst_rate):
+        return np.asarray(x, dtype=np.float32)
+    resampler = StreamResampler(src_rate, dst_rate)
+    return np.concatenate([resampler.process(x), resampler.flush()])
+
+
+class AudioFrame(sr.AudioData):
+    """Аудио одной фразы: 16-bit PCM моно с NumPy-представлением без копирования
+
+    Наследует sr.AudioData, поэтому подходит всем существующим потребителям
+    (recognize_google и т.п.). Конвертации (float32, 16 кГц, WAV) кэшируются
+    на объекте: VAD, фронтенд признаков и STT-бэкенды получают один и тот же
+    результат, и фраза конвертируется не больше одного раза.
+    """
+
+    def __init__(self, frame_data: bytes, sample_rate: int, sample_width: int = 2, segmented: bool = False) -> None:
+        super().__init__(frame_data, sample_rate, sample_width)
+        # True — границы речи уже нашёл VAD слушателя, повторный поиск речи не нужен
+        self.segmented = segmented
+        # Кадры кольцевого буфера SpeechListener [начало, конец), из которых вырезана фраза
+        self.stream_range: Optional[Tuple[int, int]] = None
+        self._cache: Dict[str, object] = {}
+
+    @classmethod
+    def wrap(cls, audio: sr.AudioData) -> "AudioFrame":
+        """Оборачивает sr.AudioData без копирования байтов (AudioFrame возвращается как есть)"""
+        if isinstance(audio, AudioFrame):
+            return audio
+        return cls(audio.frame_data, audio.sample_rate, audio.sample_width)
+
+    @property
+    def duration_s(self) -> float:
+        return len(self.frame_data) / float(self.sample_width * self.sample_rate)
+
+    def crop(self, start_s: float, end_s: float) -> "AudioFrame":
+        """Фрагмент [start_s, end_s) как новый AudioFrame (границы по целым отсчётам)"""
+        start = max(0, int(start_s * self.sample_rate)) * self.sample_width
+        end = min(len(self.frame_data), int(round(end_s * self.sample_rate)) * self.sample_width)
+        return AudioFrame(self.frame_data[start:end], self.sample_rate, self.sample_width, segmented=True)
+
+    @property
+    def samples(self) -> np.ndarray:
+        """int16-отсчёты; для 16-bit это view на frame_data без копирования"""
+        cached = self._cache.get("samples")
+        if cached is None:
+            if self.sample_width == 2:
+                cached = np.frombuffer(self.frame_data, dtype=np.int16)
+            else:
+                cached = (to_mono_float32(self.frame_data, self.sample_width) * 32767.0).astype(np.int16)
+            self._cache["samples"] = cached
+        return cached
+
+    def float32(self, rate: int = TARGET_RATE) -> np.ndarray:
+        """float32 [-1, 1] на частоте rate (по умолчанию 16 кГц — вход Whisper и VAD)"""
+        key = f"float32@{rate}"
+        cached = self._cache.get(key)
+        if cached is None:
+            x = self.samples.astype(np.float32) / 32768.0
+            cached = resample(x, self.sample_rate, rate)
+            cached.setflags(write=False)
+            self._cache[key] = cached
+        return cached
+
+    def wav_bytes(self, rate: int = TARGET_RATE) -> bytes:
+        """WAV (16-bit моно) на частоте rate, кэшируется"""
+        key = f"wav@{rate}"
+        cached = self._cache.get(key)
+        if cached is None:
+            if rate == self.sample_rate and self.sample_width == 2:
+                pcm = self.frame_data
+            else:
+                pcm = float32_to_pcm16(self.float32(rate))
+            buf = io.BytesIO()
+            with wave.open(buf, "wb") as wav:
+                wav.setnchannels(1)
+                wav.setsampwidth(2)
+                wav.setframerate(rate)
+                wav.writeframes(pcm)
+            cached = buf.getvalue()
+            self._cache[key] = cached
+        return cached
+
+    def flac_bytes(self, rate: int = TARGET_RATE) -> bytes:
+        """FLAC (16-bit моно) на частоте rate — компактная загрузка в облачный STT, кэшируется"""
+        key = f"flac@{rate}"
+        cached = self._cache.get(key)
+        if cached is None:
+            if rate == self.sample_rate and self.sample_width == 2:
+                data: sr.AudioData = self
+            else:
+                data = sr.AudioData(float32_to_pcm16(self.float32(rate)), rate, 2)
+            cached = data.get_flac_data()
+            self._cache[key] = cached
+        return cached
+
+
+def read_wav(path: str | Path, sample_rate: int = TARGET_RATE) -> bytes:
+    """Читает WAV и приводит к 16-bit моно sample_rate (общий векторный ресемплер)"""
+    with wave.open(str(path), "rb") as wav:
+        data = wav.readframes(wav.getnframes())
+        width, channels, rate = wav.getsampwidth(), wav.getnchannels(), wav.getframerate()
+    if width == 2 and channels == 1 and rate == sample_rate:
+        return data
+    return float32_to_pcm16(resample(to_mono_float32(data, width, channels), rate, sample_rate))
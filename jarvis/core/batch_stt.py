@@ -0,0 +1,277 @@
+from __future__ import annotations
+
+import json
+import logging
+import os
+import time
+import wave
+from concurrent.futures import FIRST_COMPLETED, wait
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Set
+
+import numpy as np
+
+from jarvis.core.audio import TARGET_RATE, AudioFrame, read_wav
+from jarvis.core.features import get_features
+from jarvis.core.stt_executor import STTExecutor
+from jarvis.core.vad import frame_energy_zcr, pcm_to_frames
+
+
+@dataclass
+class BatchItem:
+    """Результат распознавания одного файла (строка JSONL)"""
+    file: str
+    text: Optional[str]
+    duration_s: float
+    load_ms: float  # Чтение и приведение к 16 кГц моно
+    decode_ms: float  # Работа воркера над файлом
+    latency_ms: float  # От отправки в воркер до результата
+    worker: Optional[int] = None  # None — куски файла декодировали разные воркеры
+    error: Optional[str] = None
+    chunks: int = 0  # Куски с речью, отправленные в декодер
+
+
+@dataclass
+class _FileJob:
+    """Файл, куски которого распознаются в пуле; текст собирается по порядку кусков"""
+    path: Path
+    duration_s: float
+    load_ms: float
+    texts: List[Optional[str]] = field(default_factory=list)
+    remaining: int = 0  # Отправленные, но ещё не распознанные куски
+    split_done: bool = False  # Все куски файла отправлены
+    submitted_at: float = 0.0
+    decode_ms: float = 0.0
+    workers: Set[int] = field(default_factory=set)
+    error: Optional[str] = None
+
+
+def find_wavs(directory: str | Path, recursive: bool = True) -> List[Path]:
+    """WAV-файлы каталога в стабильном порядке"""
+    directory = Path(directory)
+    pattern = "**/*.wav" if recursive else "*.wav"
+    return sorted(path for path in directory.glob(pattern) if path.is_file())
+
+
+def wav_duration_s(path: Path) -> float:
+    with wave.open(str(path), "rb") as wav:
+        return wav.getnframes() / float(wav.getframerate() or 1)
+
+
+def split_audio(audio: AudioFrame, chunk_s: float, search_s: float = 3.0, frame_ms: int = 20) -> Iterator[AudioFrame]:
+    """Режет длинную запись на куски не длиннее chunk_s
+
+    Граница куска — самый тихий кадр в последних search_s секундах куска,
+    чтобы не разрезать слово. Куски не помечены как сегментированные:
+    речь в них ищет FeatureFrontend.
+    """
+    bytes_per_s = audio.sample_rate * audio.sample_width
+    frame_bytes = audio.sample_rate * frame_ms // 1000 * audio.sample_width
+    data = audio.frame_data
+    chunk_bytes = int(chunk_s * bytes_per_s) // frame_bytes * frame_bytes
+    search_bytes = min(chunk_bytes, int(search_s * bytes_per_s) // frame_bytes * frame_bytes)
+    start = 0
+    while start < len(data):
+        end = start + chunk_bytes
+        if end < len(data) and search_bytes:
+            window = data[end - search_bytes:end]
+            rms, _ = frame_energy_zcr(pcm_to_frames(window, frame_bytes // audio.sample_width))
+            end = end - search_bytes + (int(np.argmin(rms)) + 1) * frame_bytes
+        yield AudioFrame(data[start:end], audio.sample_rate, audio.sample_width)
+        start = end
+
+
+def default_workers() -> int:
+    """Число процессов по умолчанию: половина ядер (каждый Whisper тоже использует потоки), не больше 4"""
+    return max(1, min(4, (os.cpu_count() or 2) // 2))
+
+
+class BatchTranscriber:
+    """Пакетное распознавание корпуса записей на всех ядрах
+
+    Файлы читаются в основном процессе и уходят в пул STTExecutor: каждый
+    воркер держит свою модель Whisper и декодирует файлы параллельно с
+    остальными. В полёте не больше max_in_flight файлов, чтобы корпус за
+    несколько месяцев не загружался в память целиком. Длинные записи режутся
+    на куски до chunk_s секунд по паузам (слоты общей памяти не зависят от
+    длины файла), куски без речи не декодируются, а тексты кусков
+    склеиваются обратно в одну строку на файл. Результаты пишутся
+    в JSONL по мере готовности; уже распознанные файлы при повторном
+    запуске пропускаются, так что прерванный прогон можно продолжить.
+    """
+
+    def __init__(
+        self,
+        backend_cls: type,
+        backend_kwargs: Optional[Dict[str, Any]] = None,
+        workers: Optional[int] = None,
+        max_in_flight: Optional[int] = None,
+        chunk_s: float = 30.0,
+    ) -> None:
+        self.backend_cls = backend_cls
+        self.backend_kwargs = dict(backend_kwargs or {})
+        self.workers = workers or default_workers()
+        self.max_in_flight = max_in_flight or self.workers * 3  # Кусков в полёте
+        self.chunk_s = chunk_s  # Длина куска: окно Whisper — 30 с
+        self._logger = logging.getLogger("jarvis")
+
+    def transcribe_files(
+        self,
+        files: Iterable[Path],
+        out_path: Optional[Path] = None,
+        root: Optional[Path] = None,
+        resume: bool = True,
+    ) -> Dict[str, Any]:
+        """Распознаёт файлы; возвращает сводку (файлы, секунды аудио, скорость относительно реального времени)
+
+        Без out_path результаты по файлам возвращаются в сводке (ключ "items").
+        """
+        files = list(files)
+        done_names = self._load_done(out_path) if resume and out_path is not None else set()
+        todo = [path for path in files if self._name(path, root) not in done_names]
+        if done_names:
+            self._logger.info(f"BatchSTT: Пропускаю уже распознанные файлы: {len(files) - len(todo)}")
+        summary: Dict[str, Any] = {"files": 0, "skipped": len(files) - len(todo), "failed": 0, "audio_s": 0.0, "wall_s": 0.0}
+        items: Optional[List[BatchItem]] = [] if out_path is None else None
+        if items is not None:
+            summary["items"] = items
+        if not todo:
+            return summary
+
+        # Слоты общей памяти рассчитаны на один кусок, а не на самый длинный файл
+        executor = STTExecutor(
+            self.backend_cls,
+            self.backend_kwargs,
+            workers=self.workers,
+            max_audio_s=self.chunk_s + 1.0,
+            slots=self.max_in_flight,
+        )
+        out = None
+        start = time.perf_counter()
+
+        def finish(job: _FileJob) -> None:
+            texts = [text for text in job.texts if text]
+            item = BatchItem(
+                file=self._name(job.path, root),
+                text=" ".join(texts) if texts else None,
+                duration_s=round(job.duration_s, 3),
+                load_ms=round(job.load_ms, 1),
+                decode_ms=round(job.decode_ms, 1),
+                latency_ms=round((time.perf_counter() - job.submitted_at) * 1000.0, 1) if job.texts else 0.0,
+                worker=next(iter(job.workers)) if len(job.workers) == 1 else None,
+                error=job.error,
+                chunks=len(job.texts),
+            )
+            if item.error:
+                summary["failed"] += 1
+            summary["files"] += 1
+            summary["audio_s"] += job.duration_s
+            self._emit(out, items, item)
+
+        def chunks():
+            """(файл, номер куска, кусок) по всем файлам; файл читается, только когда до него дошла очередь"""
+            for path in todo:
+                load_start = time.perf_counter()
+                try:
+                    audio = AudioFrame(read_wav(path, TARGET_RATE), TARGET_RATE, 2)
+                except Exception as e:
+                    # Нечитаемый файл тоже обработан: files = удачные + failed
+                    summary["files"] += 1
+                    summary["failed"] += 1
+                    self._emit(out, items, BatchItem(self._name(path, root), None, 0.0, 0.0, 0.0, 0.0, error=f"{type(e).__name__}: {e}"))
+                    continue
+                job = _FileJob(path, audio.duration_s, (time.perf_counter() - load_start) * 1000.0)
+                for chunk in split_audio(audio, self.chunk_s):
+                    # Куски без речи не декодируются: на тишине Whisper только галлюцинирует
+                    if not get_features(chunk).has_speech:
+                        continue
+                    if not job.texts:
+                        job.submitted_at = time.perf_counter()
+                    job.texts.append(None)
+                    job.remaining += 1
+                    yield job, len(job.texts) - 1, chunk
+                job.split_done = True
+                if job.remaining == 0:
+                    finish(job)
+
+        try:
+            if not executor.wait_ready():
+                raise RuntimeError("воркеры STT не запустились")
+            if out_path is not None:
+                out_path.parent.mkdir(parents=True, exist_ok=True)
+                out = out_path.open("a", encoding="utf-8")
+            pending: Dict[Any, tuple] = {}
+            queue = chunks()
+            exhausted = False
+            while pending or not exhausted:
+                while not exhausted and len(pending) < self.max_in_flight:
+                    task = next(queue, None)
+                    if task is None:
+                        exhausted = True
+                        break
+                    job, index, chunk = task
+                    pending[executor.submit(chunk)] = (job, index)
+                if not pending:
+                    continue
+                done, _ = wait(list(pending), return_when=FIRST_COMPLETED)
+                for future in done:
+                    job, index = pending.pop(future)
+                    job.texts[index] = future.result()
+                    job.decode_ms += getattr(future, "busy_ms", 0.0)
+                    worker_id = getattr(future, "worker_id", None)
+                    if worker_id is not None:
+                        job.workers.add(worker_id)
+                    job.error = job.error or getattr(future, "error", None)
+                    job.remaining -= 1
+                    if job.remaining == 0 and job.split_done:
+                        finish(job)
+        finally:
+            summary["wall_s"] = round(time.perf_counter() - start, 2)
+            summary["pool"] = executor.snapshot()
+            executor.shutdown()
+            if out is not None:
+                out.close()
+        summary["audio_s"] = round(summary["audio_s"], 1)
+        summary["realtime_factor"] = round(summary["audio_s"] / summary["wall_s"], 1) if summary["wall_s"] else 0.0
+        return summary
+
+    def transcribe_directory(self, directory: Path, out_path: Optional[Path] = None, resume: bool = True) -> Dict[str, Any]:
+        directory = Path(directory)
+        out_path = out_path or directory / "transcripts.jsonl"
+        files = find_wavs(directory)
+        self._logger.info(f"BatchSTT: Файлов: {len(files)}, процессов: {self.workers}, результат: {out_path}")
+        return self.transcribe_files(files, out_path=out_path, root=directory, resume=resume)
+
+    @staticmethod
+    def _name(path: Path, root: Optional[Path]) -> str:
+        if root is not None:
+            try:
+                return path.relative_to(root).as_posix()
+            except ValueError:
+                pass
+        return str(path)
+
+    @staticmethod
+    def _load_done(out_path: Path) -> set:
+        if not out_path.exists():
+            return set()
+        done = set()
+        with out_path.open(encoding="utf-8") as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    continue
+                if not record.get("error"):
+                    done.add(record.get("file"))
+        return done
+
+    @staticmethod
+    def _emit(out, items: Optional[List[BatchItem]], item: BatchItem) -> None:
+        if items is not None:
+            items.append(item)
+        if out is None:
+            return
+        out.write(json.dumps(asdict(item), ensure_ascii=False) + "\n")
+        out.flush()
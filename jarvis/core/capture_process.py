@@ -0,0 +1,256 @@
+from __future__ import annotations
+
+import multiprocessing as mp
+import sys
+import time
+from multiprocessing import shared_memory
+from typing import Optional, Tuple
+
+import numpy as np
+
+# Слоты заголовка (int64) в начале разделяемой памяти
+_WRITE_INDEX = 0  # Сколько кадров записано (пишет только процесс захвата)
+_READER_INDEX = 1  # До какого кадра дочитал сегментатор (пишет только основной процесс)
+_STATE = 2  # Состояние процесса захвата, см. STATE_*
+_CAPTURE_GAPS = 3  # Сколько раз чтение с устройства опоздало больше чем на кадр
+_CAPTURE_BATCH = 4  # Сколько кадров читать с устройства за раз (пишет основной процесс, 0 — один)
+_HEADER_SLOTS = 8
+_HEADER_BYTES = _HEADER_SLOTS * 8
+
+STATE_STARTING = 0
+STATE_RUNNING = 1
+STATE_FINISHED = 2  # Конечный источник закончился
+STATE_ERROR = 3
+
+
+class SharedFrameRing:
+    """Кольцевой буфер кадров в multiprocessing.shared_memory
+
+    Один писатель (процесс захвата) и один читатель (сегментатор в основном
+    процессе). Блокировок нет: писатель сначала кладёт кадр в слот, потом
+    увеличивает write_index; читатель копирует кадры и перепроверяет
+    write_index — если за время копирования писатель успел перезаписать
+    часть прочитанных слотов, эти кадры отбрасываются и учитываются
+    в dropped_frames. Данные передаются без pickle — только байты из общей памяти.
+
+    Интерфейс чтения совпадает с FrameRingBuffer, поэтому SpeechListener
+    использует оба буфера одинаково.
+    """
+
+    def __init__(self, capacity_frames: int, frame_bytes: int, name: Optional[str] = None, poll_s: float = 0.005) -> None:
+        self.capacity_frames = max(2, int(capacity_frames))
+        self.frame_bytes = int(frame_bytes)
+        size = _HEADER_BYTES + self.capacity_frames * self.frame_bytes
+        self._owner = name is None
+        self.shm = shared_memory.SharedMemory(name=name, create=self._owner, size=size)
+        self._header = np.ndarray((_HEADER_SLOTS,), dtype=np.int64, buffer=self.shm.buf[:_HEADER_BYTES])
+        self._data = self.shm.buf[_HEADER_BYTES:_HEADER_BYTES + self.capacity_frames * self.frame_bytes]
+        if self._owner:
+            self._header[:] = 0
+        self.poll_s = poll_s
+        self._closed = False
+        self.overruns = 0
+        self.dropped_frames = 0
+
+    @property
+    def name(self) -> str:
+        return self.shm.name
+
+    # --- Общие поля заголовка ---
+
+    @property
+    def write_index(self) -> int:
+        return int(self._header[_WRITE_INDEX])
+
+    @property
+    def oldest_index(self) -> int:
+        return max(0, self.write_index - self.capacity_frames + 1)
+
+    @property
+    def state(self) -> int:
+        return int(self._header[_STATE])
+
+    @state.setter
+    def state(self, value: int) -> None:
+        self._header[_STATE] = value
+
+    @property
+    def capture_gaps(self) -> int:
+        return int(self._header[_CAPTURE_GAPS])
+
+    @property
+    def capture_batch(self) -> int:
+        """Кадров на одно чтение устройства: в режиме простоя захват просыпается реже"""
+        return max(1, int(self._header[_CAPTURE_BATCH]))
+
+    @capture_batch.setter
+    def capture_batch(self, value: int) -> None:
+        self._header[_CAPTURE_BATCH] = max(1, int(value))
+
+    @property
+    def released(self) -> bool:
+        return self._header is None
+
+    # --- Сторона писателя (процесс захвата) ---
+
+    def write(self, frame: bytes) -> None:
+        if len(frame) != self.frame_bytes:
+            frame = bytes(frame[: self.frame_bytes]).ljust(self.frame_bytes, b"\x00")
+        index = int(self._header[_WRITE_INDEX])
+        start = (index % self.capacity_frames) * self.frame_bytes
+        self._data[start:start + self.frame_bytes] = frame
+        self._header[_WRITE_INDEX] = index + 1
+
+    def reader_lag(self) -> int:
+        return int(self._header[_WRITE_INDEX]) - int(self._header[_READER_INDEX])
+
+    def add_capture_gap(self) -> None:
+        self._header[_CAPTURE_GAPS] += 1
+
+    # --- Сторона читателя (основной процесс) ---
+
+    def reset_reader(self, index: int) -> None:
+        self._header[_READER_INDEX] = index
+
+    def read_many(self, index: int, max_frames: int, timeout: Optional[float] = None) -> Tuple[Optional[bytes], int]:
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            write_index = self.write_index
+            index = self._skip_overwritten(index, write_index)
+            if index < write_index:
+                break
+            if self._closed or self.state in (STATE_FINISHED, STATE_ERROR):
+                return None, index
+            if deadline is not None and time.monotonic() >= deadline:
+                return None, index
+            time.sleep(self.poll_s)
+
+        count = min(max_frames, write_index - index)
+        data = self._copy(index, count)
+        # Писатель мог перезаписать начало блока, пока мы копировали
+        lost = self._lost_since(index, self.write_index)
+        if lost:
+            lost = min(lost, count)
+            self.overruns += 1
+            self.dropped_frames += lost
+            data = data[lost * self.frame_bytes:]
+            index += lost
+            count -= lost
+        self._header[_READER_INDEX] = index + count
+        return data, index + count
+
+    def read_range(self, start: int, end: int) -> bytes:
+        write_index = self.write_index
+        start = max(start, write_index - self.capacity_frames + 1, 0)
+        end = min(end, write_index)
+        if end <= start:
+            return b""
+        data = self._copy(start, end - start)
+        lost = self._lost_since(start, self.write_index)
+        return data[min(lost, end - start) * self.frame_bytes:] if lost else data
+
+    def _lost_since(self, index: int, write_index: int) -> int:
+        # Слот кадра index свободен для перезаписи, как только писатель дошёл до index + capacity - 1
+        return max(0, write_index - self.capacity_frames + 1 - index)
+
+    def _skip_overwritten(self, index: int, write_index: int) -> int:
+        lost = self._lost_since(index, write_index)
+        if lost:
+            self.overruns += 1
+            self.dropped_frames += lost
+            index += lost
+        return index
+
+    def _copy(self, index: int, count: int) -> bytes:
+        chunks = []
+        pos = index
+        while pos < index + count:
+            slot = pos % self.capacity_frames
+            run = min(index + count - pos, self.capacity_frames - slot)
+            start = slot * self.frame_bytes
+            chunks.append(bytes(self._data[start:start + run * self.frame_bytes]))
+            pos += run
+        return b"".join(chunks)
+
+    def close(self) -> None:
+        self._closed = True
+
+    def reopen(self) -> None:
+        self._closed = False
+
+    def release(self) -> None:
+        """Отсоединяет общую память; владелец её удаляет"""
+        self._header = None
+        self._data.release()
+        self.shm.close()
+        if self._owner:
+            try:
+                self.shm.unlink()
+            except FileNotFoundError:
+                pass
+
+
+def capture_worker(
+    shm_name: str,
+    capacity_frames: int,
+    frame_bytes: int,
+    source,
+    sample_rate: int,
+    frame_samples: int,
+    stop_event,
+) -> None:
+    """Точка входа дочернего процесса: читает источник и пишет кадры в общую память"""
+    ring = SharedFrameRing(capacity_frames, frame_bytes, name=shm_name)
+    spf = frame_samples / float(sample_rate)
+    backlog_limit = capacity_frames // 2
+    try:
+        source.open(sample_rate, frame_samples)
+        ring.state = STATE_RUNNING
+        next_frame_at = time.perf_counter()
+        last_read = time.perf_counter()
+        while not stop_event.is_set():
+            count = ring.capture_batch
+            block = source.read_frames(count) if count > 1 else source.read_frame()
+            now = time.perf_counter()
+            if source.realtime and now - last_read > (count + 1) * spf:
+                # Устройство отдало кадры с опозданием — признак провала захвата
+                ring.add_capture_gap()
+            last_read = now
+            if not block:
+                ring.state = STATE_FINISHED
+                break
+            frames = -(-len(block) // frame_bytes)
+            if not source.realtime:
+                if source.pace:
+                    next_frame_at += spf * frames
+                    delay = next_frame_at - time.perf_counter()
+                    if delay > 0:
+                        time.sleep(delay)
+                else:
+                    while ring.reader_lag() > backlog_limit and not stop_event.is_set():
+                        time.sleep(0.002)
+            for offset in range(0, len(block), frame_bytes):
+                ring.write(block[offset:offset + frame_bytes])
+    except Exception as e:
+        ring.state = STATE_ERROR
+        print(f"Процесс захвата: ошибка источника {type(source).__name__}: {e}", file=sys.stderr)  # noqa: T201
+    finally:
+        try:
+            source.close()
+        except Exception:
+            pass
+        ring.release()
+
+
+def start_capture_process(ring: SharedFrameRing, source, sample_rate: int, frame_samples: int) -> Tuple[mp.Process, object]:
+    """Запускает процесс захвата для ring; возвращает (процесс, событие остановки)"""
+    ctx = mp.get_context("spawn")
+    stop_event = ctx.Event()
+    process = ctx.Process(
+        target=capture_worker,
+        args=(ring.name, ring.capacity_frames, ring.frame_bytes, source, sample_rate, frame_samples, stop_event),
+        daemon=True,
+        name="Audio-Capture-Process",
+    )
+    process.start()
+    return process, stop_event
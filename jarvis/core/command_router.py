@@ -5,10 +5,202 @@ import subprocess
 import webbrowser
 from dataclasses import dataclass
 from pathlib import Path
-from typing import Optional
+from typing import List, Optional, Tuple
 
+from jarvis.core.context_aware import CONTEXT_KEYWORDS
 from jarvis.core.jarvis_voice import JarvisVoice
 
+# Команды открытия приложений и папок: (имя, ключевые фразы, обработчик) в порядке проверки
+# Порядок важен — первое совпадение выигрывает (например, YouTube раньше браузера)
+APP_COMMANDS: List[Tuple[str, List[str], str]] = [
+    # YouTube - много вариаций
+    ("youtube", [
+        "youtube", "ютуб", "ютюб", "ютьюб",
+        "открой youtube", "открой ютуб", "открой ютюб",
+        "запусти youtube", "запусти ютуб", "запусти ютюб",
+        "youtube открой", "ютуб открой", "ютюб открой",
+        "надо открыть youtube", "надо открыть ютуб",
+        "включи youtube", "включи ютуб",
+        "включи видео на youtube", "включи видео на ютуб",
+        "покажи youtube", "покажи ютуб",
+        "открой видео на youtube", "открой видео на ютуб",
+        "запусти видео на youtube", "запусти видео на ютуб",
+    ], "_open_youtube"),
+    # Браузер - много вариаций
+    ("browser", [
+        "браузер", "browser",
+        "открой браузер", "запусти браузер",
+        "браузер открой", "браузер запусти",
+        "надо открыть браузер", "надо запустить браузер",
+        "включи браузер", "покажи браузер",
+        "интернет", "открой интернет",
+        "google", "гугл", "открой гугл",
+    ], "_open_browser"),
+    # Google - отдельная команда
+    ("google", [
+        "google", "гугл",
+        "открой google", "открой гугл",
+        "запусти google", "запусти гугл",
+        "google открой", "гугл открой",
+    ], "_open_google"),
+    # Папка Загрузки
+    ("downloads", [
+        "загрузки", "загрузка", "downloads",
+        "открой загрузки", "открой папку загрузки",
+        "запусти загрузки", "покажи загрузки",
+        "открой папку загрузок", "открой downloads",
+    ], "_open_downloads"),
+    # Рабочий стол
+    ("desktop", [
+        "рабочий стол", "desktop",
+        "открой рабочий стол", "открой desktop",
+        "покажи рабочий стол", "покажи desktop",
+    ], "_open_desktop"),
+    # Документы
+    ("documents", [
+        "документы", "documents",
+        "открой документы", "открой папку документы",
+        "покажи документы", "открой documents",
+    ], "_open_documents"),
+    # Изображения
+    ("pictures", [
+        "изображения", "картинки", "pictures", "images",
+        "открой изображения", "открой картинки",
+        "покажи изображения", "покажи картинки",
+        "открой pictures", "открой images",
+    ], "_open_pictures"),
+    # Видео
+    ("videos", [
+        "видео", "videos",
+        "открой видео", "открой папку видео",
+        "покажи видео", "открой videos",
+    ], "_open_videos"),
+    # Музыка
+    ("music", [
+        "музыка", "music",
+        "открой музыку", "открой папку музыку",
+        "покажи музыку", "открой music",
+    ], "_open_music"),
+    # Калькулятор
+    ("calculator", [
+        "калькулятор", "calculator", "calc",
+        "открой калькулятор", "запусти калькулятор",
+        "калькулятор открой", "calc",
+    ], "_open_calculator"),
+    # Блокнот
+    ("notepad", [
+        "блокнот", "notepad",
+        "открой блокнот", "запусти блокнот",
+        "блокнот открой", "notepad",
+    ], "_open_notepad"),
+    # Проводник
+    ("explorer", [
+        "проводник", "explorer", "файлы",
+        "открой проводник", "запусти проводник",
+        "покажи файлы", "открой файлы",
+    ], "_open_explorer"),
+    # Настройки
+    ("settings", [
+        "настройки", "settings", "параметры",
+        "открой настройки", "запусти настройки",
+        "открой параметры", "settings",
+    ], "_open_settings"),
+    # Диспетчер задач
+    ("task_manager", [
+        "диспетчер задач", "task manager", "диспетчер",
+        "открой диспетчер задач", "запусти диспетчер задач",
+        "task manager", "покажи процессы",
+    ], "_open_task_manager"),
+    # Панель управления
+    ("control_panel", [
+        "панель управления", "control panel",
+        "открой панель управления", "control panel",
+    ], "_open_control_panel"),
+    # Командная строка
+    ("cmd", [
+        "командная строка", "cmd", "терминал",
+        "открой командную строку", "запусти cmd",
+        "открой терминал", "cmd",
+    ], "_open_cmd"),
+    # PowerShell
+    ("powershell", [
+        "powershell", "power shell",
+        "открой powershell", "запусти powershell",
+    ], "_open_powershell"),
+    # Steam
+    ("steam", [
+        "steam", "стим",
+        "открой steam", "запусти steam",
+        "steam открой", "стим",
+    ], "_open_steam"),
+    # Discord
+    ("discord", [
+        "discord", "дискорд",
+        "открой discord", "запусти discord",
+        "discord открой", "дискорд",
+    ], "_open_discord"),
+    # Telegram
+    ("telegram", [
+        "telegram", "телеграм", "телеграмм",
+        "открой telegram", "запусти telegram",
+        "telegram открой", "телеграм",
+    ], "_open_telegram"),
+    # Spotify
+    ("spotify", [
+        "spotify", "спотифай",
+        "открой spotify", "запусти spotify",
+        "spotify открой", "спотифай",
+    ], "_open_spotify"),
+    # VLC
+    ("vlc", [
+        "vlc", "ви эль си",
+        "открой vlc", "запусти vlc",
+        "vlc открой",
+    ], "_open_vlc"),
+    # Paint
+    ("paint", [
+        "paint", "краска", "рисование",
+        "открой paint", "запусти paint",
+        "paint открой", "краска",
+    ], "_open_paint"),
+    # Word
+    ("word", [
+        "word", "ворд", "microsoft word",
+        "открой word", "запусти word",
+        "word открой", "ворд",
+    ], "_open_word"),
+    # Excel
+    ("excel", [
+        "excel", "эксель", "microsoft excel",
+        "открой excel", "запусти excel",
+        "excel открой", "эксель",
+    ], "_open_excel"),
+]
+
+# Обновление (требует настроенного Updater)
+UPDATE_KEYWORDS = [
+    "обнови", "обновить", "обновление",
+    "обнови jarvis", "обнови джарвис",
+    "запусти обновление", "проверь обновления",
+    "update", "check for updates",
+]
+
+# Обновление Jarvis
+UPDATE_JARVIS_KEYWORDS = [
+    "обнови jarvis", "обновить jarvis", "обнови джарвис", "обновить джарвис",
+    "обнови приложение", "обновить приложение",
+    "проверь обновления", "проверить обновления",
+    "update jarvis", "update", "обновление",
+]
+
+# Системные команды (безопасные): распознаются, но не выполняются
+SYSTEM_KEYWORDS = [
+    "перезагрузи компьютер", "перезагрузить компьютер",
+    "выключи компьютер", "выключить компьютер",
+    "выключи звук", "отключи звук", "убери звук",
+    "включи звук",
+]
+
 
 @dataclass
 class CommandRouter:
@@ -17,6 +209,31 @@ class CommandRouter:
         self.logger = logging.getLogger("jarvis")
         self.runtime = runtime  # Ссылка на JarvisRuntime для доступа к SemanticRouter
     
+    @staticmethod
+    def phrases() -> List[str]:
+        """Все ключевые фразы команд без повторов (словарь для распознавания речи)"""
+        seen = dict.fromkeys(keyword for _, keywords, _ in APP_COMMANDS for keyword in keywords)
+        seen.update(dict.fromkeys(UPDATE_KEYWORDS + UPDATE_JARVIS_KEYWORDS + SYSTEM_KEYWORDS))
+        return list(seen)
+
+    def can_route(self, text: str) -> bool:
+        """Найдётся ли для текста команда — проверка без выполнения (для каскада STT)"""
+        t = (text or "").lower().strip()
+        if not t:
+            return False
+        if self.runtime and self.runtime.context_aware:
+            if any(keyword in t for keywords in CONTEXT_KEYWORDS.values() for keyword in keywords):
+                return True
+        if any(keyword in t for keyword in self.phrases()):
+            return True
+        if self.runtime and self.runtime.semantic:
+            try:
+                best_cmd, _ = self.runtime.semantic.match(text, threshold=0.62)
+                return best_cmd is not None
+            except Exception as e:
+                self.logger.debug(f"CommandRouter: Ошибка SemanticRouter: {e}")
+        return False
+
     def handle(self, text: str) -> Optional[str]:
         t = (text or "").lower().strip()
         if not t:
@@ -35,253 +252,14 @@ class CommandRouter:
             except Exception as e:
                 self.logger.debug(f"CommandRouter: Ошибка контекстной команды: {e}")
 
-        # YouTube - много вариаций
-        youtube_keywords = [
-            "youtube", "ютуб", "ютюб", "ютьюб",
-            "открой youtube", "открой ютуб", "открой ютюб",
-            "запусти youtube", "запусти ютуб", "запусти ютюб",
-            "youtube открой", "ютуб открой", "ютюб открой",
-            "надо открыть youtube", "надо открыть ютуб",
-            "включи youtube", "включи ютуб",
-            "включи видео на youtube", "включи видео на ютуб",
-            "покажи youtube", "покажи ютуб",
-            "открой видео на youtube", "открой видео на ютуб",
-            "запусти видео на youtube", "запусти видео на ютуб",
-        ]
-        if any(keyword in t for keyword in youtube_keywords):
-            self.logger.info(f"CommandRouter: распознана команда YouTube из '{text}'")
-            return self._open_youtube()
-
-        # Браузер - много вариаций
-        browser_keywords = [
-            "браузер", "browser",
-            "открой браузер", "запусти браузер",
-            "браузер открой", "браузер запусти",
-            "надо открыть браузер", "надо запустить браузер",
-            "включи браузер", "покажи браузер",
-            "интернет", "открой интернет",
-            "google", "гугл", "открой гугл",
-        ]
-        if any(keyword in t for keyword in browser_keywords):
-            self.logger.info(f"CommandRouter: распознана команда браузера из '{text}'")
-            return self._open_browser()
-
-        # Google - отдельная команда
-        google_keywords = [
-            "google", "гугл",
-            "открой google", "открой гугл",
-            "запусти google", "запусти гугл",
-            "google открой", "гугл открой",
-        ]
-        if any(keyword in t for keyword in google_keywords):
-            return self._open_google()
-
-        # Папка Загрузки
-        downloads_keywords = [
-            "загрузки", "загрузка", "downloads",
-            "открой загрузки", "открой папку загрузки",
-            "запусти загрузки", "покажи загрузки",
-            "открой папку загрузок", "открой downloads",
-        ]
-        if any(keyword in t for keyword in downloads_keywords):
-            return self._open_downloads()
-
-        # Рабочий стол
-        desktop_keywords = [
-            "рабочий стол", "desktop",
-            "открой рабочий стол", "открой desktop",
-            "покажи рабочий стол", "покажи desktop",
-        ]
-        if any(keyword in t for keyword in desktop_keywords):
-            return self._open_desktop()
-
-        # Документы
-        documents_keywords = [
-            "документы", "documents",
-            "открой документы", "открой папку документы",
-            "покажи документы", "открой documents",
-        ]
-        if any(keyword in t for keyword in documents_keywords):
-            return self._open_documents()
-
-        # Изображения
-        pictures_keywords = [
-            "изображения", "картинки", "pictures", "images",
-            "открой изображения", "открой картинки",
-            "покажи изображения", "покажи картинки",
-            "открой pictures", "открой images",
-        ]
-        if any(keyword in t for keyword in pictures_keywords):
-            return self._open_pictures()
-
-        # Видео
-        videos_keywords = [
-            "видео", "videos",
-            "открой видео", "открой папку видео",
-            "покажи видео", "открой videos",
-        ]
-        if any(keyword in t for keyword in videos_keywords):
-            return self._open_videos()
-
-        # Музыка
-        music_keywords = [
-            "музыка", "music",
-            "открой музыку", "открой папку музыку",
-            "покажи музыку", "открой music",
-        ]
-        if any(keyword in t for keyword in music_keywords):
-            return self._open_music()
-
-        # Калькулятор
-        calc_keywords = [
-            "калькулятор", "calculator", "calc",
-            "открой калькулятор", "запусти калькулятор",
-            "калькулятор открой", "calc",
-        ]
-        if any(keyword in t for keyword in calc_keywords):
-            return self._open_calculator()
-
-        # Блокнот
-        notepad_keywords = [
-            "блокнот", "notepad",
-            "открой блокнот", "запусти блокнот",
-            "блокнот открой", "notepad",
-        ]
-        if any(keyword in t for keyword in notepad_keywords):
-            return self._open_notepad()
-
-        # Проводник
-        explorer_keywords = [
-            "проводник", "explorer", "файлы",
-            "открой проводник", "запусти проводник",
-            "покажи файлы", "открой файлы",
-        ]
-        if any(keyword in t for keyword in explorer_keywords):
-            return self._open_explorer()
-
-        # Настройки
-        settings_keywords = [
-            "настройки", "settings", "параметры",
-            "открой настройки", "запусти настройки",
-            "открой параметры", "settings",
-        ]
-        if any(keyword in t for keyword in settings_keywords):
-            return self._open_settings()
-
-        # Диспетчер задач
-        taskmgr_keywords = [
-            "диспетчер задач", "task manager", "диспетчер",
-            "открой диспетчер задач", "запусти диспетчер задач",
-            "task manager", "покажи процессы",
-        ]
-        if any(keyword in t for keyword in taskmgr_keywords):
-            return self._open_task_manager()
-
-        # Панель управления
-        control_keywords = [
-            "панель управления", "control panel",
-            "открой панель управления", "control panel",
-        ]
-        if any(keyword in t for keyword in control_keywords):
-            return self._open_control_panel()
-
-        # Командная строка
-        cmd_keywords = [
-            "командная строка", "cmd", "терминал",
-            "открой командную строку", "запусти cmd",
-            "открой терминал", "cmd",
-        ]
-        if any(keyword in t for keyword in cmd_keywords):
-            return self._open_cmd()
-
-        # PowerShell
-        powershell_keywords = [
-            "powershell", "power shell",
-            "открой powershell", "запусти powershell",
-        ]
-        if any(keyword in t for keyword in powershell_keywords):
-            return self._open_powershell()
-
-        # Steam
-        steam_keywords = [
-            "steam", "стим",
-            "открой steam", "запусти steam",
-            "steam открой", "стим",
-        ]
-        if any(keyword in t for keyword in steam_keywords):
-            return self._open_steam()
-
-        # Discord
-        discord_keywords = [
-            "discord", "дискорд",
-            "открой discord", "запусти discord",
-            "discord открой", "дискорд",
-        ]
-        if any(keyword in t for keyword in discord_keywords):
-            return self._open_discord()
-
-        # Telegram
-        telegram_keywords = [
-            "telegram", "телеграм", "телеграмм",
-            "открой telegram", "запусти telegram",
-            "telegram открой", "телеграм",
-        ]
-        if any(keyword in t for keyword in telegram_keywords):
-            return self._open_telegram()
-
-        # Spotify
-        spotify_keywords = [
-            "spotify", "спотифай",
-            "открой spotify", "запусти spotify",
-            "spotify открой", "спотифай",
-        ]
-        if any(keyword in t for keyword in spotify_keywords):
-            return self._open_spotify()
-
-        # VLC
-        vlc_keywords = [
-            "vlc", "ви эль си",
-            "открой vlc", "запусти vlc",
-            "vlc открой",
-        ]
-        if any(keyword in t for keyword in vlc_keywords):
-            return self._open_vlc()
-
-        # Paint
-        paint_keywords = [
-            "paint", "краска", "рисование",
-            "открой paint", "запусти paint",
-            "paint открой", "краска",
-        ]
-        if any(keyword in t for keyword in paint_keywords):
-            return self._open_paint()
-
-        # Word
-        word_keywords = [
-            "word", "ворд", "microsoft word",
-            "открой word", "запусти word",
-            "word открой", "ворд",
-        ]
-        if any(keyword in t for keyword in word_keywords):
-            return self._open_word()
-
-        # Excel
-        excel_keywords = [
-            "excel", "эксель", "microsoft excel",
-            "открой excel", "запусти excel",
-            "excel открой", "эксель",
-        ]
-        if any(keyword in t for keyword in excel_keywords):
-            return self._open_excel()
+        # Приложения и папки — по таблице APP_COMMANDS
+        for name, keywords, handler in APP_COMMANDS:
+            if any(keyword in t for keyword in keywords):
+                self.logger.info(f"CommandRouter: распознана команда '{name}' из '{text}'")
+                return getattr(self, handler)()
 
         # Обновление
-        update_keywords = [
-            "обнови", "обновить", "обновление",
-            "обнови jarvis", "обнови джарвис",
-            "запусти обновление", "проверь обновления",
-            "update", "check for updates",
-        ]
-        if any(keyword in t for keyword in update_keywords):
+        if any(keyword in t for keyword in UPDATE_KEYWORDS):
             if self.runtime and self.runtime.updater:
                 self.logger.info(f"CommandRouter: распознана команда обновления из '{text}'")
                 return self._update_jarvis()
@@ -289,23 +267,11 @@ class CommandRouter:
                 return JarvisVoice.error_unsupported()
         
         # Обновление Jarvis
-        update_keywords = [
-            "обнови jarvis", "обновить jarvis", "обнови джарвис", "обновить джарвис",
-            "обнови приложение", "обновить приложение",
-            "проверь обновления", "проверить обновления",
-            "update jarvis", "update", "обновление",
-        ]
-        if any(keyword in t for keyword in update_keywords):
+        if any(keyword in t for keyword in UPDATE_JARVIS_KEYWORDS):
             return self._update_jarvis()
         
         # Системные команды (безопасные)
-        if "перезагрузи компьютер" in t or "перезагрузить компьютер" in t:
-            return JarvisVoice.error_unsupported()
-        if "выключи компьютер" in t or "выключить компьютер" in t:
-            return JarvisVoice.error_unsupported()
-        if "выключи звук" in t or "отключи звук" in t or "убери звук" in t:
-            return JarvisVoice.error_unsupported()
-        if "включи звук" in t or "включи звук" in t:
+        if any(keyword in t for keyword in SYSTEM_KEYWORDS):
             return JarvisVoice.error_unsupported()
 
         self.logger.warning(f"CommandRouter: команда не распознана: '{text}'")
@@ -1,6 +1,7 @@
 from __future__ import annotations
 
 import logging
+import time
 from dataclasses import dataclass
 from typing import Optional, Tuple
 
@@ -11,6 +12,15 @@ try:
 except ImportError:
     CONTEXT_AVAILABLE = False
 
+# Ключевые слова контекстно-зависимых команд
+CONTEXT_KEYWORDS = {
+    "close": ["закрой", "закрыть", "close"],
+    "refresh": ["обнови", "обновить", "refresh", "reload"],
+    "pause": ["пауза", "паузу", "pause", "стоп", "останови"],
+    "next": ["дальше", "следующий", "next", "skip"],
+    "previous": ["назад", "предыдущий", "previous", "back"],
+}
+
 
 @dataclass
 class WindowContext:
@@ -23,7 +33,7 @@ class WindowContext:
 class ContextAware:
     """Определяет контекст активного окна для контекстно-зависимых команд"""
     
-    def __init__(self):
+    def __init__(self, snapshot_ttl_s: float = 5.0):
         if not CONTEXT_AVAILABLE:
             raise ImportError(
                 "pygetwindow и pyautogui не установлены. "
@@ -32,6 +42,13 @@ class ContextAware:
         
         self.logger = logging.getLogger("jarvis")
         
+        # Снимок активного окна: одна команда спрашивает окно несколько раз, а prewarm
+        # после wake word делает запрос заранее, пока пользователь формулирует команду.
+        # После команды снимок сбрасывается: она могла сменить активное окно
+        self.snapshot_ttl_s = snapshot_ttl_s
+        self._snapshot: Optional[WindowContext] = None
+        self._snapshot_at = 0.0
+        
         # Маппинг названий приложений для определения контекста
         self.app_keywords = {
             "browser": ["chrome", "firefox", "edge", "opera", "brave", "yandex", "браузер"],
@@ -43,7 +60,18 @@ class ContextAware:
         }
     
     def get_active_window(self) -> Optional[WindowContext]:
-        """Получает информацию об активном окне"""
+        """Получает информацию об активном окне (снимок не старше snapshot_ttl_s)"""
+        if self._snapshot is not None and time.monotonic() - self._snapshot_at < self.snapshot_ttl_s:
+            return self._snapshot
+        return self.refresh()
+    
+    def refresh(self) -> Optional[WindowContext]:
+        """Запрашивает активное окно у системы и обновляет снимок"""
+        self._snapshot = self._query_active_window()
+        self._snapshot_at = time.monotonic()
+        return self._snapshot
+    
+    def _query_active_window(self) -> Optional[WindowContext]:
         try:
             active = gw.getActiveWindow()
             if not active:
@@ -111,6 +139,12 @@ class ContextAware:
         Returns:
             Tuple[успех, сообщение для JarvisVoice]
         """
+        try:
+            return self._execute_context_command(command)
+        finally:
+            self._snapshot = None
+    
+    def _execute_context_command(self, command: str) -> Tuple[bool, Optional[str]]:
         context = self.get_active_window()
         if not context:
             from jarvis.core.jarvis_voice import JarvisVoice
@@ -119,32 +153,32 @@ class ContextAware:
         command_lower = command.lower()
         
         # Команда "закрой" - закрыть активное окно
-        if any(cmd in command_lower for cmd in ["закрой", "закрыть", "close"]):
+        if any(cmd in command_lower for cmd in CONTEXT_KEYWORDS["close"]):
             return self._close_window(context)
         
         # Команда "обнови" - обновить страницу в браузере
-        if any(cmd in command_lower for cmd in ["обнови", "обновить", "refresh", "reload"]):
+        if any(cmd in command_lower for cmd in CONTEXT_KEYWORDS["refresh"]):
             if context.app_name == "browser":
                 return self._refresh_browser()
             from jarvis.core.jarvis_voice import JarvisVoice
             return False, JarvisVoice.error_unsupported()
         
         # Команда "пауза" - пауза в медиаплеере или YouTube
-        if any(cmd in command_lower for cmd in ["пауза", "паузу", "pause", "стоп", "останови"]):
+        if any(cmd in command_lower for cmd in CONTEXT_KEYWORDS["pause"]):
             if context.app_name == "media" or self.is_youtube_active():
                 return self._pause_media()
             from jarvis.core.jarvis_voice import JarvisVoice
             return False, JarvisVoice.error_unsupported()
         
         # Команда "дальше" / "следующий" - следующий трек/видео
-        if any(cmd in command_lower for cmd in ["дальше", "следующий", "next", "skip"]):
+        if any(cmd in command_lower for cmd in CONTEXT_KEYWORDS["next"]):
             if context.app_name == "media" or self.is_youtube_active():
                 return self._next_media()
             from jarvis.core.jarvis_voice import JarvisVoice
             return False, JarvisVoice.error_unsupported()
         
         # Команда "назад" / "предыдущий" - предыдущий трек/видео
-        if any(cmd in command_lower for cmd in ["назад", "предыдущий", "previous", "back"]):
+        if any(cmd in command_lower for cmd in CONTEXT_KEYWORDS["previous"]):
             if context.app_name == "media" or self.is_youtube_active():
                 return self._previous_media()
             from jarvis.core.jarvis_voice import JarvisVoice
@@ -1,14 +1,20 @@
 from __future__ import annotations
 
 import logging
+import threading
+from collections import deque
+from concurrent.futures import TimeoutError as FuturesTimeoutError
 from dataclasses import dataclass
 
 from jarvis.app.config import AppConfig
 from jarvis.core.command_router import CommandRouter
-from jarvis.core.record import RecordConfig, SpeechListener
-from jarvis.core.speech_to_text import SpeechToText
+from jarvis.core.denoise import SpectralGate
+from jarvis.core.keyword_spotter import KeywordSpotter
+from jarvis.core.record import AudioSource, RecordConfig, SpeechListener
+from jarvis.core.speech_to_text import Hypothesis, SpeechToText, StreamingTranscriber
+from jarvis.core.stt_executor import STTExecutor
 from jarvis.core.text_to_speech import TextToSpeech, Pyttsx3Backend
-from jarvis.core.wake_word import has_wake_word, extract_command
+from jarvis.core.wake_word import WAKE_WORD, command_after, find_wake_word, has_wake_word
 from jarvis.core.jarvis_voice import JarvisVoice
 from jarvis.memory.memory import SimpleMemory
 from jarvis.core.performance import PerformanceStats, timer
@@ -25,10 +31,28 @@ class Conversation:
     perf_callback: callable | None = None
     tts_external: TextToSpeech | None = None
     stt_external: SpeechToText | None = None
+    listener_external: SpeechListener | None = None
+    audio_source: AudioSource | None = None
+    denoiser: SpectralGate | None = None
+    stt_executor: STTExecutor | None = None
+    spotter: KeywordSpotter | None = None  # Детектор wake word: без него STT получает каждую фразу
+    router_external: CommandRouter | None = None
+    prewarm: callable | None = None  # Прогрев подсистем после wake word, пока пользователь говорит команду
 
     def __post_init__(self) -> None:
         # Инициализация основных компонентов диалога
-        self.listener = SpeechListener(config=RecordConfig())
+        # Listener из runtime, либо свой поверх переданного источника (микрофон по умолчанию)
+        if self.listener_external is not None:
+            self.listener = self.listener_external
+        else:
+            self.listener = SpeechListener(config=RecordConfig(
+                source=self.audio_source,
+                noise_suppression=self.config.noise_suppression,
+                idle_after_s=self.config.idle_after_s,
+            ))
+        # Подавление шума между SpeechListener и SpeechToText (опционально)
+        if self.denoiser is None and self.config.noise_suppression:
+            self.denoiser = SpectralGate(profile=self.listener.noise_profile)
         self._last_tts_time = 0  # Время последнего TTS для фильтрации
         self._last_command = ""  # Последняя выполненная команда для фильтрации повторов
         # Используем STT из runtime если передан, иначе создаём свой (Google по умолчанию)
@@ -42,9 +66,172 @@ class Conversation:
             self.tts = self.tts_external
         else:
             self.tts = TextToSpeech(backend=Pyttsx3Backend(rate=180))
-        self.router = CommandRouter()
+        self.router = self.router_external if self.router_external is not None else CommandRouter()
+        self._prewarm_thread: threading.Thread | None = None
         self.memory = SimpleMemory()
         self.perf = self.perf_external if self.perf_external is not None else PerformanceStats()
+        if self.listener.perf_callback is None:
+            self.listener.perf_callback = lambda n, d: self._on_perf(n, d)
+        # Потоковое распознавание: промежуточные гипотезы, пока пользователь говорит
+        # (Vosk принимает кадры по мере записи, поэтому для него поток включён всегда)
+        self.streaming: StreamingTranscriber | None = None
+        if self.config.stt_streaming or self.stt.backend.incremental:
+            self.streaming = StreamingTranscriber(
+                stt=self.stt,
+                listener=self.listener,
+                interval_ms=self.config.stt_stream_interval_ms,
+                on_partial=self._on_partial,
+                preprocess=self._denoise if self.denoiser is not None else None,
+                reuse_partial=self.config.stt_reuse_partial,
+            )
+        # Фразы, отправленные в пул STT и ещё не обработанные циклом (в порядке речи)
+        self._in_flight: deque = deque()
+
+    def _denoise(self, audio):
+        try:
+            # Стоимость подавления шума пишется в PerformanceStats на каждую фразу
+            with timer("denoise_ms", lambda n, d: self._on_perf(n, d)):
+                return self.denoiser.process(audio)
+        except Exception as e:
+            self.logger.warning(f"Conversation: Ошибка подавления шума, распознаю исходное аудио: {e}")
+            return audio
+
+    def _recognize(self, audio):
+        # Фраза от SpeechListener -> (подавление шума) -> SpeechToText
+        if self.denoiser is not None:
+            audio = self._denoise(audio)
+        if self.config.profile:
+            with timer("stt_ms", lambda n, d: self._on_perf(n, d)):
+                return self.stt.recognize(audio)
+        return self.stt.recognize(audio)
+
+    def _on_partial(self, hypothesis: Hypothesis) -> None:
+        self.logger.debug(f"Conversation: Промежуточная гипотеза ({hypothesis.audio_s:.1f} с): '{hypothesis.text}'")
+
+    def _start_prewarm(self) -> None:
+        """Прогревает подсистемы в фоне, пока пользователь формулирует команду после «Да, сэр.»
+
+        После долгого простоя модели и соединения остывают; первая команда
+        тогда была бы медленнее обычной. Прогрев не блокирует ожидание команды.
+        """
+        if self.prewarm is None or (self._prewarm_thread is not None and self._prewarm_thread.is_alive()):
+            return
+
+        def _prewarm_thread():
+            try:
+                self.prewarm()
+            except Exception as e:
+                self.logger.warning(f"Conversation: Ошибка прогрева: {e}")
+
+        self._prewarm_thread = threading.Thread(target=_prewarm_thread, daemon=True, name="Prewarm")
+        self._prewarm_thread.start()
+
+    def _listen_text(self, gate: bool = True) -> tuple[bool, str | None]:
+        """Ждёт фразу и распознаёт её: (получено ли аудио, текст)
+
+        С детектором wake word (gate=True) в STT идёт только то, что сказано
+        после «джарвис»; команду после «Да, сэр.» ждём без детектора (gate=False).
+        """
+        if gate and self.spotter is not None:
+            return self._listen_text_gated()
+        if self.streaming is not None:
+            # Финал готов почти сразу после конца речи: декодирование шло, пока пользователь говорил
+            if self.config.profile:
+                with timer("stt_ms", lambda n, d: self._on_perf(n, d)):
+                    return self.streaming.listen()
+            return self.streaming.listen()
+        if self._pool_open():
+            return self._listen_text_pooled()
+        audio = self.listener.listen_once()
+        if audio is None:
+            return False, None
+        self.logger.debug("Conversation: Аудио получено, начинаю распознавание...")
+        return True, self._recognize(audio)
+
+    def _listen_text_gated(self) -> tuple[bool, str | None]:
+        """Фраза проходит через детектор wake word; STT — только для аудио после него"""
+        audio = self.listener.listen_once()
+        if audio is None:
+            return False, None
+        result = self.spotter.spot(audio)
+        if self.config.profile:
+            self._on_perf("wake_spot_ms", result.cpu_ms)
+        if not result.fired:
+            self.logger.debug(f"Conversation: Wake word не найден (расстояние {result.distance:.3f}), STT пропущен")
+            return True, None
+        self.logger.debug(
+            f"Conversation: Wake word найден ({result.start_s:.2f}-{result.end_s:.2f} с, расстояние {result.distance:.3f})"
+        )
+        if result.command_audio is None:
+            # Только «джарвис» — дальше обычный путь: «Да, сэр.» и ожидание команды
+            return True, WAKE_WORD
+        if self._pool_open():
+            audio = self._denoise(result.command_audio) if self.denoiser is not None else result.command_audio
+            started = time.perf_counter()
+            command = self._pool_result(self.stt_executor.submit(audio), audio)
+            if self.config.profile:
+                self._on_perf("stt_ms", (time.perf_counter() - started) * 1000.0)
+        else:
+            command = self._recognize(result.command_audio)
+        if not command:
+            # Команду не разобрали — переспрашиваем; ложное срабатывание учтётся, если и ответа не будет
+            return True, WAKE_WORD
+        return True, f"{WAKE_WORD} {command}"
+
+    def _listen_text_pooled(self) -> tuple[bool, str | None]:
+        """Распознавание в пуле процессов: пока старшая фраза декодируется, принимаем следующие"""
+        while True:
+            if self._in_flight and self._in_flight[0][0].done():
+                future, submitted_at, audio = self._in_flight.popleft()
+                text = self._pool_result(future, audio)
+                if self.config.profile:
+                    self._on_perf("stt_ms", (time.perf_counter() - submitted_at) * 1000.0)
+                return True, text
+            if not self._in_flight and not self._pool_open():
+                # Пул закрылся, а фраз в полёте не осталось — дальше распознаём в основном процессе
+                audio = self.listener.listen_once()
+                if audio is None:
+                    return False, None
+                return True, self._recognize(audio)
+            # С фразами в полёте ждём микрофон короткими интервалами, чтобы не задерживать результат
+            audio = self.listener.listen_once(timeout=0.05 if self._in_flight else None)
+            if audio is not None:
+                if self.denoiser is not None:
+                    audio = self._denoise(audio)
+                self._in_flight.append((self.stt_executor.submit(audio), time.perf_counter(), audio))
+                self.logger.debug(f"Conversation: Фраза отправлена в пул STT, в очереди: {self.stt_executor.queue_depth}")
+                continue
+            if not self._in_flight:
+                return False, None
+            if self.listener.exhausted:
+                # Новых фраз не будет — просто ждём распознавания
+                future, submitted_at, audio = self._in_flight.popleft()
+                text = self._pool_result(future, audio)
+                if self.config.profile:
+                    self._on_perf("stt_ms", (time.perf_counter() - submitted_at) * 1000.0)
+                return True, text
+
+    def _pool_open(self) -> bool:
+        """Пул STT есть и принимает фразы (после гибели всех воркеров он закрывается)"""
+        return self.stt_executor is not None and not self.stt_executor.closed
+
+    def _pool_result(self, future, audio) -> str | None:
+        """Результат пула STT с ограничением ожидания: зависший воркер не блокирует диалог
+
+        Фразу, потерянную пулом (воркер упал, пул закрылся), распознаём
+        в основном процессе. audio — уже очищенная от шума фраза.
+        """
+        try:
+            text = future.result(timeout=self.stt_executor.result_timeout_s)
+        except FuturesTimeoutError:
+            self.logger.warning(
+                f"Conversation: Пул STT не ответил за {self.stt_executor.result_timeout_s:.0f} с, фраза пропущена"
+            )
+            return None
+        if text is None and getattr(future, "lost", False):
+            self.logger.warning("Conversation: Пул STT потерял фразу, распознаю в основном процессе")
+            return self.stt.recognize(audio)
+        return text
 
     def _interactive_loop(self) -> None:
         self.logger.info("=" * 60)
@@ -65,20 +252,18 @@ class Conversation:
         while True:
             try:
                 self.logger.debug("Conversation: Ожидание аудио от микрофона...")
-                audio = self.listener.listen_once()
-                if audio is None:
-                    self.logger.debug("Conversation: Аудио не получено (тайм-аут или ошибка)")
-                    continue
-                self.logger.debug("Conversation: Аудио получено, начинаю распознавание...")
                 try:
-                    if self.config.profile:
-                        with timer("stt_ms", lambda n, d: self._on_perf(n, d)):
-                            text = self.stt.recognize(audio)
-                    else:
-                        text = self.stt.recognize(audio)
+                    got_audio, text = self._listen_text()
                 except Exception as e:
                     self.logger.warning(f"Ошибка распознавания речи: {e}")
                     continue
+                if not got_audio:
+                    if self.listener.exhausted:
+                        self.logger.info("Conversation: Источник аудио закончился, выхожу из интерактивного режима")
+                        self.listener.close()
+                        break
+                    self.logger.debug("Conversation: Аудио не получено (тайм-аут или ошибка)")
+                    continue
                 if not text:
                     self.logger.debug("Текст не распознан.")
                     continue
@@ -131,14 +316,15 @@ class Conversation:
                 self.memory.add_user(text)
                 total_messages = len(self.memory.user_history) + len(self.memory.assistant_history)
                 self.logger.debug(f"Conversation: Текст добавлен в память. Всего сообщений: {total_messages}")
-                if has_wake_word(text):
+                wake = find_wake_word(text)  # Границы wake word: команда извлекается без повторного поиска
+                if wake is not None:
                     # Останавливаем предыдущее воспроизведение при новой команде
                     if self.tts.is_speaking():
                         self.logger.debug("Conversation: Останавливаю предыдущее воспроизведение для новой команды")
                         self.tts.stop()
                     
                     # Пытаемся извлечь команду из той же фразы
-                    cmd_text = extract_command(text)
+                    cmd_text = command_after(text, wake)
                     if not cmd_text:
                         # Если команды нет в фразе, ждём следующую
                         try:
@@ -150,22 +336,18 @@ class Conversation:
                             self.logger.debug("Conversation: Быстрый ответ запущен асинхронно")
                         except Exception as e:
                             self.logger.warning(f"Ошибка TTS: {e}")
+                        self._start_prewarm()
                         self.logger.debug("Обнаружено ключевое слово. Ожидание команды...")
-                        audio_cmd = self.listener.listen_once()
-                        if audio_cmd is None:
-                            self.logger.debug("Тайм-аут ожидания команды.")
-                            continue
                         try:
-                            if self.config.profile:
-                                with timer("stt_ms", lambda n, d: self._on_perf(n, d)):
-                                    cmd_text = self.stt.recognize(audio_cmd)
-                            else:
-                                cmd_text = self.stt.recognize(audio_cmd)
+                            got_audio, cmd_text = self._listen_text(gate=False)
                         except Exception as e:
                             self.logger.warning(f"Ошибка распознавания команды: {e}")
                             continue
-                        if not cmd_text:
-                            self.logger.debug("Команда не распознана.")
+                        if not got_audio or not cmd_text:
+                            if self.spotter is not None:
+                                # Срабатывание детектора без команды — учитывается как вероятное ложное
+                                self.spotter.report_no_command()
+                            self.logger.debug("Тайм-аут ожидания команды." if not got_audio else "Команда не распознана.")
                             continue
                     else:
                         self.logger.info(f"Conversation: Команда извлечена из фразы: '{cmd_text}'")
@@ -222,6 +404,7 @@ class Conversation:
                 self.logger.info("Conversation: Остановлено пользователем (KeyboardInterrupt)")
                 self.logger.info("Conversation: Выход из интерактивного режима")
                 self.logger.info("=" * 60)
+                self.listener.close()
                 break
             except Exception as e:
                 self.logger.error("=" * 60)
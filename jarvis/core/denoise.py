@@ -0,0 +1,152 @@
+from __future__ import annotations
+
+import threading
+from functools import lru_cache
+from typing import Optional
+
+import numpy as np
+
+from jarvis.core.audio import TARGET_RATE, AudioFrame, float32_to_pcm16
+
+
+@lru_cache(maxsize=4)
+def _window(n_fft: int) -> np.ndarray:
+    window = np.hanning(n_fft + 1)[:-1].astype(np.float32)
+    window.setflags(write=False)
+    return window
+
+
+def _stft(x: np.ndarray, n_fft: int, hop: int) -> np.ndarray:
+    """STFT с центрированием: кадры — view на сигнал, БПФ одним вызовом"""
+    pad = n_fft // 2
+    padded = np.pad(x, pad, mode="reflect" if len(x) > pad else "constant")
+    if len(padded) < n_fft:
+        padded = np.pad(padded, (0, n_fft - len(padded)))
+    frames = np.lib.stride_tricks.sliding_window_view(padded, n_fft)[::hop]
+    return np.fft.rfft(frames * _window(n_fft), axis=1)
+
+
+def _istft(spec: np.ndarray, n_fft: int, hop: int, length: int) -> np.ndarray:
+    """Обратное STFT с перекрытием-сложением (hop должен делить n_fft)"""
+    window = _window(n_fft)
+    frames = np.fft.irfft(spec, n=n_fft, axis=1).astype(np.float32) * window
+    n_frames = frames.shape[0]
+    overlap = n_fft // hop
+    out = np.zeros((n_frames + overlap - 1) * hop, dtype=np.float32)
+    norm = np.zeros_like(out)
+    win_sq = np.square(window)
+    # Сложение по фазам перекрытия: overlap векторных операций вместо цикла по кадрам
+    for k in range(overlap):
+        part = frames[:, k * hop:(k + 1) * hop].reshape(-1)
+        out[k * hop:k * hop + part.size] += part
+        norm[k * hop:k * hop + part.size] += np.tile(win_sq[k * hop:(k + 1) * hop], n_frames)
+    out /= np.maximum(norm, 1e-6)
+    pad = n_fft // 2
+    return out[pad:pad + length]
+
+
+def _box_smooth(x: np.ndarray, width: int, axis: int) -> np.ndarray:
+    """Скользящее среднее шириной width вдоль оси axis (через кумулятивные суммы)"""
+    if width <= 1 or x.shape[axis] == 0:
+        return x
+    pad = [(0, 0)] * x.ndim
+    pad[axis] = (width // 2, width - 1 - width // 2)
+    c = np.cumsum(np.pad(x, pad, mode="edge"), axis=axis, dtype=np.float32)
+    zero_shape = list(c.shape)
+    zero_shape[axis] = 1
+    c = np.concatenate([np.zeros(zero_shape, dtype=np.float32), c], axis=axis)
+    n = x.shape[axis]
+    upper = np.take(c, np.arange(width, width + n), axis=axis)
+    lower = np.take(c, np.arange(n), axis=axis)
+    return (upper - lower) / float(width)
+
+
+class NoiseProfile:
+    """Скользящий спектр фонового шума
+
+    SpeechListener передаёт сюда блоки без речи; спектр усредняется
+    экспоненциально, так что профиль следует за изменением фона в комнате.
+    Обновление и чтение идут из разных потоков — массив заменяется целиком.
+    """
+
+    def __init__(self, n_fft: int = 512, hop: int = 128, smoothing: float = 0.9) -> None:
+        self.n_fft = n_fft
+        self.hop = hop
+        self.smoothing = smoothing
+        self.blocks_seen = 0
+        self._spectrum: Optional[np.ndarray] = None
+        self._lock = threading.Lock()
+
+    @property
+    def spectrum(self) -> Optional[np.ndarray]:
+        """Средняя амплитуда шума по частотным полосам (None до первого блока)"""
+        return self._spectrum
+
+    def update(self, samples: np.ndarray) -> None:
+        """Учитывает блок тишины (float32 [-1, 1] или int16)"""
+        x = np.asarray(samples).reshape(-1)
+        if x.dtype == np.int16:
+            x = x.astype(np.float32) / 32768.0
+        if len(x) < self.n_fft:
+            return
+        block = np.abs(_stft(x.astype(np.float32, copy=False), self.n_fft, self.hop)).mean(axis=0)
+        with self._lock:
+            if self._spectrum is None:
+                spectrum = block
+            else:
+                spectrum = self.smoothing * self._spectrum + (1.0 - self.smoothing) * block
+            self._spectrum = spectrum.astype(np.float32)
+            self.blocks_seen += 1
+
+
+class SpectralGate:
+    """Подавление шума спектральным гейтом перед STT
+
+    Полосы STFT, где амплитуда не превышает шум больше чем на threshold_db,
+    ослабляются на reduction_db. Маска сглаживается по времени и частоте,
+    чтобы не было «музыкального» шума. Без накопленного профиля шум
+    оценивается по самой фразе (нижний перцентиль амплитуд в каждой полосе).
+    Вся обработка — несколько векторных операций NumPy, фраза в несколько
+    секунд обрабатывается за единицы миллисекунд.
+    """
+
+    def __init__(
+        self,
+        profile: Optional[NoiseProfile] = None,
+        threshold_db: float = 6.0,
+        reduction_db: float = 18.0,
+        smooth_bins: int = 3,
+        smooth_frames: int = 5,
+        sample_rate: int = TARGET_RATE,
+    ) -> None:
+        self.profile = profile
+        self.n_fft = profile.n_fft if profile is not None else 512
+        self.hop = profile.hop if profile is not None else 128
+        self.threshold = float(10.0 ** (threshold_db / 20.0))
+        self.floor_gain = float(10.0 ** (-reduction_db / 20.0))
+        self.smooth_bins = smooth_bins
+        self.smooth_frames = smooth_frames
+        self.sample_rate = sample_rate
+
+    def _noise_spectrum(self, magnitude: np.ndarray) -> np.ndarray:
+        if self.profile is not None and self.profile.spectrum is not None:
+            return self.profile.spectrum
+        return np.percentile(magnitude, 20.0, axis=0).astype(np.float32)
+
+    def process(self, audio: AudioFrame) -> AudioFrame:
+        """Возвращает очищенную фразу (16 кГц, 16-bit моно)"""
+        audio = AudioFrame.wrap(audio)
+        x = audio.float32(self.sample_rate)
+        if len(x) < self.n_fft:
+            return audio
+        spec = _stft(x, self.n_fft, self.hop)
+        magnitude = np.abs(spec)
+        noise = self._noise_spectrum(magnitude)
+        mask = (magnitude > noise[None, :] * self.threshold).astype(np.float32)
+        mask = _box_smooth(_box_smooth(mask, self.smooth_bins, axis=1), self.smooth_frames, axis=0)
+        gain = self.floor_gain + (1.0 - self.floor_gain) * mask
+        y = _istft(spec * gain, self.n_fft, self.hop, len(x))
+        cleaned = AudioFrame(float32_to_pcm16(y), self.sample_rate, 2, segmented=audio.segmented)
+        # Положение в потоке слушателя нужно потоковому STT (Vosk продолжает распознаватель по нему)
+        cleaned.stream_range = audio.stream_range
+        return cleaned
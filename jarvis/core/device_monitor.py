@@ -0,0 +1,237 @@
+from __future__ import annotations
+
+import logging
+import multiprocessing as mp
+import threading
+import time
+from dataclasses import dataclass
+from typing import Callable, List, Optional, Tuple
+
+# Проверка доступности PyAudio
+try:
+    import pyaudio
+    PYAUDIO_AVAILABLE = True
+except ImportError:
+    PYAUDIO_AVAILABLE = False
+
+
+@dataclass(frozen=True)
+class AudioDevice:
+    index: int
+    name: str
+    host_api: int
+    max_input_channels: int
+    default_sample_rate: float
+    is_default: bool = False
+
+    @property
+    def key(self) -> Tuple[str, int]:
+        # Индексы PortAudio сдвигаются при подключении устройств, поэтому сравниваем по имени
+        return self.name, self.host_api
+
+
+def _enumerate_in_process() -> List[AudioDevice]:
+    """Опрос PortAudio в текущем процессе (верен, только если здесь нет других экземпляров PyAudio)"""
+    pa = pyaudio.PyAudio()
+    try:
+        try:
+            default_index = int(pa.get_default_input_device_info()["index"])
+        except (IOError, OSError):
+            default_index = -1
+        devices = []
+        for i in range(pa.get_device_count()):
+            info = pa.get_device_info_by_index(i)
+            if int(info.get("maxInputChannels", 0)) <= 0:
+                continue
+            devices.append(AudioDevice(
+                index=i,
+                name=str(info.get("name", f"device {i}")),
+                host_api=int(info.get("hostApi", 0)),
+                max_input_channels=int(info.get("maxInputChannels", 0)),
+                default_sample_rate=float(info.get("defaultSampleRate", 0.0)),
+                is_default=i == default_index,
+            ))
+        return devices
+    finally:
+        pa.terminate()
+
+
+def _enumerate_worker(conn) -> None:
+    try:
+        conn.send(_enumerate_in_process())
+    except Exception as e:
+        conn.send(RuntimeError(f"{type(e).__name__}: {e}"))
+    finally:
+        conn.close()
+
+
+def enumerate_input_devices(timeout: float = 5.0) -> List[AudioDevice]:
+    """Полный опрос устройств ввода в короткоживущем процессе
+
+    PortAudio перечитывает список устройств только при первой инициализации
+    в процессе: пока поток захвата держит свой PyAudio, новый экземпляр
+    рядом с ним видит старый список. Свежий процесс всегда видит реальный
+    список, а медленная инициализация PortAudio не отнимает GIL у захвата.
+    """
+    if not PYAUDIO_AVAILABLE:
+        return []
+    ctx = mp.get_context("spawn")
+    receiver, sender = ctx.Pipe(duplex=False)
+    process = ctx.Process(target=_enumerate_worker, args=(sender,), daemon=True, name="Audio-DeviceScan")
+    process.start()
+    sender.close()
+    try:
+        if not receiver.poll(timeout):
+            raise TimeoutError(f"опрос устройств не ответил за {timeout:.0f} с")
+        result = receiver.recv()
+    finally:
+        receiver.close()
+        process.join(timeout=1.0)
+        if process.is_alive():
+            process.kill()
+    if isinstance(result, Exception):
+        raise result
+    return result
+
+
+DeviceListener = Callable[[List[AudioDevice], List[AudioDevice]], None]
+
+
+class DeviceMonitor:
+    """Фоновый монитор устройств ввода с кэшем списка
+
+    Опрос PortAudio медленный, поэтому список обновляется в фоне раз в
+    interval_s, а health-check и SpeechListener читают кэш. Неудачный опрос
+    оставляет прежний список, чтобы не «отключить» все устройства разом. Подписчики
+    получают (добавленные, удалённые) после каждого опроса; poke() будит
+    монитор немедленно — например, когда поток захвата потерял устройство.
+    """
+
+    def __init__(self, interval_s: float = 2.0, enumerate_fn: Callable[[], List[AudioDevice]] = enumerate_input_devices) -> None:
+        self.interval_s = interval_s
+        self._enumerate = enumerate_fn
+        self._devices: Optional[List[AudioDevice]] = None
+        self._lock = threading.Lock()
+        self._listeners: List[DeviceListener] = []
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._logger = logging.getLogger("jarvis")
+        self.refreshes = 0
+        self.last_refresh_ms = 0.0
+
+    def devices(self) -> List[AudioDevice]:
+        """Кэшированный список устройств ввода (первый вызов опрашивает PortAudio)"""
+        if self._devices is None:
+            self.refresh()
+        return list(self._devices or [])
+
+    def refresh(self) -> Tuple[List[AudioDevice], List[AudioDevice]]:
+        """Перечитывает список устройств и возвращает (добавленные, удалённые)"""
+        start = time.perf_counter()
+        try:
+            current = self._enumerate()
+        except Exception as e:
+            self._logger.debug(f"DeviceMonitor: Ошибка опроса устройств: {e}")
+            with self._lock:
+                if self._devices is None:
+                    self._devices = []
+            return [], []
+        finally:
+            self.last_refresh_ms = (time.perf_counter() - start) * 1000.0
+            self.refreshes += 1
+        with self._lock:
+            previous = self._devices
+            self._devices = current
+        if previous is None:
+            return [], []
+        old_keys = {d.key for d in previous}
+        new_keys = {d.key for d in current}
+        added = [d for d in current if d.key not in old_keys]
+        removed = [d for d in previous if d.key not in new_keys]
+        for device in added:
+            self._logger.info(f"DeviceMonitor: Подключено устройство '{device.name}' (индекс {device.index})")
+        for device in removed:
+            self._logger.info(f"DeviceMonitor: Отключено устройство '{device.name}'")
+        return added, removed
+
+    def find(self, name: str) -> Optional[AudioDevice]:
+        for device in self.devices():
+            if device.name == name:
+                return device
+        return None
+
+    def by_index(self, index: int) -> Optional[AudioDevice]:
+        for device in self.devices():
+            if device.index == index:
+                return device
+        return None
+
+    def best_input(self, preferred_name: Optional[str] = None) -> Optional[AudioDevice]:
+        """Настроенное устройство, если оно есть, иначе системное по умолчанию, иначе первое"""
+        devices = self.devices()
+        if preferred_name:
+            for device in devices:
+                if device.name == preferred_name:
+                    return device
+        for device in devices:
+            if device.is_default:
+                return device
+        return devices[0] if devices else None
+
+    def subscribe(self, listener: DeviceListener) -> None:
+        with self._lock:
+            if listener not in self._listeners:
+                self._listeners.append(listener)
+        self.start()
+
+    def unsubscribe(self, listener: DeviceListener) -> None:
+        with self._lock:
+            if listener in self._listeners:
+                self._listeners.remove(listener)
+
+    def poke(self) -> None:
+        """Запросить внеочередной опрос"""
+        self._wake.set()
+
+    def start(self) -> None:
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._loop, daemon=True, name="Audio-DeviceMonitor")
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        self._wake.set()
+        if self._thread is not None:
+            self._thread.join(timeout=2.0)
+        self._thread = None
+
+    def _loop(self) -> None:
+        while not self._stop.is_set():
+            self._wake.wait(self.interval_s)
+            self._wake.clear()
+            if self._stop.is_set():
+                break
+            added, removed = self.refresh()
+            with self._lock:
+                listeners = list(self._listeners)
+            for listener in listeners:
+                try:
+                    listener(added, removed)
+                except Exception as e:
+                    self._logger.warning(f"DeviceMonitor: Ошибка обработчика устройств: {e}", exc_info=True)
+
+
+_monitor: Optional[DeviceMonitor] = None
+_monitor_lock = threading.Lock()
+
+
+def get_device_monitor() -> DeviceMonitor:
+    """Общий монитор устройств процесса"""
+    global _monitor
+    with _monitor_lock:
+        if _monitor is None:
+            _monitor = DeviceMonitor()
+        return _monitor
@@ -0,0 +1,225 @@
+from __future__ import annotations
+
+from dataclasses import dataclass, field
+from functools import lru_cache
+from typing import List, Optional, Tuple
+
+import numpy as np
+
+from jarvis.core.audio import TARGET_RATE, AudioFrame
+from jarvis.core.vad import NoiseFloorTracker, StreamingVAD, frame_energy_zcr
+
+# Параметры анализа как у Whisper: окно 25 мс, шаг 10 мс, 80 мел-полос
+N_FFT = 400
+HOP_LENGTH = 160
+N_MELS = 80
+
+
+@lru_cache(maxsize=4)
+def mel_filters(sample_rate: int = TARGET_RATE, n_fft: int = N_FFT, n_mels: int = N_MELS) -> np.ndarray:
+    """Мел-фильтры (шкала и нормировка Slaney, как в librosa/Whisper), форма (n_mels, n_fft//2 + 1)"""
+    def hz_to_mel(f):
+        f = np.asarray(f, dtype=np.float64)
+        mel = f / (200.0 / 3)
+        log_region = f >= 1000.0
+        return np.where(log_region, 15.0 + np.log(np.maximum(f, 1e-10) / 1000.0) / (np.log(6.4) / 27.0), mel)
+
+    def mel_to_hz(m):
+        m = np.asarray(m, dtype=np.float64)
+        f = m * (200.0 / 3)
+        log_region = m >= 15.0
+        return np.where(log_region, 1000.0 * np.exp((np.log(6.4) / 27.0) * (m - 15.0)), f)
+
+    fft_freqs = np.linspace(0.0, sample_rate / 2.0, n_fft // 2 + 1)
+    mel_points = mel_to_hz(np.linspace(hz_to_mel(0.0), hz_to_mel(sample_rate / 2.0), n_mels + 2))
+    widths = np.diff(mel_points)
+    ramps = mel_points[:, None] - fft_freqs[None, :]
+    lower = -ramps[:-2] / widths[:-1, None]
+    upper = ramps[2:] / widths[1:, None]
+    weights = np.maximum(0.0, np.minimum(lower, upper))
+    weights *= (2.0 / (mel_points[2:] - mel_points[:-2]))[:, None]
+    weights = weights.astype(np.float32)
+    weights.setflags(write=False)
+    return weights
+
+
+@lru_cache(maxsize=4)
+def _hann(n_fft: int) -> np.ndarray:
+    window = np.hanning(n_fft + 1)[:-1].astype(np.float32)  # Периодическое окно, как torch.hann_window
+    window.setflags(write=False)
+    return window
+
+
+@dataclass
+class AcousticFeatures:
+    """Признаки одной фразы, посчитанные один раз и общие для всех потребителей
+
+    energy/zcr — по кадрам анализа (RMS в единицах int16, как у StreamingVAD),
+    speech_spans — участки речи в секундах. segmented_by показывает, кто
+    нашёл речь: "listener" (фразу уже нарезал SpeechListener) или "frontend".
+    Лог-мел спектрограмма считается лениво при первом обращении.
+    """
+
+    sample_rate: int
+    hop_samples: int
+    duration_s: float
+    energy: np.ndarray
+    zcr: np.ndarray
+    speech_spans: List[Tuple[float, float]]
+    segmented_by: str
+    _frames: np.ndarray = field(repr=False)
+    _n_mels: int = field(default=N_MELS, repr=False)
+    _log_mel: Optional[np.ndarray] = field(default=None, init=False, repr=False)
+
+    @property
+    def hop_s(self) -> float:
+        return self.hop_samples / float(self.sample_rate)
+
+    @property
+    def has_speech(self) -> bool:
+        return bool(self.speech_spans)
+
+    @property
+    def speech_bounds(self) -> Optional[Tuple[float, float]]:
+        """Начало первого и конец последнего участка речи"""
+        if not self.speech_spans:
+            return None
+        return self.speech_spans[0][0], self.speech_spans[-1][1]
+
+    @property
+    def log_mel(self) -> np.ndarray:
+        """Лог-мел спектрограмма (n_mels, n_frames), нормированная как вход Whisper"""
+        if self._log_mel is None:
+            n_fft = self._frames.shape[1]
+            # Последний кадр с центрированием Whisper отбрасывает — делаем так же
+            frames = self._frames[:-1] if len(self._frames) > 1 else self._frames
+            spectrum = np.fft.rfft(frames * _hann(n_fft), axis=1)
+            power = np.square(np.abs(spectrum), dtype=np.float32)
+            mel = mel_filters(self.sample_rate, n_fft, self._n_mels) @ power.T
+            log_spec = np.log10(np.maximum(mel, 1e-10))
+            log_spec = np.maximum(log_spec, log_spec.max() - 8.0)
+            log_mel = ((log_spec + 4.0) / 4.0).astype(np.float32)
+            log_mel.setflags(write=False)
+            self._log_mel = log_mel
+        return self._log_mel
+
+
+class FeatureFrontend:
+    """Общий акустический фронтенд: нарезка на кадры, энергия, ZCR и лог-мел
+
+    Считает признаки один раз на фразу и кэширует их на AudioFrame, так что
+    VAD, детектор ключевого слова и STT-бэкенды работают с одними данными.
+    Если фраза пришла не из SpeechListener (файл, старый режим), речь
+    находит StreamingVAD по тем же энергиям — повторный VAD внутри Whisper
+    после этого не нужен.
+    """
+
+    def __init__(
+        self,
+        sample_rate: int = TARGET_RATE,
+        n_fft: int = N_FFT,
+        hop_length: int = HOP_LENGTH,
+        n_mels: int = N_MELS,
+        hangover_ms: int = 300,
+        min_speech_ms: int = 150,
+        zcr_max: float = 0.45,
+        pad_s: float = 0.2,
+        noise_floor: Optional[NoiseFloorTracker] = None,
+    ) -> None:
+        self.sample_rate = sample_rate
+        self.n_fft = n_fft
+        self.hop_length = hop_length
+        self.n_mels = n_mels
+        self.hangover_ms = hangover_ms
+        self.min_speech_ms = min_speech_ms
+        self.zcr_max = zcr_max
+        self.pad_s = pad_s
+        # Оценка шума слушателя, если есть; иначе порог оценивается по самой фразе
+        self.noise_floor = noise_floor
+
+    def compute(self, audio: AudioFrame) -> AcousticFeatures:
+        """Возвращает признаки фразы (из кэша AudioFrame, если уже считались)"""
+        audio = AudioFrame.wrap(audio)
+        cached = audio._cache.get("features")
+        if cached is not None:
+            return cached
+
+        x = audio.float32(self.sample_rate)
+        pad = self.n_fft // 2
+        padded = np.pad(x, pad, mode="reflect" if len(x) > pad else "constant")
+        # Кадры — view на сигнал без копирования; один и тот же набор кадров идёт в энергию и в STFT
+        frames = np.lib.stride_tricks.sliding_window_view(padded, self.n_fft)[:: self.hop_length]
+        rms, zcr = frame_energy_zcr(frames)
+        rms = rms * 32768.0
+
+        duration_s = len(x) / float(self.sample_rate)
+        if audio.segmented:
+            spans = [(0.0, duration_s)] if len(x) else []
+            segmented_by = "listener"
+        else:
+            spans = self._detect_speech(rms, zcr, duration_s)
+            segmented_by = "frontend"
+
+        features = AcousticFeatures(
+            sample_rate=self.sample_rate,
+            hop_samples=self.hop_length,
+            duration_s=duration_s,
+            energy=rms,
+            zcr=zcr,
+            speech_spans=spans,
+            segmented_by=segmented_by,
+            _frames=frames,
+            _n_mels=self.n_mels,
+        )
+        audio._cache["features"] = features
+        return features
+
+    def _detect_speech(self, rms: np.ndarray, zcr: np.ndarray, duration_s: float) -> List[Tuple[float, float]]:
+        hop_ms = 1000.0 * self.hop_length / self.sample_rate
+        if self.noise_floor is not None and self.noise_floor.warmed_up:
+            threshold = self.noise_floor.threshold
+        else:
+            threshold = NoiseFloorTracker().update(rms)
+        vad = StreamingVAD(
+            frame_ms=max(1, int(round(hop_ms))),
+            hangover_ms=self.hangover_ms,
+            min_speech_ms=self.min_speech_ms,
+            max_utterance_s=max(1.0, duration_s + 1.0),
+            zcr_max=self.zcr_max,
+        )
+        _, events = vad.process_energy(rms, zcr, threshold)
+        hop_s = hop_ms / 1000.0
+        spans: List[Tuple[float, float]] = []
+        onset = None
+        for event in events:
+            if event.kind == "start":
+                onset = event.frame_offset
+            elif event.kind == "end" and onset is not None:
+                # Событие приходит после hangover кадров тишины — их в участок речи не включаем
+                spans.append((onset * hop_s, (event.frame_offset + 1 - vad.hangover_frames) * hop_s))
+                onset = None
+            else:
+                onset = None
+        if onset is not None and vad.speech_frames * hop_ms >= self.min_speech_ms:
+            spans.append((onset * hop_s, len(rms) * hop_s))
+
+        # Поля вокруг речи и склейка пересекающихся участков
+        merged: List[Tuple[float, float]] = []
+        for start, end in spans:
+            start, end = max(0.0, start - self.pad_s), min(duration_s, end + self.pad_s)
+            if merged and start <= merged[-1][1]:
+                merged[-1] = (merged[-1][0], max(merged[-1][1], end))
+            else:
+                merged.append((start, end))
+        return merged
+
+
+_default_frontend: Optional[FeatureFrontend] = None
+
+
+def get_features(audio: AudioFrame) -> AcousticFeatures:
+    """Признаки фразы через общий фронтенд по умолчанию"""
+    global _default_frontend
+    if _default_frontend is None:
+        _default_frontend = FeatureFrontend()
+    return _default_frontend.compute(audio)
@@ -6,6 +6,8 @@ from typing import Dict, Tuple
 
 import speech_recognition as sr
 
+from jarvis.core.device_monitor import PYAUDIO_AVAILABLE, get_device_monitor
+
 
 @dataclass
 class HealthReport:
@@ -30,11 +32,14 @@ class HealthReport:
 
 
 def check_microphone() -> Tuple[bool, str]:
+    # Список устройств берётся из кэша DeviceMonitor, а не опрашивается заново
     try:
-        names = sr.Microphone.list_microphone_names()
-        if not names:
+        if not PYAUDIO_AVAILABLE:
+            return False, "PyAudio not available"
+        devices = get_device_monitor().devices()
+        if not devices:
             return False, "No microphones detected"
-        return True, f"Found {len(names)} microphone(s)"
+        return True, f"Found {len(devices)} microphone(s)"
     except Exception as exc:
         return False, f"Error listing microphones: {exc}"
 
@@ -104,6 +104,15 @@ class JarvisVoice:
         "Сэр, я не распознал команду. Можете повторить?",
     ]
     
+    @staticmethod
+    def likely_responses() -> List[str]:
+        """Ответы, которые скорее всего прозвучат после команды (для предзагрузки аудио)"""
+        phrases = (
+            JarvisVoice.OPENING_BROWSER + JarvisVoice.OPENING_YOUTUBE + JarvisVoice.OPENING_APP
+            + JarvisVoice.OPENING_FOLDER + JarvisVoice.SUCCESS_ACTION + JarvisVoice.NOT_RECOGNIZED
+        )
+        return list(dict.fromkeys(phrases))
+    
     @staticmethod
     def get_random(phrases: List[str]) -> str:
         """Получить случайную фразу из списка"""
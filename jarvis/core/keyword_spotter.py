@@ -0,0 +1,274 @@
+from __future__ import annotations
+
+import logging
+import time
+from dataclasses import dataclass
+from functools import lru_cache
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence
+
+import numpy as np
+
+from jarvis.core.audio import TARGET_RATE, AudioFrame, read_wav
+from jarvis.core.batch_stt import find_wavs
+from jarvis.core.features import N_MELS, FeatureFrontend
+from jarvis.core.vad import NoiseFloorTracker
+
+WAKE_TEMPLATES_DIR = "wake_word"  # В data_dir: WAV-записи wake word («джарвис»), по одной на файл
+
+
+@lru_cache(maxsize=4)
+def _dct_matrix(n_mels: int = N_MELS, n_ceps: int = 13) -> np.ndarray:
+    """DCT-II (ортонормированная): лог-мел -> кепстр; первый коэффициент (громкость) отброшен"""
+    n = np.arange(n_mels, dtype=np.float64)
+    k = np.arange(1, n_ceps, dtype=np.float64)[:, None]
+    basis = np.cos(np.pi / n_mels * (n + 0.5) * k) * np.sqrt(2.0 / n_mels)
+    basis = basis.astype(np.float32)
+    basis.setflags(write=False)
+    return basis
+
+
+@dataclass
+class SpotResult:
+    """Результат проверки фразы на wake word"""
+    fired: bool
+    distance: float  # Нормированное DTW-расстояние до ближайшего шаблона (меньше — ближе)
+    start_s: float = 0.0  # Границы найденного wake word во фразе
+    end_s: float = 0.0
+    command_audio: Optional[AudioFrame] = None  # Аудио после wake word (None — после него нет речи)
+    cpu_ms: float = 0.0
+
+
+@dataclass
+class SpotterStats:
+    utterances: int = 0  # Фраз проверено
+    fired: int = 0  # Wake word найден
+    rejected: int = 0  # Не найден: STT для фразы не вызывался
+    wake_only: int = 0  # Найден, но после него нет речи (команда — следующей фразой)
+    no_command: int = 0  # Найден, но команда так и не распознана — вероятное ложное срабатывание
+    audio_s: float = 0.0
+    cpu_ms: float = 0.0
+
+
+class KeywordSpotter:
+    """Детектор wake word по аудио: STT запускается только после срабатывания
+
+    Работает на том же лог-мел фронтенде, что и STT (FeatureFrontend): из
+    лог-мел спектрограммы считаются 12 кепстральных коэффициентов на кадр
+    20 мс, и начало фразы сравнивается с записанными шаблонами «джарвис»
+    (WAV в data_dir/wake_word) через DTW с открытыми началом и концом.
+    Шаги DTW ограничивают темп речи от 0.5x до 2x шаблона, и каждая строка
+    шаблона зависит только от двух предыдущих, так что расчёт векторный по
+    кадрам фразы и по всем шаблонам сразу.
+
+    Найденный конец wake word задаёт аудио команды: в STT уходит только
+    то, что сказано после «джарвис». Фразы без wake word до STT не доходят.
+    """
+
+    STRIDE = 2  # Кадров фронтенда (10 мс) на кадр DTW
+
+    def __init__(
+        self,
+        templates: Sequence[AudioFrame],
+        threshold: Optional[float] = None,
+        search_s: float = 3.0,
+        min_command_ms: int = 150,
+        noise_floor: Optional[NoiseFloorTracker] = None,
+    ) -> None:
+        self.frontend = FeatureFrontend(noise_floor=noise_floor)
+        self.search_s = search_s  # Wake word ищется в начале фразы («Джарвис, открой браузер»)
+        self.min_command_ms = min_command_ms
+        self.noise_floor = noise_floor
+        self.stats = SpotterStats()
+        self._logger = logging.getLogger("jarvis")
+        self.templates: List[np.ndarray] = []
+        for audio in templates:
+            features = self._template_features(audio)
+            if features is not None:
+                self.templates.append(features)
+        if not self.templates:
+            raise ValueError("KeywordSpotter: нет шаблонов wake word с речью")
+        self._stack_templates()
+        self.threshold = threshold if threshold is not None else self._calibrate()
+        self._logger.info(f"KeywordSpotter: Шаблонов wake word: {len(self.templates)}, порог {self.threshold:.3f}")
+
+    @classmethod
+    def from_directory(cls, directory: Path, **kwargs) -> "KeywordSpotter":
+        """Шаблоны из WAV-файлов каталога (data_dir/wake_word)"""
+        templates = [AudioFrame(read_wav(path, TARGET_RATE), TARGET_RATE, 2) for path in find_wavs(directory)]
+        if not templates:
+            raise FileNotFoundError(f"В каталоге {directory} нет записей wake word (*.wav)")
+        return cls(templates, **kwargs)
+
+    # --- Признаки ---
+
+    def _cepstra(self, audio: AudioFrame) -> np.ndarray:
+        """(кадры по 20 мс, 12) кепстр с единичной нормой кадра — расстояние между кадрами косинусное
+
+        Среднее вычитается по всему фрагменту (шаблону или окну поиска), чтобы
+        микрофон и комната меньше влияли на расстояние. Пары кадров 10 мс
+        усредняются: DTW считает вчетверо меньше ячеек без потери различимости.
+        """
+        log_mel = self.frontend.compute(audio).log_mel
+        ceps = (_dct_matrix(log_mel.shape[0]) @ log_mel).T
+        n = len(ceps) // self.STRIDE * self.STRIDE
+        ceps = ceps[:n].reshape(-1, self.STRIDE, ceps.shape[1]).mean(axis=1)
+        ceps -= ceps.mean(axis=0)
+        return ceps / (np.linalg.norm(ceps, axis=1, keepdims=True) + 1e-6)
+
+    def _template_features(self, audio: AudioFrame) -> Optional[np.ndarray]:
+        # Запись шаблона обрезается по речи почти без полей: тишина вокруг слова сдвинула бы найденные границы
+        audio = AudioFrame(AudioFrame.wrap(audio).frame_data, audio.sample_rate, audio.sample_width)
+        bounds = FeatureFrontend(pad_s=0.03).compute(audio).speech_bounds
+        if bounds is None:
+            return None
+        features = self._cepstra(audio.crop(*bounds))
+        return features if len(features) >= 4 else None
+
+    def _stack_templates(self) -> None:
+        # Шаблоны разной длины — в один массив (дополнение нулями), чтобы DTW шёл по всем сразу
+        longest = max(len(t) for t in self.templates)
+        self._stacked = np.zeros((len(self.templates), longest, self.templates[0].shape[1]), dtype=np.float32)
+        for i, template in enumerate(self.templates):
+            self._stacked[i, : len(template)] = template
+        self._lengths = np.array([len(t) for t in self.templates])
+
+    def _calibrate(self) -> float:
+        """Порог по шаблонам: наибольшее расстояние от шаблона до ближайшего соседа с запасом"""
+        if len(self.templates) < 2:
+            return 0.35
+        nearest = []
+        for i, template in enumerate(self.templates):
+            distances, _, _ = self._match(template)
+            nearest.append(min(d for j, d in enumerate(distances) if j != i))
+        return float(min(0.5, max(0.2, max(nearest) * 1.5)))
+
+    # --- DTW ---
+
+    def _match(self, utterance: np.ndarray):
+        """DTW с открытыми началом и концом по всем шаблонам: (расстояния, кадры начала, кадры конца)
+
+        Шаги: (1, 1), (1, 2) — фраза медленнее шаблона, (2, 1) — быстрее.
+        Каждая строка шаблона входит в путь с весом 1, поэтому сумма делится
+        на длину шаблона. Строки считаются для всех шаблонов одновременно,
+        результат шаблона снимается на его последней строке.
+        """
+        n_k, n_t = self._stacked.shape[:2]
+        n_u = len(utterance)
+        distances = np.full(n_k, np.inf)
+        starts_out = np.zeros(n_k, dtype=np.int64)
+        ends_out = np.zeros(n_k, dtype=np.int64)
+        if n_u < 2:
+            return distances, starts_out, ends_out
+        inf = np.float32(np.inf)
+        cost = 1.0 - self._stacked @ utterance.T  # (шаблоны, строки, кадры), косинусное расстояние
+        half = np.full_like(cost, inf)
+        half[:, :, 1:] = (cost[:, :, :-1] + cost[:, :, 1:]) * 0.5  # Два кадра фразы на строку шаблона
+
+        # Строки хранятся с двумя бесконечными кадрами слева; строка -1 — виртуальное начало:
+        # путь может начаться с любого кадра фразы
+        prev = np.zeros((n_k, n_u + 2), dtype=np.float32)
+        prev2 = np.full_like(prev, inf)
+        start_prev = np.broadcast_to(np.arange(-1, n_u + 1), prev.shape).copy()
+        start_prev2 = np.zeros_like(start_prev)
+        for i in range(n_t):
+            row = prev[:, 1:-1] + cost[:, i]
+            starts = start_prev[:, 1:-1].copy()
+            slow = prev[:, :-2] + half[:, i]
+            better = slow < row
+            row = np.where(better, slow, row)
+            starts = np.where(better, start_prev[:, :-2], starts)
+            if i > 0:
+                fast = prev2[:, 1:-1] + cost[:, i - 1] + cost[:, i]
+                better = fast < row
+                row = np.where(better, fast, row)
+                starts = np.where(better, start_prev2[:, 1:-1], starts)
+            prev2, start_prev2 = prev, start_prev
+            prev = np.full_like(prev2, inf)
+            prev[:, 2:] = row
+            start_prev = np.zeros_like(start_prev2)
+            start_prev[:, 2:] = starts
+            for k in np.flatnonzero(self._lengths == i + 1):
+                end = int(np.argmin(row[k]))
+                distances[k] = row[k, end] / (i + 1)
+                starts_out[k], ends_out[k] = starts[k, end], end
+        return distances, starts_out, ends_out
+
+    # --- Детектор ---
+
+    def spot(self, audio: AudioFrame) -> SpotResult:
+        """Ищет wake word в начале фразы и отрезает аудио команды после него"""
+        start = time.perf_counter()
+        audio = AudioFrame.wrap(audio)
+        features = self.frontend.compute(audio)
+        # Спектр считается только для окна поиска, энергия всей фразы уже есть у фронтенда
+        utterance = self._cepstra(audio.crop(0.0, self.search_s) if audio.duration_s > self.search_s else audio)
+        distances, firsts, lasts = self._match(utterance)
+        best = int(np.argmin(distances))
+        distance = float(distances[best])
+        result = SpotResult(fired=distance <= self.threshold, distance=round(distance, 4))
+        if result.fired:
+            end_frame = (int(lasts[best]) + 1) * self.STRIDE  # Кадр фронтенда сразу после wake word
+            result.start_s = int(firsts[best]) * self.STRIDE * features.hop_s
+            result.end_s = end_frame * features.hop_s
+            result.command_audio = self._command_audio(audio, features, end_frame)
+        result.cpu_ms = (time.perf_counter() - start) * 1000.0
+
+        stats = self.stats
+        stats.utterances += 1
+        stats.audio_s += audio.duration_s
+        stats.cpu_ms += result.cpu_ms
+        if not result.fired:
+            stats.rejected += 1
+        else:
+            stats.fired += 1
+            if result.command_audio is None:
+                stats.wake_only += 1
+        return result
+
+    def _command_audio(self, audio: AudioFrame, features, end_frame: int) -> Optional[AudioFrame]:
+        """Аудио после wake word, если там есть речь не короче min_command_ms"""
+        energy = features.energy[end_frame:]
+        if self.noise_floor is not None and self.noise_floor.warmed_up:
+            threshold = self.noise_floor.threshold
+        else:
+            threshold = NoiseFloorTracker().update(features.energy)
+        speech_ms = int(np.count_nonzero(energy > threshold)) * features.hop_s * 1000.0
+        if speech_ms < self.min_command_ms:
+            return None
+        return audio.crop(end_frame * features.hop_s, audio.duration_s)
+
+    def report_no_command(self) -> None:
+        """Срабатывание не привело к команде (STT не нашёл текста) — вероятное ложное срабатывание"""
+        self.stats.no_command += 1
+
+    def evaluate(self, positives: Sequence[AudioFrame], negatives: Sequence[AudioFrame]) -> Dict[str, float]:
+        """Доля пропусков на записях с wake word и ложных срабатываний на записях без него"""
+        misses = sum(not self.spot(audio).fired for audio in positives)
+        false_accepts = sum(self.spot(audio).fired for audio in negatives)
+        negative_h = sum(AudioFrame.wrap(audio).duration_s for audio in negatives) / 3600.0
+        return {
+            "positives": len(positives),
+            "negatives": len(negatives),
+            "false_reject_rate": round(misses / len(positives), 4) if positives else 0.0,
+            "false_accept_rate": round(false_accepts / len(negatives), 4) if negatives else 0.0,
+            "false_accepts_per_hour": round(false_accepts / negative_h, 2) if negative_h else 0.0,
+            "threshold": round(self.threshold, 4),
+            **{k: v for k, v in self.snapshot().items() if k in ("avg_cpu_ms", "cpu_share")},
+        }
+
+    def snapshot(self) -> Dict[str, float]:
+        """Стоимость детектора, срабатывания и сэкономленные вызовы STT для performance.json"""
+        stats = self.stats
+        return {
+            "templates": len(self.templates),
+            "threshold": round(self.threshold, 4),
+            "utterances": stats.utterances,
+            "fired": stats.fired,
+            "wake_only": stats.wake_only,
+            "stt_calls_avoided": stats.rejected,
+            "false_accept_estimate": round(stats.no_command / stats.fired, 3) if stats.fired else 0.0,
+            "avg_cpu_ms": round(stats.cpu_ms / stats.utterances, 2) if stats.utterances else 0.0,
+            # Доля одного ядра: миллисекунды CPU на миллисекунду проверенного аудио
+            "cpu_share": round(stats.cpu_ms / 1000.0 / stats.audio_s, 5) if stats.audio_s else 0.0,
+        }
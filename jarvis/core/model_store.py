@@ -0,0 +1,239 @@
+from __future__ import annotations
+
+import hashlib
+import json
+import logging
+import shutil
+import tarfile
+import tempfile
+import threading
+import zipfile
+from dataclasses import asdict, dataclass, field
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+MANIFEST_FILE = "manifest.json"
+VERIFY_CACHE_FILE = ".verified.json"  # Результаты проверки: размер и mtime файлов на момент последнего хэширования
+SENTENCE_MODEL = "all-MiniLM-L6-v2"  # Модель SemanticRouter
+
+
+def whisper_model_name(model_size: str) -> str:
+    """Имя модели Whisper в хранилище (как у репозиториев Systran/faster-whisper-*)"""
+    return f"faster-whisper-{model_size}"
+
+
+class ModelStoreError(RuntimeError):
+    """Модели нет в хранилище или её файлы не совпадают с манифестом"""
+
+
+@dataclass
+class ModelEntry:
+    """Запись манифеста: модель — каталог файлов внутри хранилища"""
+    name: str
+    revision: str
+    sha256: str  # Хэш модели: sha256 от отсортированного списка "путь:sha256 файла"
+    size: int  # Суммарный размер файлов, байт
+    path: str  # Каталог относительно корня хранилища
+    files: Dict[str, Dict[str, object]] = field(default_factory=dict)  # путь -> {"sha256", "size"}
+    imported_at: str = ""
+
+
+def _file_sha256(path: Path, chunk_size: int = 1 << 20) -> str:
+    digest = hashlib.sha256()
+    with path.open("rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _model_sha256(files: Dict[str, Dict[str, object]]) -> str:
+    digest = hashlib.sha256()
+    for name in sorted(files):
+        digest.update(f"{name}:{files[name]['sha256']}\n".encode("utf-8"))
+    return digest.hexdigest()
+
+
+class ModelStore:
+    """Локальное хранилище моделей (jarvis/data/models) с проверкой целостности
+
+    Модели ставятся только из локальных архивов (import_archive), загрузчики
+    Whisper и SentenceTransformer получают путь через resolve() и не
+    обращаются к сети. resolve() сверяет файлы с манифестом (sha256 и размер),
+    но результат проверки кэшируется по размеру и mtime каждого файла:
+    при обычном запуске ничего не перехэшируется, полная проверка идёт
+    только для изменившихся файлов.
+    """
+
+    def __init__(self, root: str | Path) -> None:
+        self.root = Path(root)
+        self._lock = threading.Lock()
+        self._verified: Dict[str, str] = {}  # Проверено в этом процессе: имя -> sha256
+        self._logger = logging.getLogger("jarvis")
+
+    # --- Манифест ---
+
+    def entries(self) -> Dict[str, ModelEntry]:
+        try:
+            data = json.loads((self.root / MANIFEST_FILE).read_text(encoding="utf-8"))
+        except FileNotFoundError:
+            return {}
+        return {name: ModelEntry(**entry) for name, entry in data.get("models", {}).items()}
+
+    def get(self, name: str) -> Optional[ModelEntry]:
+        return self.entries().get(name)
+
+    def _write_manifest(self, entries: Dict[str, ModelEntry]) -> None:
+        self.root.mkdir(parents=True, exist_ok=True)
+        payload = {"models": {name: asdict(entry) for name, entry in sorted(entries.items())}}
+        tmp = self.root / (MANIFEST_FILE + ".tmp")
+        tmp.write_text(json.dumps(payload, ensure_ascii=False, indent=2), encoding="utf-8")
+        tmp.replace(self.root / MANIFEST_FILE)
+
+    # --- Установка ---
+
+    def import_archive(self, archive: str | Path, name: Optional[str] = None, revision: str = "local") -> ModelEntry:
+        """Устанавливает модель из локального архива (.zip, .tar, .tar.gz, .tgz) или каталога
+
+        Если в архиве один каталог верхнего уровня, моделью считается его содержимое,
+        а без name — и имя модели берётся из имени этого каталога.
+        Существующая модель с тем же именем заменяется.
+        """
+        archive = Path(archive)
+        self.root.mkdir(parents=True, exist_ok=True)
+        staging = Path(tempfile.mkdtemp(prefix=".import-", dir=self.root))
+        try:
+            if archive.is_dir():
+                shutil.copytree(archive, staging / "content")
+            elif zipfile.is_zipfile(archive):
+                with zipfile.ZipFile(archive) as zf:
+                    self._check_members(zf.namelist())
+                    zf.extractall(staging / "content")
+            elif tarfile.is_tarfile(archive):
+                with tarfile.open(archive) as tf:
+                    self._check_members([m.name for m in tf.getmembers() if not (m.issym() or m.islnk())])
+                    tf.extractall(staging / "content", members=[m for m in tf.getmembers() if m.isfile() or m.isdir()])
+            else:
+                raise ModelStoreError(f"Неизвестный формат архива: {archive}")
+            content = staging / "content"
+            children = [p for p in content.iterdir() if not p.name.startswith(".")]
+            if len(children) == 1 and children[0].is_dir():
+                content = children[0]
+                name = name or content.name
+            name = name or archive.name.split(".")[0]
+            if not name or "/" in name or "\\" in name or name.startswith("."):
+                raise ModelStoreError(f"Недопустимое имя модели: {name!r}")
+
+            files = {}
+            for path in sorted(p for p in content.rglob("*") if p.is_file()):
+                rel = path.relative_to(content).as_posix()
+                files[rel] = {"sha256": _file_sha256(path), "size": path.stat().st_size}
+            if not files:
+                raise ModelStoreError(f"Архив пуст: {archive}")
+
+            target = self.root / name
+            with self._lock:
+                if target.exists():
+                    shutil.rmtree(target)
+                content.replace(target)
+                entry = ModelEntry(
+                    name=name,
+                    revision=revision,
+                    sha256=_model_sha256(files),
+                    size=sum(int(info["size"]) for info in files.values()),
+                    path=name,
+                    files=files,
+                    imported_at=datetime.now(timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ"),
+                )
+                entries = self.entries()
+                entries[name] = entry
+                self._write_manifest(entries)
+                # Только что посчитанные хэши — сразу в кэш проверки
+                self._save_verified(name, entry, self._stat_files(target, entry))
+                self._verified[name] = entry.sha256
+        finally:
+            shutil.rmtree(staging, ignore_errors=True)
+        self._logger.info(f"ModelStore: Установлена модель {name} ({entry.size / 1e6:.1f} МБ, sha256 {entry.sha256[:12]})")
+        return entry
+
+    @staticmethod
+    def _check_members(names: List[str]) -> None:
+        for member in names:
+            parts = Path(member).parts
+            if Path(member).is_absolute() or ".." in parts:
+                raise ModelStoreError(f"Небезопасный путь в архиве: {member}")
+
+    # --- Проверка и загрузка ---
+
+    def resolve(self, name: str) -> Path:
+        """Каталог проверенной модели; ModelStoreError, если её нет или она повреждена"""
+        entry = self.get(name)
+        if entry is None:
+            raise ModelStoreError(
+                f"Модель {name} не установлена в {self.root}. "
+                f"Установите из архива: python -m jarvis.app.main --import-model АРХИВ --model-name {name}"
+            )
+        if not self.verify(name, entry=entry):
+            raise ModelStoreError(f"Модель {name} повреждена (файлы не совпадают с манифестом), переустановите её")
+        return self.root / entry.path
+
+    def verify(self, name: str, force: bool = False, entry: Optional[ModelEntry] = None) -> bool:
+        """Сверяет файлы модели с манифестом; без force перехэшируются только изменившиеся файлы"""
+        entry = entry or self.get(name)
+        if entry is None:
+            return False
+        if not force and self._verified.get(name) == entry.sha256:
+            return True
+        target = self.root / entry.path
+        stats = self._stat_files(target, entry)
+        if stats is None:
+            self._logger.warning(f"ModelStore: У модели {name} не хватает файлов")
+            return False
+        cached = {} if force else self._load_verified().get(name, {})
+        cached_files = cached.get("files", {}) if cached.get("sha256") == entry.sha256 else {}
+        rehashed = 0
+        for rel, info in entry.files.items():
+            size, mtime_ns = stats[rel]
+            if size != int(info["size"]):
+                self._logger.warning(f"ModelStore: {name}/{rel}: размер {size} вместо {info['size']}")
+                return False
+            if cached_files.get(rel) == [size, mtime_ns]:
+                continue
+            rehashed += 1
+            if _file_sha256(target / rel) != info["sha256"]:
+                self._logger.warning(f"ModelStore: {name}/{rel}: sha256 не совпадает с манифестом")
+                return False
+        if rehashed:
+            self._logger.info(f"ModelStore: Модель {name} проверена (перехэшировано файлов: {rehashed})")
+            self._save_verified(name, entry, stats)
+        self._verified[name] = entry.sha256
+        return True
+
+    @staticmethod
+    def _stat_files(target: Path, entry: ModelEntry) -> Optional[Dict[str, Tuple[int, int]]]:
+        stats = {}
+        for rel in entry.files:
+            try:
+                st = (target / rel).stat()
+            except FileNotFoundError:
+                return None
+            stats[rel] = (st.st_size, st.st_mtime_ns)
+        return stats
+
+    def _load_verified(self) -> Dict[str, Dict[str, object]]:
+        try:
+            return json.loads((self.root / VERIFY_CACHE_FILE).read_text(encoding="utf-8"))
+        except (FileNotFoundError, ValueError):
+            return {}
+
+    def _save_verified(self, name: str, entry: ModelEntry, stats: Optional[Dict[str, Tuple[int, int]]]) -> None:
+        if stats is None:
+            return
+        try:
+            cache = self._load_verified()
+            cache[name] = {"sha256": entry.sha256, "files": {rel: list(stat) for rel, stat in stats.items()}}
+            tmp = self.root / (VERIFY_CACHE_FILE + ".tmp")
+            tmp.write_text(json.dumps(cache, indent=2), encoding="utf-8")
+            tmp.replace(self.root / VERIFY_CACHE_FILE)
+        except OSError as e:
+            self._logger.debug(f"ModelStore: Не удалось сохранить кэш проверки: {e}")
@@ -1,8 +1,31 @@
+from __future__ import annotations
+
+import logging
+import math
+import queue
+import sys
+import threading
+import time
+from abc import ABC, abstractmethod
 from dataclasses import dataclass
-from typing import Optional
+from pathlib import Path
+from typing import Callable, List, Optional, Tuple
 
+import numpy as np
 import speech_recognition as sr
 
+from jarvis.core.audio import AudioFrame, StreamResampler, float32_to_pcm16, read_wav, to_mono_float32
+from jarvis.core.capture_process import (
+    STATE_ERROR,
+    STATE_FINISHED,
+    STATE_STARTING,
+    SharedFrameRing,
+    start_capture_process,
+)
+from jarvis.core.denoise import NoiseProfile
+from jarvis.core.device_monitor import AudioDevice, DeviceMonitor, get_device_monitor
+from jarvis.core.vad import NoiseFloorTracker, StreamingVAD, pcm_to_frames
+
 
 @dataclass
 class RecordConfig:
@@ -10,27 +33,978 @@ class RecordConfig:
     calibration_duration_s: float = 1.0
     timeout_s: float = 5.0
     phrase_time_limit_s: float = 1.5  # Уменьшено для быстрой реакции
+    # Постоянный поток: микрофон открывается один раз, кадры пишутся в кольцевой буфер
+    persistent_stream: bool = True
+    sample_rate: int = 16000
+    frame_ms: int = 30  # Длина одного кадра захвата
+    ring_buffer_s: float = 10.0  # Сколько секунд аудио хранит кольцевой буфер
+    # Потоковый VAD: фраза заканчивается по тишине, а не по таймеру
+    vad_hangover_ms: int = 400  # Сколько тишины после речи завершает фразу
+    vad_min_speech_ms: int = 150  # Более короткие всплески считаются шумом
+    vad_max_utterance_s: float = 15.0  # Жёсткий предел длины одной фразы
+    vad_zcr_max: float = 0.45  # Кадры с большим ZCR (шипение, шум) не считаются речью
+    # Непрерывная нарезка фраз в фоне
+    preroll_ms: int = 300  # Аудио до начала речи, добавляемое к фразе (не съедает первый слог)
+    utterance_queue_size: int = 4  # Сколько готовых фраз может ждать обработки
+    # Адаптивный уровень шума (заменяет калибровку перед каждой фразой)
+    noise_percentile: float = 0.2  # Какой перцентиль энергии кадров считать шумом
+    noise_step_db: float = 0.5  # Скорость подстройки за кадр
+    noise_margin_db: float = 8.0  # Превышение над шумом, начиная с которого кадр — речь
+    noise_min_threshold: float = 40.0  # Нижняя граница порога (RMS)
+    # Источник аудио (None — микрофон device_index), см. make_audio_source
+    source: Optional["AudioSource"] = None
+    # Захват в отдельном процессе: устройство открывает дочерний процесс и пишет
+    # кадры в разделяемую память, GIL основного процесса не задерживает чтение
+    capture_process: bool = False
+    # Копить спектр шума по кадрам без речи (для SpectralGate перед STT)
+    noise_suppression: bool = False
+    # Режим простоя: после idle_after_s тишины сегментатор переходит на дешёвый детектор
+    # энергии (кадры опрашиваются раз в idle_poll_ms, берётся каждый idle_decimation-й отсчёт),
+    # а захват читает устройство блоками по idle_poll_ms вместо отдельных кадров
+    idle_after_s: float = 60.0  # 0 — режим простоя выключен
+    idle_poll_ms: int = 250
+    idle_decimation: int = 4
+    # Следить за подключением/отключением микрофонов и переоткрывать поток без перезапуска
+    hotplug_monitor: bool = True
+
+
+class FrameRingBuffer:
+    """Кольцевой буфер фиксированного размера для аудиокадров одинаковой длины
+
+    Поток захвата пишет кадры, читатели обращаются к ним по монотонному индексу.
+    Если читатель отстал больше чем на ёмкость буфера, он перескакивает
+    на самый старый доступный кадр: overruns считает такие перескоки,
+    dropped_frames — потерянные при этом кадры.
+    """
+
+    def __init__(self, capacity_frames: int, frame_bytes: int) -> None:
+        self.capacity_frames = max(1, int(capacity_frames))
+        self.frame_bytes = int(frame_bytes)
+        self._buffer = bytearray(self.capacity_frames * self.frame_bytes)
+        self._write_index = 0
+        self._closed = False
+        self._cond = threading.Condition()
+        self.overruns = 0
+        self.dropped_frames = 0
+        self.capture_gaps = 0  # Увеличивает поток захвата, если кадр пришёл с опозданием
+        self.capture_batch = 1  # Кадров на одно чтение устройства: в режиме простоя захват просыпается реже
+
+    @property
+    def write_index(self) -> int:
+        """Индекс следующего кадра, который будет записан"""
+        return self._write_index
+
+    @property
+    def oldest_index(self) -> int:
+        """Индекс самого старого кадра, ещё доступного для чтения"""
+        return max(0, self._write_index - self.capacity_frames)
+
+    def write(self, frame: bytes) -> None:
+        if len(frame) != self.frame_bytes:
+            # Последний кадр потока может быть короче — дополняем тишиной
+            frame = bytes(frame[: self.frame_bytes]).ljust(self.frame_bytes, b"\x00")
+        with self._cond:
+            start = (self._write_index % self.capacity_frames) * self.frame_bytes
+            self._buffer[start:start + self.frame_bytes] = frame
+            self._write_index += 1
+            self._cond.notify_all()
+
+    def read(self, index: int, timeout: Optional[float] = None) -> Tuple[Optional[bytes], int]:
+        """Возвращает кадр с индексом index и индекс следующего кадра
+
+        Ждёт до timeout секунд, если кадр ещё не записан. При тайм-ауте
+        или закрытом буфере возвращает (None, index).
+        """
+        with self._cond:
+            index = self._skip_overwritten(index)
+            if index >= self._write_index:
+                self._cond.wait_for(lambda: index < self._write_index or self._closed, timeout)
+                if index >= self._write_index:
+                    return None, index
+            start = (index % self.capacity_frames) * self.frame_bytes
+            return bytes(self._buffer[start:start + self.frame_bytes]), index + 1
+
+    def read_many(self, index: int, max_frames: int, timeout: Optional[float] = None) -> Tuple[Optional[bytes], int]:
+        """Возвращает все доступные кадры начиная с index (не больше max_frames) одним блоком
+
+        Ждёт хотя бы один кадр до timeout секунд. Блочное чтение позволяет
+        обрабатывать накопившиеся кадры векторно, а не по одному.
+        """
+        with self._cond:
+            index = self._skip_overwritten(index)
+            if index >= self._write_index:
+                self._cond.wait_for(lambda: index < self._write_index or self._closed, timeout)
+                if index >= self._write_index:
+                    return None, index
+            count = min(max_frames, self._write_index - index)
+            return self._copy(index, count), index + count
+
+    def read_range(self, start: int, end: int) -> bytes:
+        """Копирует кадры [start, end) одним блоком (без ожидания)
+
+        Границы обрезаются до реально доступных кадров, поэтому запрос
+        пре-ролла дальше начала буфера просто вернёт то, что осталось.
+        """
+        with self._cond:
+            start = max(start, self.oldest_index)
+            end = min(end, self._write_index)
+            if end <= start:
+                return b""
+            return self._copy(start, end - start)
+
+    def _skip_overwritten(self, index: int) -> int:
+        if index < self.oldest_index:
+            self.overruns += 1
+            self.dropped_frames += self.oldest_index - index
+            index = self.oldest_index
+        return index
+
+    def _copy(self, index: int, count: int) -> bytes:
+        chunks = []
+        pos = index
+        while pos < index + count:
+            slot = pos % self.capacity_frames
+            run = min(index + count - pos, self.capacity_frames - slot)
+            start = slot * self.frame_bytes
+            chunks.append(bytes(self._buffer[start:start + run * self.frame_bytes]))
+            pos += run
+        return b"".join(chunks)
+
+    def close(self) -> None:
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+
+    def reopen(self) -> None:
+        with self._cond:
+            self._closed = False
+
+
+class AudioSource(ABC):
+    """Источник аудио для SpeechListener: отдаёт кадры 16-bit PCM моно
+
+    realtime — источник сам выдаёт кадры в темпе реального времени (микрофон).
+    pace — для остальных источников: притормаживать выдачу до реального
+    времени (как микрофон) или отдавать кадры так быстро, как успевает
+    сегментатор (для регрессионных прогонов и замеров).
+    process_safe — источник можно открыть в отдельном процессе захвата
+    (RecordConfig.capture_process): он передаётся туда через pickle до open().
+    """
+
+    realtime: bool = False
+    pace: bool = True
+    process_safe: bool = True
+
+    @abstractmethod
+    def open(self, sample_rate: int, frame_samples: int) -> None:
+        raise NotImplementedError
+
+    @abstractmethod
+    def read_frame(self) -> bytes:
+        """Возвращает один кадр или b"" когда поток закончился"""
+        raise NotImplementedError
+
+    def read_frames(self, count: int) -> bytes:
+        """До count кадров одним блоком (короче — поток закончился)"""
+        chunks = []
+        for _ in range(count):
+            frame = self.read_frame()
+            if not frame:
+                break
+            chunks.append(frame)
+        return b"".join(chunks)
+
+    def close(self) -> None:
+        return
+
+
+class MicrophoneSource(AudioSource):
+    """Микрофон через speech_recognition/PyAudio"""
+
+    realtime = True
+
+    def __init__(self, device_index: Optional[int] = None) -> None:
+        self.device_index = device_index
+        self._mic: Optional[sr.Microphone] = None
+        self._chunk = 0
+
+    def open(self, sample_rate: int, frame_samples: int) -> None:
+        self._mic = sr.Microphone(device_index=self.device_index, sample_rate=sample_rate, chunk_size=frame_samples)
+        self._mic.__enter__()
+        self._chunk = frame_samples
+
+    def read_frame(self) -> bytes:
+        return self._mic.stream.read(self._chunk)
+
+    def read_frames(self, count: int) -> bytes:
+        # Одно блокирующее чтение PortAudio вместо count пробуждений потока захвата
+        return self._mic.stream.read(self._chunk * count)
+
+    def close(self) -> None:
+        if self._mic is not None and self._mic.stream is not None:
+            self._mic.__exit__(None, None, None)
+        self._mic = None
+
+
+class _BufferedSource(AudioSource):
+    """Общая нарезка на кадры для источников, которые готовят PCM целиком"""
+
+    def __init__(self, pace: bool = True) -> None:
+        self.pace = pace
+        self._pcm = b""
+        self._pos = 0
+        self._frame_bytes = 0
+
+    def read_frame(self) -> bytes:
+        frame = self._pcm[self._pos:self._pos + self._frame_bytes]
+        self._pos += self._frame_bytes
+        return frame
+
+    def read_frames(self, count: int) -> bytes:
+        block = self._pcm[self._pos:self._pos + self._frame_bytes * count]
+        self._pos += self._frame_bytes * count
+        return block
+
+    def close(self) -> None:
+        self._pcm = b""
+        self._pos = 0
+
+
+class WavFileSource(_BufferedSource):
+    """Один WAV-файл; в конце добавляется тишина, чтобы VAD закрыл последнюю фразу"""
+
+    def __init__(self, path: str | Path, pace: bool = True, tail_silence_s: float = 1.0) -> None:
+        super().__init__(pace=pace)
+        self.path = Path(path)
+        self.tail_silence_s = tail_silence_s
+
+    def open(self, sample_rate: int, frame_samples: int) -> None:
+        self._frame_bytes = frame_samples * 2
+        self._pcm = read_wav(self.path, sample_rate) + b"\x00\x00" * int(self.tail_silence_s * sample_rate)
+        self._pos = 0
+
+
+class WavDirectorySource(_BufferedSource):
+    """Все WAV-файлы каталога по алфавиту, разделённые паузой gap_s"""
+
+    def __init__(self, directory: str | Path, pace: bool = True, gap_s: float = 1.0) -> None:
+        super().__init__(pace=pace)
+        self.directory = Path(directory)
+        self.gap_s = gap_s
+        self.files: list[Path] = []
+
+    def open(self, sample_rate: int, frame_samples: int) -> None:
+        self._frame_bytes = frame_samples * 2
+        self.files = sorted(self.directory.glob("*.wav"))
+        gap = b"\x00\x00" * int(self.gap_s * sample_rate)
+        self._pcm = b"".join(read_wav(path, sample_rate) + gap for path in self.files)
+        self._pos = 0
+
+
+class StdinPCMSource(AudioSource):
+    """Сырой PCM (s16le) из stdin, например: ffmpeg ... -f s16le - | python -m jarvis.app.main"""
+
+    process_safe = False  # stdin дочернего процесса не связан с нашим
+
+    def __init__(self, sample_rate: Optional[int] = None, channels: int = 1, pace: bool = False) -> None:
+        self.input_rate = sample_rate
+        self.channels = channels
+        self.pace = pace
+        self._resampler: Optional[StreamResampler] = None
+        self._read_bytes = 0
+        self._pending = np.zeros(0, dtype=np.float32)
+        self._frame_samples = 0
+
+    def open(self, sample_rate: int, frame_samples: int) -> None:
+        self._frame_samples = frame_samples
+        rate = self.input_rate or sample_rate
+        self._resampler = StreamResampler(rate, sample_rate) if rate != sample_rate else None
+        self._read_bytes = int(math.ceil(frame_samples * rate / sample_rate)) * 2 * self.channels
+        self._pending = np.zeros(0, dtype=np.float32)
+
+    def read_frame(self) -> bytes:
+        while len(self._pending) < self._frame_samples:
+            data = sys.stdin.buffer.read(self._read_bytes)
+            if not data:
+                frame, self._pending = self._pending, np.zeros(0, dtype=np.float32)
+                return float32_to_pcm16(frame)
+            x = to_mono_float32(data[: len(data) - len(data) % (2 * self.channels)], 2, self.channels)
+            if self._resampler is not None:
+                x = self._resampler.process(x)
+            self._pending = np.concatenate([self._pending, x])
+        frame = self._pending[:self._frame_samples]
+        self._pending = self._pending[self._frame_samples:]
+        return float32_to_pcm16(frame)
+
+
+class SyntheticSource(_BufferedSource):
+    """Синтетический сигнал: чередование тишины и тона/шума заданной длины
+
+    segments — список (тип, длительность_с), тип: "silence", "tone", "noise".
+    Фоновый шум noise_level добавляется ко всему сигналу. Генерация
+    детерминирована (seed), поэтому прогоны воспроизводимы.
+    """
+
+    def __init__(
+        self,
+        segments: Optional[list[Tuple[str, float]]] = None,
+        tone_hz: float = 220.0,
+        amplitude: float = 0.3,
+        noise_level: float = 0.005,
+        repeat: int = 1,
+        seed: int = 0,
+        pace: bool = True,
+    ) -> None:
+        super().__init__(pace=pace)
+        self.segments = segments or [("silence", 1.0), ("tone", 1.0), ("silence", 1.0)]
+        self.tone_hz = tone_hz
+        self.amplitude = amplitude
+        self.noise_level = noise_level
+        self.repeat = max(1, repeat)
+        self.seed = seed
+
+    def open(self, sample_rate: int, frame_samples: int) -> None:
+        self._frame_bytes = frame_samples * 2
+        rng = np.random.default_rng(self.seed)
+        parts = []
+        for kind, duration in self.segments * self.repeat:
+            n = int(duration * sample_rate)
+            if kind == "tone":
+                t = np.arange(n) / sample_rate
+                # Простая «гласная»: основной тон и две гармоники
+                part = np.sin(2 * np.pi * self.tone_hz * t) + 0.5 * np.sin(4 * np.pi * self.tone_hz * t) \
+                    + 0.25 * np.sin(6 * np.pi * self.tone_hz * t)
+                part *= self.amplitude / 1.75
+            elif kind == "noise":
+                part = rng.normal(0.0, self.amplitude / 3, n)
+            else:
+                part = np.zeros(n)
+            parts.append(part)
+        signal = np.concatenate(parts) if parts else np.zeros(0)
+        signal = signal + rng.normal(0.0, self.noise_level, signal.shape)
+        self._pcm = (np.clip(signal, -1.0, 1.0) * 32767).astype(np.int16).tobytes()
+        self._pos = 0
+
+
+def make_audio_source(spec: Optional[str], device_index: Optional[int] = None) -> AudioSource:
+    """Создаёт источник по строке из конфигурации (JARVIS_AUDIO_SOURCE)
+
+    Форматы:
+        mic | mic:<индекс устройства>
+        wav:<путь к файлу>
+        wavdir:<путь к каталогу>
+        stdin | stdin:<частота>
+        synthetic | synthetic:noise
+    Суффикс "@fast" отключает привязку к реальному времени: wav:a.wav@fast
+    """
+    spec = (spec or "mic").strip()
+    pace = True
+    if spec.endswith("@fast"):
+        spec, pace = spec[: -len("@fast")], False
+    kind, _, arg = spec.partition(":")
+    kind = kind.lower()
+    if kind in ("", "mic", "microphone"):
+        return MicrophoneSource(device_index=int(arg) if arg else device_index)
+    if kind == "wav":
+        return WavFileSource(arg, pace=pace)
+    if kind == "wavdir":
+        return WavDirectorySource(arg, pace=pace)
+    if kind == "stdin":
+        return StdinPCMSource(sample_rate=int(arg) if arg else None)
+    if kind == "synthetic":
+        if arg == "noise":
+            return SyntheticSource(segments=[("silence", 1.0), ("noise", 1.0), ("silence", 1.0)], pace=pace)
+        return SyntheticSource(pace=pace)
+    raise ValueError(f"Неизвестный источник аудио: {spec}")
+
+
+def quiet_runs(is_speech: np.ndarray, min_frames: int = 1) -> List[Tuple[int, int]]:
+    """Непрерывные участки без речи [начало, конец) длиной не меньше min_frames кадров"""
+    quiet = np.concatenate(([False], ~np.asarray(is_speech, dtype=bool), [False]))
+    edges = np.flatnonzero(quiet[1:] != quiet[:-1])
+    return [(int(start), int(end)) for start, end in zip(edges[::2], edges[1::2]) if end - start >= min_frames]
 
 
 class SpeechListener:
     def __init__(self, config: RecordConfig | None = None):
         self.config = config or RecordConfig()
         self.recognizer = sr.Recognizer()
+        self._logger = logging.getLogger("jarvis")
+
+        # Параметры кадров постоянного потока (16-bit PCM, моно)
+        self.sample_width = 2
+        self.frame_samples = max(1, int(self.config.sample_rate * self.config.frame_ms / 1000))
+        self.preroll_frames = int(math.ceil(self.config.preroll_ms / self.config.frame_ms))
+        # Буфер должен вмещать самую длинную фразу вместе с пре-роллом
+        ring_s = max(self.config.ring_buffer_s, self.config.vad_max_utterance_s + self.config.preroll_ms / 1000 + 2.0)
+        self._ring_capacity = int(math.ceil(ring_s * 1000 / self.config.frame_ms))
+        self.source: AudioSource = self.config.source or MicrophoneSource(device_index=self.config.device_index)
+        self.use_capture_process = self.config.capture_process and self.source.process_safe
+        if self.config.capture_process and not self.source.process_safe:
+            self._logger.warning(
+                f"SpeechListener: Источник {type(self.source).__name__} нельзя открыть в отдельном процессе, "
+                "захват будет в потоке"
+            )
+        self.ring = self._create_ring()
+        # Единая оценка шума: по ней работают и VAD, и recognizer.energy_threshold
+        self.noise_floor = NoiseFloorTracker(
+            percentile=self.config.noise_percentile,
+            step_db=self.config.noise_step_db,
+            margin_db=self.config.noise_margin_db,
+            min_threshold=self.config.noise_min_threshold,
+        )
+        self.vad = StreamingVAD(
+            frame_ms=self.config.frame_ms,
+            hangover_ms=self.config.vad_hangover_ms,
+            min_speech_ms=self.config.vad_min_speech_ms,
+            max_utterance_s=self.config.vad_max_utterance_s,
+            zcr_max=self.config.vad_zcr_max,
+            noise_floor=self.noise_floor,
+        )
+        # Спектр фона для подавления шума; обновляется сегментатором на блоках без речи
+        self.noise_profile: Optional[NoiseProfile] = NoiseProfile() if self.config.noise_suppression else None
+        # Готовые фразы, нарезанные фоновым сегментатором
+        self._utterances: queue.Queue[AudioFrame] = queue.Queue(maxsize=max(1, self.config.utterance_queue_size))
+        self.dropped_utterances = 0
+        self._capture_thread: Optional[threading.Thread] = None
+        self._segment_thread: Optional[threading.Thread] = None
+        self._stop_event = threading.Event()
+        self._ready_event = threading.Event()
+        self._capture_error: Optional[Exception] = None
+        self._capture_process = None
+        self._capture_stop = None
+        self._source_exhausted = False
+        self._segment_index = 0
+        self._current_onset: Optional[int] = None
+        # Режим простоя и учёт CPU сегментатора (секунды процессорного и реального времени по режимам)
+        self.idle = False
+        self.idle_transitions = 0
+        # Восстановление после потери устройства (только для микрофона)
+        self.device_monitor: Optional[DeviceMonitor] = None
+        self.perf_callback: Optional[Callable[[str, float], None]] = None  # (имя метрики, мс)
+        self.recoveries = 0
+        self._lifecycle_lock = threading.RLock()
+        self._monitor_attached = False
+        self._preferred_device: Optional[str] = None
+        self._device_name: Optional[str] = None
+        self._lost_at: Optional[float] = None
+        self._recovering = False
+        self._closed = False
+        self._silence_frames = 0
+        self._cpu = {"idle": [0.0, 0.0], "active": [0.0, 0.0]}
+
+    @property
+    def seconds_per_frame(self) -> float:
+        return self.frame_samples / float(self.config.sample_rate)
+
+    @property
+    def energy_threshold(self) -> float:
+        """Текущий порог речи из NoiseFloorTracker"""
+        return self.noise_floor.threshold
+
+    @property
+    def pending_utterances(self) -> int:
+        """Сколько готовых фраз ждут вызова listen_once"""
+        return self._utterances.qsize()
+
+    def _create_ring(self) -> FrameRingBuffer | SharedFrameRing:
+        frame_bytes = self.frame_samples * self.sample_width
+        if self.use_capture_process:
+            return SharedFrameRing(self._ring_capacity, frame_bytes)
+        return FrameRingBuffer(self._ring_capacity, frame_bytes)
+
+    def power_stats(self) -> dict:
+        """Нагрузка сегментатора в режимах простоя и активного прослушивания
+
+        cpu_s_per_hour — секунды CPU потока сегментации на час реального времени,
+        capture_block_ms — сколько аудио захват читает с устройства за одно пробуждение.
+        """
+        released = isinstance(self.ring, SharedFrameRing) and self.ring.released
+        report = {
+            "idle": self.idle,
+            "idle_transitions": self.idle_transitions,
+            "capture_block_ms": (1 if released else self.ring.capture_batch) * self.config.frame_ms,
+        }
+        for mode, (cpu_s, wall_s) in self._cpu.items():
+            report[f"{mode}_wall_s"] = round(wall_s, 1)
+            report[f"{mode}_cpu_s_per_hour"] = round(cpu_s / wall_s * 3600.0, 2) if wall_s > 0 else 0.0
+        return report
+
+    def capture_stats(self) -> dict:
+        """Счётчики захвата: потери кадров в кольцевом буфере и задержки устройства"""
+        released = isinstance(self.ring, SharedFrameRing) and self.ring.released
+        return {
+            "mode": "process" if self.use_capture_process else "thread",
+            "frames_captured": 0 if released else self.ring.write_index,
+            "overruns": self.ring.overruns,
+            "dropped_frames": self.ring.dropped_frames,
+            "capture_gaps": 0 if released else self.ring.capture_gaps,
+            "dropped_utterances": self.dropped_utterances,
+            "device_recoveries": self.recoveries,
+        }
+
+    def start(self) -> bool:
+        """Открывает микрофон один раз и запускает фоновые потоки захвата и сегментации
+
+        Returns:
+            True если поток захвата работает
+        """
+        with self._lifecycle_lock:
+            if self.is_capturing() or (self._segment_thread is not None and self._segment_thread.is_alive()):
+                return True
+            if self._source_exhausted:
+                return False
+            if self._lost_at is not None and not self._recovering:
+                # Устройство потеряно — переоткрытием занимается DeviceMonitor
+                return False
+            self._attach_device_monitor()
+            self._stop_event.clear()
+            self._ready_event.clear()
+            self._capture_error = None
+            if isinstance(self.ring, SharedFrameRing) and self.ring.released:
+                self.ring = self._create_ring()
+            self.ring.reopen()
+            # Сегментатор начнёт ровно с первого кадра этого запуска
+            self._segment_index = self.ring.write_index
+            self.ring.capture_batch = 1
+            if self.use_capture_process:
+                started = self._start_capture_process()
+            else:
+                self._capture_thread = threading.Thread(target=self._capture_loop, daemon=True, name="Audio-Capture")
+                self._capture_thread.start()
+                self._ready_event.wait(timeout=5.0)
+                started = self._capture_error is None and self._ready_event.is_set()
+            if not started:
+                self._on_capture_lost()
+                return False
+            # Короткий источник без привязки ко времени мог уже закончиться — сегментатор всё равно нужен
+            self._segment_thread = threading.Thread(target=self._segment_loop, daemon=True, name="Audio-Segmenter")
+            self._segment_thread.start()
+            return True
+
+    # --- Горячее подключение микрофона ---
+
+    def _attach_device_monitor(self) -> None:
+        if self._monitor_attached or not self.config.hotplug_monitor or not isinstance(self.source, MicrophoneSource):
+            return
+        if self.device_monitor is None:
+            self.device_monitor = get_device_monitor()
+        # Запоминаем устройство по имени: после переподключения у него может быть другой индекс
+        if self.source.device_index is not None:
+            device = self.device_monitor.by_index(self.source.device_index)
+        else:
+            device = self.device_monitor.best_input()
+        if device is not None:
+            self._device_name = device.name
+            if self.source.device_index is not None:
+                self._preferred_device = device.name
+        self.device_monitor.subscribe(self._on_devices_changed)
+        self._monitor_attached = True
+
+    def _on_capture_lost(self) -> None:
+        if self.device_monitor is None or self._closed:
+            return
+        if self._lost_at is None:
+            self._lost_at = time.monotonic()
+            self._logger.warning("SpeechListener: Поток микрофона потерян, ищу доступное устройство...")
+            self.device_monitor.poke()
+
+    def _on_devices_changed(self, added: list[AudioDevice], removed: list[AudioDevice]) -> None:
+        """Вызывается DeviceMonitor после каждого опроса устройств"""
+        if self._closed:
+            return
+        if self._device_name is not None and any(d.name == self._device_name for d in removed):
+            self._on_capture_lost()
+        if self._lost_at is not None:
+            self._reopen_on(self.device_monitor.best_input(self._preferred_device))
+        elif (
+            self._preferred_device
+            and self._device_name != self._preferred_device
+            and any(d.name == self._preferred_device for d in added)
+        ):
+            self._logger.info(f"SpeechListener: Возвращаюсь на настроенное устройство '{self._preferred_device}'")
+            self._reopen_on(self.device_monitor.find(self._preferred_device))
+
+    def _reopen_on(self, device: Optional[AudioDevice]) -> None:
+        if device is None:
+            self._logger.debug("SpeechListener: Нет доступных устройств ввода, жду подключения")
+            return
+        with self._lifecycle_lock:
+            self.stop()
+            self.source.device_index = device.index
+            self._recovering = True
+            try:
+                started = self.start()
+            finally:
+                self._recovering = False
+        if not started:
+            return
+        self._device_name = device.name
+        if self._lost_at is not None:
+            elapsed_ms = (time.monotonic() - self._lost_at) * 1000.0
+            self._lost_at = None
+            self.recoveries += 1
+            self._logger.info(f"SpeechListener: Захват восстановлен на '{device.name}' за {elapsed_ms:.0f} мс")
+            if self.perf_callback is not None:
+                try:
+                    self.perf_callback("mic_recover_ms", elapsed_ms)
+                except Exception:
+                    pass
+
+    def _start_capture_process(self) -> bool:
+        """Запускает дочерний процесс, который владеет устройством и пишет в self.ring"""
+        self.ring.state = STATE_STARTING
+        self.ring.reset_reader(self._segment_index)
+        try:
+            self._capture_process, self._capture_stop = start_capture_process(
+                self.ring, self.source, self.config.sample_rate, self.frame_samples
+            )
+        except Exception as e:
+            self._capture_error = e
+            self._logger.error(f"SpeechListener: Не удалось запустить процесс захвата: {e}", exc_info=True)
+            return False
+        # Дочерний процесс (spawn) импортирует модули — даём ему время открыть источник
+        deadline = time.monotonic() + 15.0
+        while self.ring.state == STATE_STARTING and self._capture_process.is_alive() and time.monotonic() < deadline:
+            time.sleep(0.01)
+        if self.ring.state == STATE_STARTING:
+            self._capture_error = RuntimeError("процесс захвата не открыл источник")
+        self._poll_capture_process()
+        if self._capture_error is not None:
+            self._logger.error(f"SpeechListener: Ошибка процесса захвата: {self._capture_error}")
+            return False
+        self._logger.debug(
+            f"SpeechListener: Процесс захвата {self._capture_process.pid} открыл {type(self.source).__name__} "
+            f"({self.config.sample_rate} Гц, кадр {self.config.frame_ms} мс)"
+        )
+        return True
+
+    def _poll_capture_process(self) -> None:
+        # Переносим состояние дочернего процесса из заголовка общей памяти в поля слушателя
+        if self._capture_process is None or self.ring.released:
+            return
+        state = self.ring.state
+        if state == STATE_FINISHED and not self._source_exhausted:
+            self._source_exhausted = True
+            self._logger.info(f"SpeechListener: Источник {type(self.source).__name__} закончился")
+        elif state == STATE_ERROR and self._capture_error is None:
+            self._capture_error = RuntimeError(f"источник {type(self.source).__name__} недоступен")
+            if not self._stop_event.is_set():
+                self._on_capture_lost()
+
+    def _stop_capture_process(self) -> None:
+        if self._capture_process is None:
+            return
+        if self._capture_stop is not None:
+            self._capture_stop.set()
+        self._capture_process.join(timeout=2.0)
+        if self._capture_process.is_alive():
+            self._capture_process.terminate()
+            self._capture_process.join(timeout=1.0)
+        self._poll_capture_process()
+        self.ring.close()
+        self._capture_process = None
+        self._capture_stop = None
+
+    def stop(self) -> None:
+        """Останавливает фоновые потоки и закрывает микрофон"""
+        with self._lifecycle_lock:
+            self._stop_event.set()
+            self._stop_capture_process()
+            for thread in (self._capture_thread, self._segment_thread):
+                if thread is not None and thread is not threading.current_thread():
+                    thread.join(timeout=1.0)
+            self._capture_thread = None
+            self._segment_thread = None
+
+    def is_capturing(self) -> bool:
+        if self._capture_process is not None:
+            self._poll_capture_process()
+            return self._capture_process.is_alive() and not self._source_exhausted and self._capture_error is None
+        return self._capture_thread is not None and self._capture_thread.is_alive()
+
+    @property
+    def exhausted(self) -> bool:
+        """Конечный источник (файл, stdin) закончился и все фразы уже выданы"""
+        return self._source_exhausted and not self.is_capturing() and self._utterances.empty() and (
+            self._segment_thread is None or not self._segment_thread.is_alive()
+        )
+
+    def _capture_loop(self) -> None:
+        source = self.source
+        spf = self.seconds_per_frame
+        backlog_limit = self.ring.capacity_frames // 2
+        frame_bytes = self.ring.frame_bytes
+        try:
+            source.open(self.config.sample_rate, self.frame_samples)
+            self._logger.debug(
+                f"SpeechListener: Источник {type(source).__name__} открыт "
+                f"({self.config.sample_rate} Гц, кадр {self.config.frame_ms} мс)"
+            )
+            self._ready_event.set()
+            next_frame_at = time.perf_counter()
+            last_read = next_frame_at
+            while not self._stop_event.is_set():
+                # В режиме простоя кадры читаются блоками по idle_poll_ms: поток просыпается реже,
+                # но ни один кадр не пропадает — начало речи остаётся в буфере
+                count = self.ring.capture_batch
+                block = source.read_frames(count) if count > 1 else source.read_frame()
+                now = time.perf_counter()
+                if source.realtime and now - last_read > (count + 1) * spf:
+                    # Кадры пришли с опозданием — поток захвата не успел вовремя (GIL, нагрузка)
+                    self.ring.capture_gaps += 1
+                last_read = now
+                if not block:
+                    self._source_exhausted = True
+                    self._logger.info(f"SpeechListener: Источник {type(source).__name__} закончился")
+                    break
+                frames = -(-len(block) // frame_bytes)
+                if not source.realtime:
+                    if source.pace:
+                        # Выдаём кадры в темпе микрофона
+                        next_frame_at += spf * frames
+                        delay = next_frame_at - time.perf_counter()
+                        if delay > 0:
+                            time.sleep(delay)
+                    else:
+                        # Без привязки ко времени — не обгоняем сегментатор больше чем на полбуфера
+                        while self.ring.write_index - self._segment_index > backlog_limit:
+                            if self._stop_event.wait(0.002):
+                                break
+                for offset in range(0, len(block), frame_bytes):
+                    self.ring.write(block[offset:offset + frame_bytes])
+        except Exception as e:
+            self._capture_error = e
+            self._logger.error(f"SpeechListener: Ошибка потока захвата: {e}", exc_info=True)
+            if self._ready_event.is_set() and not self._stop_event.is_set():
+                # Устройство пропало во время работы (при открытии сообщает start())
+                self._on_capture_lost()
+        finally:
+            try:
+                source.close()
+            except Exception:
+                pass
+            self.ring.close()
+            self._ready_event.set()
+
+    def _segment_loop(self) -> None:
+        """Непрерывно прогоняет кадры через VAD и складывает готовые фразы в очередь
+
+        Работает независимо от Conversation, поэтому речь во время STT и TTS
+        не теряется, а следующая фраза уже лежит в очереди к возврату цикла.
+        """
+        keep_tail = max(1, int(round(100 / self.config.frame_ms)))  # 100 мс тишины после речи
+        idle_after_frames = int(self.config.idle_after_s / self.seconds_per_frame) if self.config.idle_after_s > 0 else 0
+        index = self._segment_index
+        onset: Optional[int] = None
+        self.vad.reset()
+        self.idle = False
+        self._silence_frames = 0
+        self._current_onset = None
+        last_cpu, last_wall = time.thread_time(), time.monotonic()
+        while not self._stop_event.is_set():
+            cpu, wall = time.thread_time(), time.monotonic()
+            account = self._cpu["idle" if self.idle else "active"]
+            account[0] += cpu - last_cpu
+            account[1] += wall - last_wall
+            last_cpu, last_wall = cpu, wall
+
+            if self.idle:
+                # Простой: просыпаемся редко и забираем всё накопленное одним блоком
+                if self._stop_event.wait(self.config.idle_poll_ms / 1000.0):
+                    break
+                block, next_index = self.ring.read_many(index, self.ring.capacity_frames, timeout=0.0)
+                if block is None:
+                    if not self.is_capturing():
+                        break
+                    continue
+                frames = pcm_to_frames(block, self.frame_samples)
+                block_start = next_index - len(frames)
+                hit = self._idle_onset(frames)
+                if hit is None:
+                    index = next_index
+                    self._segment_index = index
+                    continue
+                # Возвращаемся немного назад, чтобы полный VAD увидел начало речи целиком
+                index = max(block_start + hit - 2, self.ring.oldest_index)
+                self._exit_idle()
+                continue
+
+            block, next_index = self.ring.read_many(index, 64, timeout=0.5)
+            if block is None:
+                if not self.is_capturing():
+                    if onset is not None and self._source_exhausted:
+                        # Поток закончился посреди речи — отдаём то, что успели записать
+                        utterance = AudioFrame(
+                            self.ring.read_range(onset - self.preroll_frames, index),
+                            self.config.sample_rate,
+                            self.sample_width,
+                            segmented=True,
+                        )
+                        utterance.stream_range = (onset - self.preroll_frames, index)
+                        self._push_utterance(utterance)
+                        self._current_onset = None
+                    break
+                continue
+            frames = pcm_to_frames(block, self.frame_samples)
+            block_start = next_index - len(frames)
+            index = next_index
+            self._segment_index = index
+            try:
+                # VAD сам обновляет noise_floor энергией каждого кадра
+                is_speech, events = self.vad.process(frames)
+            except Exception as e:
+                self._logger.debug(f"SpeechListener: Ошибка VAD: {e}")
+                continue
+            self.recognizer.energy_threshold = self.noise_floor.threshold
+            if self.noise_profile is not None:
+                # Спектр шума копим только по непрерывным участкам тишины: склейки
+                # несмежных кадров дали бы в STFT ложную энергию на стыках
+                for start, end in quiet_runs(is_speech, min_frames=4):
+                    self.noise_profile.update(frames[start:end])
+
+            speech_at = np.flatnonzero(is_speech)
+            if len(speech_at):
+                self._silence_frames = len(frames) - 1 - int(speech_at[-1])
+            else:
+                self._silence_frames += len(frames)
+            if idle_after_frames and onset is None and not self.vad.in_speech and self._silence_frames >= idle_after_frames:
+                self._enter_idle()
+
+            for event in events:
+                position = block_start + event.frame_offset
+                if event.kind == "start":
+                    onset = position
+                elif event.kind == "discard":
+                    self._logger.debug("SpeechListener: Короткий всплеск отброшен VAD")
+                    onset = None
+                elif onset is not None:
+                    end = position + 1
+                    if not event.truncated:
+                        # Хвостовую тишину сверх 100 мс не отправляем в STT
+                        end -= max(0, self.vad.hangover_frames - keep_tail)
+                    start, end = onset - self.preroll_frames, max(end, onset + 1)
+                    utterance = AudioFrame(self.ring.read_range(start, end), self.config.sample_rate, self.sample_width, segmented=True)
+                    utterance.stream_range = (start, end)
+                    self._push_utterance(utterance)
+                    onset = None
+            # Фраза, которая ещё произносится, доступна потоковому STT через current_utterance()
+            self._current_onset = onset
+
+    def _idle_onset(self, frames: np.ndarray) -> Optional[int]:
+        """Дешёвый детектор простоя: только энергия по прореженным отсчётам
+
+        Порог замороженный (последняя оценка NoiseFloorTracker), ZCR
+        и подстройка шума не считаются. Возвращает номер первого громкого кадра.
+        """
+        x = frames[:, :: max(1, self.config.idle_decimation)].astype(np.float32)
+        rms = np.sqrt(np.mean(np.square(x), axis=1))
+        loud = np.flatnonzero(rms > self.noise_floor.threshold)
+        return int(loud[0]) if len(loud) else None
+
+    def _enter_idle(self) -> None:
+        self.idle = True
+        self.idle_transitions += 1
+        self.ring.capture_batch = max(1, int(round(self.config.idle_poll_ms / self.config.frame_ms)))
+        self._logger.debug(
+            f"SpeechListener: {self.config.idle_after_s:.0f} с тишины — переход в режим простоя "
+            f"(порог {self.noise_floor.threshold:.0f})"
+        )
+
+    def _exit_idle(self) -> None:
+        self.idle = False
+        self.ring.capture_batch = 1
+        self._silence_frames = 0
+        self.vad.reset()
+        self._logger.debug("SpeechListener: Начало речи — выход из режима простоя")
+
+    def _push_utterance(self, audio: AudioFrame) -> None:
+        if not self.source.realtime and not self.source.pace:
+            # Прогон без привязки ко времени: ждём потребителя, ничего не теряя
+            while not self._stop_event.is_set():
+                try:
+                    self._utterances.put(audio, timeout=0.1)
+                    return
+                except queue.Full:
+                    continue
+            return
+        try:
+            self._utterances.put_nowait(audio)
+        except queue.Full:
+            # Очередь переполнена — выбрасываем самую старую фразу, свежая важнее
+            try:
+                self._utterances.get_nowait()
+            except queue.Empty:
+                pass
+            self.dropped_utterances += 1
+            self._logger.warning("SpeechListener: Очередь фраз переполнена, старая фраза отброшена")
+            self._utterances.put_nowait(audio)
+
+    def _legacy_mode(self) -> bool:
+        # Открытие микрофона на каждую фразу возможно только для микрофона
+        return not self.config.persistent_stream and isinstance(self.source, MicrophoneSource)
 
     def calibrate(self) -> None:
-        with sr.Microphone(device_index=self.config.device_index) as source:
-            self.recognizer.adjust_for_ambient_noise(source, duration=self.config.calibration_duration_s)
+        if self._legacy_mode():
+            with sr.Microphone(device_index=self.source.device_index) as source:
+                self.recognizer.adjust_for_ambient_noise(source, duration=self.config.calibration_duration_s)
+            return
+
+        # Отдельной калибровки нет: NoiseFloorTracker подстраивается на каждом кадре.
+        # Здесь только открываем поток и ждём первую оценку шума.
+        if not self.start():
+            raise RuntimeError(f"Не удалось открыть микрофон: {self._capture_error}")
+        deadline = self.config.calibration_duration_s
+        while not self.noise_floor.warmed_up and deadline > 0:
+            self._stop_event.wait(0.05)
+            deadline -= 0.05
+        self._logger.debug(
+            f"SpeechListener: Уровень шума {self.noise_floor.floor_db:.1f} дБ, "
+            f"порог речи {self.noise_floor.threshold:.0f}"
+        )
+
+    def current_utterance(self) -> Optional[AudioFrame]:
+        """Начало фразы, которая ещё произносится (от пре-ролла до последнего кадра), или None
+
+        Нужна потоковому распознаванию: оно декодирует растущее окно, не дожидаясь конца фразы.
+        """
+        onset = self._current_onset
+        if onset is None or self._legacy_mode():
+            return None
+        start, end = onset - self.preroll_frames, self._segment_index
+        if end <= onset:
+            return None
+        audio = AudioFrame(self.ring.read_range(start, end), self.config.sample_rate, self.sample_width, segmented=True)
+        audio.stream_range = (start, end)
+        return audio
+
+    def listen_once(self, timeout: Optional[float] = None) -> Optional[AudioFrame]:
+        """Записывает аудио с микрофона с VAD-фильтром и улучшенной обработкой тишины
+
+        timeout — сколько ждать готовую фразу (по умолчанию RecordConfig.timeout_s).
+        """
+        timeout = self.config.timeout_s if timeout is None else timeout
+        if not self._legacy_mode():
+            # Фразу уже нарезал фоновый сегментатор — просто забираем её из очереди
+            if not self.start() and self.exhausted:
+                return None
+            deadline = time.monotonic() + timeout
+            while True:
+                try:
+                    return self._utterances.get(timeout=max(0.0, min(0.1, deadline - time.monotonic())))
+                except queue.Empty:
+                    # Конечный источник мог закончиться, пока мы ждали
+                    if self.exhausted or time.monotonic() >= deadline:
+                        return None
 
-    def listen_once(self) -> Optional[sr.AudioData]:
-        """Записывает аудио с микрофона с VAD-фильтром и улучшенной обработкой тишины"""
         try:
-            with sr.Microphone(device_index=self.config.device_index) as source:
+            with sr.Microphone(device_index=self.source.device_index) as source:
                 # Быстрая калибровка под шум (0.3 сек вместо полной калибровки)
                 self.recognizer.adjust_for_ambient_noise(source, duration=0.3)
 
                 audio = self.recognizer.listen(
                     source,
-                    timeout=self.config.timeout_s,
+                    timeout=timeout,
                     phrase_time_limit=self.config.phrase_time_limit_s
                 )
 
@@ -40,11 +1014,17 @@ class SpeechListener:
                 # слишком мало аудио — пропускаем
                 return None
 
-            return audio
+            return AudioFrame.wrap(audio)
 
         except Exception:
             # Обрабатываем все исключения (WaitTimeoutError, OSError, и т.д.)
             return None
 
-
-
+    def close(self) -> None:
+        self._closed = True
+        if self._monitor_attached and self.device_monitor is not None:
+            self.device_monitor.unsubscribe(self._on_devices_changed)
+            self._monitor_attached = False
+        self.stop()
+        if isinstance(self.ring, SharedFrameRing) and not self.ring.released:
+            self.ring.release()
@@ -22,7 +22,7 @@ class SemanticRouter:
     - Все эти фразы будут распознаны как команда "browser"
     """
     
-    def __init__(self):
+    def __init__(self, model_path: Optional[str] = None):
         if not SENTENCE_TRANSFORMERS_AVAILABLE:
             raise ImportError(
                 "sentence-transformers не установлен. Установите: pip install sentence-transformers"
@@ -33,7 +33,8 @@ class SemanticRouter:
         
         # Используем лёгкую модель для быстрой работы
         # all-MiniLM-L6-v2 - быстрая и точная модель для русского и английского
-        self.model = SentenceTransformer("sentence-transformers/all-MiniLM-L6-v2")
+        # model_path — каталог из локального хранилища моделей (без обращения к сети)
+        self.model = SentenceTransformer(model_path or "sentence-transformers/all-MiniLM-L6-v2")
         self.logger.info("SemanticRouter: Модель загружена")
         
         # База команд: "имя команды" : [список примеров фраз]
@@ -62,6 +63,10 @@ class SemanticRouter:
         
         self.logger.debug(f"SemanticRouter: Добавлена команда '{name}' с {len(phrases)} примерами")
     
+    def warmup(self) -> None:
+        """Прогон кодировщика на короткой фразе — первая команда после простоя не платит за холодный старт"""
+        self.model.encode("открой браузер", normalize_embeddings=True)
+    
     def match(self, query: str, threshold: float = 0.62) -> Tuple[Optional[str], float]:
         """Находит наиболее подходящую команду для запроса
         
@@ -1,21 +1,45 @@
 from __future__ import annotations
 
+import json
 import logging
+import math
+import re
 import tempfile
+import threading
+import time
 from abc import ABC, abstractmethod
 from dataclasses import dataclass, field
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
 from pathlib import Path
-from typing import Optional
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
 
+import numpy as np
 import speech_recognition as sr
 
+from jarvis.core.audio import AudioFrame
+from jarvis.core.features import get_features
+from jarvis.core.google_stt import GOOGLE_SPEECH_KEY, GOOGLE_SPEECH_URL, GoogleSpeechClient
+from jarvis.core.model_store import ModelStore, whisper_model_name
+from jarvis.core.performance import PerformanceStats
+from jarvis.core.wake_word import WAKE_WORD, command_after, find_wake_word
+
 # Проверка доступности FasterWhisper
 try:
+    import ctranslate2
     from faster_whisper import WhisperModel
+    from faster_whisper.audio import pad_or_trim
+    from faster_whisper.tokenizer import Tokenizer as WhisperTokenizer
     FASTER_WHISPER_AVAILABLE = True
 except ImportError:
     FASTER_WHISPER_AVAILABLE = False
 
+# Проверка доступности Vosk
+try:
+    from vosk import KaldiRecognizer, Model as VoskModel, SetLogLevel
+    VOSK_AVAILABLE = True
+except ImportError:
+    VOSK_AVAILABLE = False
+
 
 @dataclass
 class STTStats:
@@ -23,45 +47,147 @@ class STTStats:
     total_success: int = 0
     total_errors: int = 0
     last_error: Optional[str] = None
+    partial_requests: int = 0  # Промежуточные декодирования потокового режима
+    finals_from_partial: int = 0  # Финалы, взятые из последней гипотезы без повторного декодирования
+
+
+@dataclass
+class WhisperResult:
+    """Результат Whisper с оценками уверенности"""
+    text: Optional[str]
+    avg_logprob: float  # Средняя лог-вероятность токенов
+    no_speech_prob: float  # Вероятность, что во фразе нет речи
+    audio_s: float
+    decode_ms: float
+
+
+@dataclass
+class CommandMatch:
+    """Результат оценки закрытого набора команд"""
+    phrase: Optional[str]  # Лучшая команда (с wake word, если он был во фразе) или None
+    score: float  # Средняя лог-вероятность токена лучшей команды
+    hypothesis: Optional[str]  # Жадная гипотеза, по которой отобраны кандидаты
+    hypothesis_score: float
+    candidates: int  # Сколько команд оценено принудительным декодированием
+    decode_ms: float
+
+
+@dataclass
+class CommandStats:
+    requests: int = 0
+    accepted: int = 0  # Фраза распознана как известная команда
+    open_decodes: int = 0  # Ни одна команда не подошла — обычное распознавание
+    command_ms: float = 0.0  # Оценка команд (кодировщик + жадный проход + оценка кандидатов)
+    open_ms: float = 0.0  # Обычное распознавание после неудачной оценки
+
+
+def _trigrams(text: str) -> frozenset:
+    padded = f"  {text} "
+    return frozenset(padded[i:i + 3] for i in range(len(padded) - 2))
+
+
+def speech_only(audio: sr.AudioData) -> Optional[AudioFrame]:
+    """Оставляет от фразы только участок речи по признакам FeatureFrontend
+
+    Признаки кэшируются на AudioFrame, поэтому все бэкенды (и повторные
+    попытки) используют один расчёт. None — речи в аудио нет.
+    """
+    audio = AudioFrame.wrap(audio)
+    features = get_features(audio)
+    bounds = features.speech_bounds
+    if bounds is None:
+        return None
+    start, end = bounds
+    if start <= features.hop_s and end >= features.duration_s - features.hop_s:
+        return audio
+    return audio.crop(start, end)
 
 
 class STTBackend(ABC):
-    """Базовый класс для бэкендов распознавания речи"""
+    """Базовый класс для бэкендов распознавания речи
+
+    supports_streaming — бэкенд умеет быстро декодировать незаконченную
+    фразу (recognize_partial), и StreamingTranscriber может показывать
+    промежуточные гипотезы, пока пользователь ещё говорит.
+    """
+
+    supports_streaming: bool = False
+    # Бэкенд сам принимает кадры по мере записи (Vosk): потоковый режим нужен всегда,
+    # а финал дешевле взять у бэкенда, чем переиспользовать промежуточную гипотезу
+    incremental: bool = False
     
     @abstractmethod
     def recognize(self, audio: sr.AudioData) -> Optional[str]:
         """Распознаёт речь из аудио"""
         raise NotImplementedError
 
+    def recognize_partial(self, audio: sr.AudioData) -> Optional[str]:
+        """Промежуточная гипотеза по началу фразы (по умолчанию — обычное распознавание)"""
+        return self.recognize(audio)
+
+    def recognize_with_confidence(self, audio: sr.AudioData) -> Tuple[Optional[str], Optional[float]]:
+        """Текст и уверенность 0..1 (None — бэкенд уверенность не сообщает)"""
+        return self.recognize(audio), None
+
+    def warmup(self) -> None:
+        """Прогрев перед ожидаемой фразой (после wake word): модель и соединения — в рабочее состояние"""
+
 
 @dataclass
 class GoogleSTTBackend(STTBackend):
-    """Бэкенд для Google Speech Recognition API"""
-    
-    recognizer: sr.Recognizer = field(default_factory=lambda: GoogleSTTBackend._create_optimized_recognizer())
+    """Бэкенд для Google Speech Recognition API
+
+    Запросы идут через GoogleSpeechClient: постоянные соединения, FLAC
+    16 кГц, срок на запрос и дублирующий запрос при задержке выше p95.
+    Адрес настраивается (endpoint) — в тестах его заменяет локальный HTTP-сервер.
+    """
+
+    # Каждый запрос — полный HTTP-запрос по всей фразе, промежуточные гипотезы слишком дороги
+    supports_streaming = False
     
-    @staticmethod
-    def _create_optimized_recognizer() -> sr.Recognizer:
-        """Создаёт оптимизированный распознаватель для быстрой работы"""
-        rec = sr.Recognizer()
-        # Turbo-режим распознавания
-        rec.dynamic_energy_threshold = True
-        rec.energy_threshold = 150  # Низкий порог для чувствительности
-        rec.pause_threshold = 0.4  # Быстрая реакция на паузу
-        rec.non_speaking_duration = 0.2  # Минимальная пауза
-        return rec
+    endpoint: str = GOOGLE_SPEECH_URL
+    api_key: str = GOOGLE_SPEECH_KEY
+    language: str = "ru-RU"
+    deadline_s: float = 5.0  # Общий срок на распознавание фразы
+    hedge: bool = True  # Дублирующий запрос, если ответ дольше p95
+    client: Optional[GoogleSpeechClient] = field(default=None, repr=False)
+
+    def __post_init__(self) -> None:
+        if self.client is None:
+            self.client = GoogleSpeechClient(
+                endpoint=self.endpoint,
+                api_key=self.api_key,
+                language=self.language,
+                deadline_s=self.deadline_s,
+                hedge=self.hedge,
+            )
     
     def recognize(self, audio: sr.AudioData) -> Optional[str]:
         """Распознаёт речь через Google Speech Recognition API"""
+        text, _ = self.recognize_with_confidence(audio)
+        return text
+
+    def recognize_with_confidence(self, audio: sr.AudioData) -> Tuple[Optional[str], Optional[float]]:
+        audio = speech_only(audio)
+        if audio is None:
+            # Без речи запрос к API не отправляем
+            return None, None
         try:
-            text = self.recognizer.recognize_google(audio, language="ru-RU")
-            return text if text else None
+            return self.client.recognize(audio)
         except sr.UnknownValueError:
-            return None
+            return None, None
         except sr.RequestError as e:
             logger = logging.getLogger("jarvis")
             logger.warning(f"Google STT RequestError: {e}")
-            return None
+            return None, None
+
+    def warmup(self) -> None:
+        """Свежее соединение к API: после простоя сервер закрывает старые, и первая фраза платила бы за TLS"""
+        self.client.warmup()
+
+    def snapshot(self) -> Dict[str, object]:
+        """Задержки, дубли и переиспользование соединений (для performance.json)"""
+        return self.client.snapshot()
 
 
 @dataclass
@@ -74,14 +200,42 @@ class WhisperSTTBackend(STTBackend):
     - Точнее Google, особенно на русском
     
     Модель загружается при первом использовании (~300 МБ)
+
+    Поддерживает потоковый режим: промежуточные гипотезы декодируются
+    жадно (beam_size=1) по растущему окну, финальная — с beam_size=5.
+
+    Командный режим (commands): фраза сначала сравнивается с закрытым
+    набором известных команд. Аудио кодируется один раз, жадный проход
+    даёт черновую гипотезу, по ней отбираются ближайшие command_shortlist
+    команд, и каждая оценивается принудительным декодированием (средняя
+    лог-вероятность токенов вместе с концом текста). Если лучшая команда
+    набрала не меньше command_min_score и не сильно уступает самой
+    гипотезе, возвращается точная фраза команды; иначе — обычное
+    распознавание с beam search.
     """
+
+    supports_streaming = True
     
     model_size: str = "base"  # tiny, base, small, medium, large-v2, large-v3
     device: str = "cpu"  # cpu, cuda
     compute_type: str = "int8"  # int8, int8_float16, int16, float16, float32
     language: str = "ru"  # ru, en, etc.
+    input_mode: str = "array"  # array — float32 из памяти, file — через временный WAV (для сравнения)
+    beam_size: int = 5  # Ширина beam search для финального распознавания (1 — жадный поиск)
+    cpu_threads: int = 0  # Потоки CTranslate2 на CPU (0 — по умолчанию)
+    num_workers: int = 1  # Параллельные декодирования одной модели (для вызовов из нескольких потоков)
+    model_root: str = ""  # Локальное хранилище моделей (пусто — загрузка по имени через кэш Hugging Face)
+    commands: List[str] = field(default_factory=list)  # Закрытый набор команд (пусто — только обычное распознавание)
+    command_min_score: float = -1.0  # Минимальная средняя лог-вероятность токена команды
+    command_margin: float = 0.3  # Насколько команда может уступать жадной гипотезе
+    command_shortlist: int = 8  # Сколько ближайших к гипотезе команд оценивать
+    perf: PerformanceStats = field(default_factory=PerformanceStats, repr=False)  # Подготовка и декодирование по фразам
+    command_stats: CommandStats = field(default_factory=CommandStats, repr=False)
     
     _model: Optional[object] = field(default=None, init=False, repr=False)
+    _model_path: str = field(default="", init=False, repr=False)  # Проверенный каталог модели в хранилище
+    _tokenizer: Optional[object] = field(default=None, init=False, repr=False)
+    _command_index: Optional[List[Tuple[str, frozenset]]] = field(default=None, init=False, repr=False)
     _logger: logging.Logger = field(default_factory=lambda: logging.getLogger("jarvis"), init=False, repr=False)
     
     def __post_init__(self) -> None:
@@ -90,6 +244,10 @@ class WhisperSTTBackend(STTBackend):
             raise ImportError(
                 "faster-whisper не установлен. Установите: pip install faster-whisper"
             )
+        if self.model_root:
+            # Модель ищется в хранилище сразу: если её нет или она повреждена, ModelStoreError
+            # возникает при создании бэкенда, и вызывающий код переключается на другой движок
+            self._model_path = str(ModelStore(self.model_root).resolve(whisper_model_name(self.model_size)))
     
     def _get_model(self):
         """Ленивая загрузка модели Whisper"""
@@ -97,9 +255,12 @@ class WhisperSTTBackend(STTBackend):
             self._logger.info(f"WhisperSTT: Загрузка модели {self.model_size}...")
             try:
                 self._model = WhisperModel(
-                    self.model_size,
+                    self._model_path or self.model_size,  # Каталог из хранилища — без обращения к сети
                     device=self.device,
-                    compute_type=self.compute_type
+                    compute_type=self.compute_type,
+                    cpu_threads=self.cpu_threads,
+                    num_workers=self.num_workers,
+                    local_files_only=bool(self.model_root),
                 )
                 self._logger.info(f"WhisperSTT: Модель {self.model_size} успешно загружена")
             except Exception as e:
@@ -109,60 +270,726 @@ class WhisperSTTBackend(STTBackend):
     
     def recognize(self, audio: sr.AudioData) -> Optional[str]:
         """Распознаёт речь через FasterWhisper"""
+        if self.commands:
+            return self._recognize_command(audio)
+        return self._decode(audio, beam_size=self.beam_size, input_mode=self.input_mode, label=self.input_mode)
+
+    def _recognize_command(self, audio: sr.AudioData) -> Optional[str]:
+        stats = self.command_stats
+        stats.requests += 1
+        match = self.score_commands(audio)
+        if match is not None:
+            stats.command_ms += match.decode_ms
+            if match.phrase is not None:
+                stats.accepted += 1
+                return match.phrase
+        stats.open_decodes += 1
+        start = time.perf_counter()
+        text = self._decode(audio, beam_size=self.beam_size, input_mode=self.input_mode, label=self.input_mode)
+        stats.open_ms += (time.perf_counter() - start) * 1000.0
+        return text
+
+    def score_commands(self, audio: sr.AudioData) -> Optional[CommandMatch]:
+        """Оценивает фразу на закрытом наборе команд (None — нет речи или ошибка)
+
+        CommandMatch.phrase — точная фраза команды, если она принята, иначе None.
+        """
+        try:
+            audio = speech_only(audio)
+            if audio is None or not self.commands:
+                return None
+            model = self._get_model()
+            tokenizer = self._get_tokenizer()
+            start = time.perf_counter()
+            extractor = model.feature_extractor
+            samples = audio.float32()
+            features = extractor(samples)[:, : extractor.nb_max_frames]
+            num_frames = min(extractor.nb_max_frames, len(samples) // extractor.hop_length)
+            encoder_output = model.encode(pad_or_trim(features, extractor.nb_max_frames))
+
+            # Черновая гипотеза жадным поиском по уже посчитанному выходу кодировщика
+            draft = model.model.generate(
+                encoder_output,
+                [tokenizer.sot_sequence + [tokenizer.no_timestamps]],
+                beam_size=1,
+                max_length=64,
+            )[0]
+            hypothesis = self._normalize_command(tokenizer.decode(draft.sequences_ids[0]))
+            if not hypothesis:
+                decode_ms = (time.perf_counter() - start) * 1000.0
+                return CommandMatch(None, float("-inf"), None, float("-inf"), 0, decode_ms)
+
+            wake_match = find_wake_word(hypothesis)
+            wake = wake_match is not None
+            command = command_after(hypothesis, wake_match) if wake else hypothesis
+            if wake and not command:
+                candidates = [WAKE_WORD]
+            else:
+                candidates = self._shortlist(command or "")
+            if not candidates:
+                # Ни одна команда не похожа на гипотезу — принудительная оценка ничего не даст
+                decode_ms = (time.perf_counter() - start) * 1000.0
+                self.perf.record("whisper_command_ms", decode_ms)
+                return CommandMatch(None, float("-inf"), hypothesis, float("-inf"), 0, decode_ms)
+            phrases = [f"{WAKE_WORD} {c}" if wake and c != WAKE_WORD else c for c in candidates]
+            # Гипотеза оценивается вместе с кандидатами — с ней сравнивается лучшая команда
+            scores = self._force_score(model, tokenizer, encoder_output, num_frames, phrases + [hypothesis])
+            hypothesis_score = scores.pop()
+            best = int(np.argmax(scores)) if scores else -1
+            decode_ms = (time.perf_counter() - start) * 1000.0
+            self.perf.record("whisper_command_ms", decode_ms)
+
+            match = CommandMatch(
+                phrase=None,
+                score=scores[best] if best >= 0 else float("-inf"),
+                hypothesis=hypothesis,
+                hypothesis_score=hypothesis_score,
+                candidates=len(phrases),
+                decode_ms=decode_ms,
+            )
+            if best >= 0 and match.score >= self.command_min_score and match.score >= hypothesis_score - self.command_margin:
+                match.phrase = phrases[best]
+            self._logger.debug(
+                f"WhisperSTT: Команда: '{match.phrase}' ({match.score:.2f}), гипотеза: '{hypothesis}' "
+                f"({hypothesis_score:.2f}), кандидатов: {len(phrases)}, {decode_ms:.0f} мс"
+            )
+            return match
+        except Exception as e:
+            self._logger.warning(f"WhisperSTT: Ошибка оценки команд: {e}", exc_info=True)
+            return None
+
+    def _get_tokenizer(self):
+        if self._tokenizer is None:
+            model = self._get_model()
+            self._tokenizer = WhisperTokenizer(
+                model.hf_tokenizer,
+                model.model.is_multilingual,
+                task="transcribe",
+                language=self.language,
+            )
+        return self._tokenizer
+
+    def warmup(self) -> None:
+        """Проход кодировщика и короткое декодирование по секунде тишины
+
+        После долгого простоя веса модели могут быть вытеснены из кэша и
+        памяти; первая команда платила бы за их подкачку.
+        """
+        model = self._get_model()
+        extractor = model.feature_extractor
+        features = extractor(np.zeros(extractor.sampling_rate, dtype=np.float32))
+        encoder_output = model.encode(pad_or_trim(features, extractor.nb_max_frames))
+        tokenizer = self._get_tokenizer()
+        model.model.generate(encoder_output, [tokenizer.sot_sequence + [tokenizer.no_timestamps]], beam_size=1, max_length=4)
+
+    @staticmethod
+    def _normalize_command(text: str) -> str:
+        return " ".join(re.sub(r"[^\w\s-]", " ", text.lower()).split())
+
+    def _shortlist(self, command: str) -> List[str]:
+        """Команды, ближайшие к гипотезе по символьным триграммам (коэффициент Дайса); без общих триграмм — не кандидаты"""
+        if self._command_index is None:
+            phrases = dict.fromkeys(self._normalize_command(c) for c in self.commands)
+            self._command_index = [(phrase, _trigrams(phrase)) for phrase in phrases if phrase]
+        query = _trigrams(command)
+        ranked = sorted(
+            ((2.0 * len(query & trigrams) / (len(query) + len(trigrams)), phrase) for phrase, trigrams in self._command_index),
+            reverse=True,
+        )
+        return [phrase for score, phrase in ranked[: self.command_shortlist] if score > 0.0]
+
+    @staticmethod
+    def _force_score(model, tokenizer, encoder_output, num_frames: int, texts: List[str]) -> List[float]:
+        """Средняя лог-вероятность токенов каждого текста (вместе с концом текста) при заданном аудио"""
+        # Текст в том виде, в каком его выдаёт Whisper: пробел в начале, первая буква заглавная
+        sequences = [tokenizer.encode(" " + text[:1].upper() + text[1:]) + [tokenizer.eot] for text in texts]
+        # align оценивает по одной последовательности на элемент батча — размножаем выход кодировщика.
+        # NumPy видит только память CPU: выход кодировщика на GPU копируется, align вернёт его на устройство модели
+        if encoder_output.device != "cpu":
+            encoder_output = encoder_output.to_device(ctranslate2.Device.cpu)
+        tiled = ctranslate2.StorageView.from_array(np.ascontiguousarray(np.repeat(np.asarray(encoder_output), len(texts), axis=0)))
+        results = model.model.align(tiled, tokenizer.sot_sequence, sequences, num_frames)
+        return [float(np.mean(np.log(np.maximum(result.text_token_probs, 1e-10)))) for result in results]
+
+    def command_snapshot(self) -> Dict[str, object]:
+        """Доля фраз, распознанных как команды, и задержки обоих путей (для performance.json)"""
+        stats = self.command_stats
+        return {
+            "requests": stats.requests,
+            "commands": len(self.commands),
+            "accepted": stats.accepted,
+            "accept_rate": round(stats.accepted / stats.requests, 3) if stats.requests else 0.0,
+            "open_decodes": stats.open_decodes,
+            "avg_command_ms": round(stats.command_ms / stats.requests, 1) if stats.requests else 0.0,
+            "avg_open_ms": round(stats.open_ms / stats.open_decodes, 1) if stats.open_decodes else 0.0,
+        }
+
+    def recognize_partial(self, audio: sr.AudioData) -> Optional[str]:
+        """Быстрая промежуточная гипотеза: жадный поиск, вход из памяти"""
+        return self._decode(audio, beam_size=1, input_mode="array", label="partial")
+
+    def transcribe(self, audio: sr.AudioData, beam_size: Optional[int] = None, label: Optional[str] = None) -> Optional[WhisperResult]:
+        """Распознавание с оценками уверенности (None — ошибка или нет речи)"""
+        return self._transcribe(
+            audio,
+            beam_size=self.beam_size if beam_size is None else beam_size,
+            input_mode=self.input_mode,
+            label=label or self.input_mode,
+        )
+
+    def recognize_with_confidence(self, audio: sr.AudioData) -> Tuple[Optional[str], Optional[float]]:
+        """Уверенность — средняя вероятность токена exp(avg_logprob)"""
+        result = self.transcribe(audio)
+        if result is None or not result.text:
+            return None, None
+        return result.text, math.exp(result.avg_logprob)
+
+    def _decode(self, audio: sr.AudioData, beam_size: int, input_mode: str, label: str) -> Optional[str]:
+        result = self._transcribe(audio, beam_size, input_mode, label)
+        return result.text if result is not None and result.text else None
+
+    def _transcribe(self, audio: sr.AudioData, beam_size: int, input_mode: str, label: str) -> Optional[WhisperResult]:
         tmp_path = None
         try:
+            # Речь уже найдена (SpeechListener или FeatureFrontend) — свой VAD Whisper не нужен
+            audio = speech_only(audio)
+            if audio is None:
+                self._logger.debug("WhisperSTT: В аудио нет речи, распознавание пропущено")
+                return None
             model = self._get_model()
-            
-            # Конвертируем AudioData в WAV байты для Whisper
-            wav_data = audio.get_wav_data()
-            
-            # Whisper принимает путь к файлу или numpy массив
-            # Используем временный файл для простоты
-            with tempfile.NamedTemporaryFile(delete=False, suffix=".wav") as tmp:
-                tmp.write(wav_data)
-                tmp_path = tmp.name
-            
-            # Распознавание
+
+            prepare_start = time.perf_counter()
+            if input_mode == "file":
+                # Старый путь через WAV-файл — оставлен для сравнения замеров
+                with tempfile.NamedTemporaryFile(delete=False, suffix=".wav") as tmp:
+                    tmp.write(audio.wav_bytes())
+                    tmp_path = tmp.name
+                whisper_input = tmp_path
+            else:
+                # float32 16 кГц прямо из памяти: без диска и без кодирования/декодирования WAV
+                whisper_input = audio.float32()
+            prepare_ms = (time.perf_counter() - prepare_start) * 1000.0
+
+            # Распознавание (сегменты декодируются лениво, поэтому время меряем вместе со сборкой текста)
+            decode_start = time.perf_counter()
             segments, info = model.transcribe(
-                tmp_path,
+                whisper_input,
                 language=self.language,
-                beam_size=5,
-                vad_filter=True,  # Voice Activity Detection
-                vad_parameters=dict(
-                    min_silence_duration_ms=200,  # Минимальная пауза
-                    threshold=0.5  # Порог VAD
-                )
+                beam_size=beam_size,
+                vad_filter=False,
             )
-            
-            # Собираем текст из сегментов
-            text_parts = []
-            for segment in segments:
-                text_parts.append(segment.text.strip())
-            
-            text = " ".join(text_parts).strip()
-            
-            # Удаляем временный файл
-            if tmp_path:
-                try:
-                    Path(tmp_path).unlink(missing_ok=True)
-                except Exception:
-                    pass  # Игнорируем ошибки удаления
-            
+            segments = list(segments)
+            text = " ".join(segment.text.strip() for segment in segments).strip()
+            decode_ms = (time.perf_counter() - decode_start) * 1000.0
+
+            self.perf.record(f"whisper_{label}_prepare_ms", prepare_ms)
+            self.perf.record(f"whisper_{label}_decode_ms", decode_ms)
+            self._logger.debug(
+                f"WhisperSTT: {audio.duration_s:.2f} с аудио, подготовка {prepare_ms:.1f} мс, "
+                f"декодирование {decode_ms:.0f} мс (вход: {label})"
+            )
+
+            # Уверенность по фразе: средние по сегментам с весом по числу токенов
+            weights = [max(1, len(getattr(segment, "tokens", ()) or ())) for segment in segments]
+            total = float(sum(weights)) or 1.0
+            avg_logprob = sum(w * float(getattr(seg, "avg_logprob", 0.0)) for w, seg in zip(weights, segments)) / total
+            no_speech_prob = sum(w * float(getattr(seg, "no_speech_prob", 0.0)) for w, seg in zip(weights, segments)) / total
+
             if text:
                 self._logger.debug(f"WhisperSTT: Распознано: '{text}' (язык: {info.language}, вероятность: {info.language_probability:.2f})")
-                return text
-            
-            return None
-            
+            return WhisperResult(
+                text=text or None,
+                avg_logprob=avg_logprob if segments else float("-inf"),
+                no_speech_prob=no_speech_prob if segments else 1.0,
+                audio_s=audio.duration_s,
+                decode_ms=prepare_ms + decode_ms,
+            )
+
         except Exception as e:
             self._logger.warning(f"WhisperSTT: Ошибка распознавания: {e}", exc_info=True)
-            # Удаляем временный файл даже при ошибке
+            return None
+        finally:
             if tmp_path:
                 try:
                     Path(tmp_path).unlink(missing_ok=True)
                 except Exception:
-                    pass
-            return None
+                    pass  # Игнорируем ошибки удаления
+
+
+@dataclass
+class CascadeStats:
+    """Счётчики каскада: сколько фраз ушло на большую модель и сколько времени сэкономлено"""
+    requests: int = 0
+    accepted_fast: int = 0
+    escalated: int = 0
+    reasons: Dict[str, int] = field(default_factory=dict)  # Причины эскалации: empty, logprob, no_speech, route
+    fast_ms: float = 0.0  # Все декодирования быстрой модели
+    fast_accepted_ms: float = 0.0  # Только принятые результаты быстрой модели
+    fast_accepted_audio_s: float = 0.0
+    accurate_ms: float = 0.0
+    accurate_audio_s: float = 0.0
+
+
+@dataclass
+class CascadeSTTBackend(STTBackend):
+    """Двухпроходный каскад Whisper: быстрая модель первой, большая — только при сомнении
+
+    Большинство фраз — короткие команды, которые tiny с жадным поиском
+    распознаёт правильно. Фраза уходит на точную модель (base, beam search),
+    если быстрая модель ничего не распознала, avg_logprob ниже порога,
+    no_speech_prob выше порога или текст не проходит route_check
+    (например, CommandRouter.can_route).
+
+    Экономия считается по средней скорости точной модели (мс на секунду
+    аудио), измеренной на эскалированных фразах.
+    """
+
+    supports_streaming = True
+
+    fast: WhisperSTTBackend = None
+    accurate: WhisperSTTBackend = None
+    min_avg_logprob: float = -0.7
+    max_no_speech_prob: float = 0.6
+    route_check: Optional[Callable[[str], bool]] = None
+    cascade_stats: CascadeStats = field(default_factory=CascadeStats)
+    _logger: logging.Logger = field(default_factory=lambda: logging.getLogger("jarvis"), init=False, repr=False)
+
+    def __post_init__(self) -> None:
+        if self.fast is None or self.accurate is None:
+            raise ValueError("CascadeSTTBackend: нужны обе модели (fast и accurate)")
+        self.accurate.perf = self.fast.perf
+
+    @property
+    def perf(self) -> PerformanceStats:
+        # Замеры обоих проходов в одном месте (whisper_fast_*, whisper_accurate_*)
+        return self.fast.perf
+
+    def _get_model(self):
+        """Загружает обе модели заранее, чтобы эскалация не платила за холодный старт"""
+        self.accurate._get_model()
+        return self.fast._get_model()
+
+    def warmup(self) -> None:
+        self.fast.warmup()
+        self.accurate.warmup()
+
+    def recognize(self, audio: sr.AudioData) -> Optional[str]:
+        stats = self.cascade_stats
+        stats.requests += 1
+        first = self.fast.transcribe(audio, beam_size=1, label="fast")
+        if first is not None:
+            stats.fast_ms += first.decode_ms
+        reason = self._escalation_reason(first)
+        if reason is None:
+            stats.accepted_fast += 1
+            stats.fast_accepted_ms += first.decode_ms
+            stats.fast_accepted_audio_s += first.audio_s
+            return first.text
+        stats.escalated += 1
+        stats.reasons[reason] = stats.reasons.get(reason, 0) + 1
+        second = self.accurate.transcribe(audio, label="accurate")
+        if second is None:
+            # Точная модель тоже не справилась — лучше неуверенный ответ быстрой, чем ничего
+            return first.text if first is not None else None
+        stats.accurate_ms += second.decode_ms
+        stats.accurate_audio_s += second.audio_s
+        self._logger.debug(
+            f"CascadeSTT: Эскалация ({reason}): '{first.text if first else None}' -> '{second.text}'"
+        )
+        return second.text
+
+    def recognize_partial(self, audio: sr.AudioData) -> Optional[str]:
+        """Промежуточные гипотезы — только быстрой моделью"""
+        return self.fast.recognize_partial(audio)
+
+    def _escalation_reason(self, result: Optional[WhisperResult]) -> Optional[str]:
+        if result is None or not result.text:
+            return "empty"
+        if result.no_speech_prob > self.max_no_speech_prob:
+            return "no_speech"
+        if result.avg_logprob < self.min_avg_logprob:
+            return "logprob"
+        if self.route_check is not None:
+            try:
+                if not self.route_check(result.text):
+                    return "route"
+            except Exception as e:
+                self._logger.debug(f"CascadeSTT: Ошибка проверки маршрута: {e}")
+        return None
+
+    def snapshot(self) -> Dict[str, object]:
+        """Частота эскалаций и сэкономленное время по моделям (для performance.json)"""
+        stats = self.cascade_stats
+        accurate_ms_per_s = stats.accurate_ms / stats.accurate_audio_s if stats.accurate_audio_s else None
+        saved_ms = None
+        if accurate_ms_per_s is not None:
+            saved_ms = stats.fast_accepted_audio_s * accurate_ms_per_s - stats.fast_accepted_ms
+        wasted_ms = stats.fast_ms - stats.fast_accepted_ms  # Быстрые проходы, после которых всё равно была эскалация
+        return {
+            "requests": stats.requests,
+            "escalation_rate": round(stats.escalated / stats.requests, 3) if stats.requests else 0.0,
+            "reasons": dict(stats.reasons),
+            self.fast.model_size: {
+                "role": "fast",
+                "accepted": stats.accepted_fast,
+                "avg_ms": round(stats.fast_ms / stats.requests, 1) if stats.requests else 0.0,
+                "saved_ms_total": round(saved_ms, 1) if saved_ms is not None else None,
+            },
+            self.accurate.model_size: {
+                "role": "accurate",
+                "escalated": stats.escalated,
+                "avg_ms": round(stats.accurate_ms / stats.escalated, 1) if stats.escalated else 0.0,
+                "ms_per_audio_s": round(accurate_ms_per_s, 1) if accurate_ms_per_s is not None else None,
+                "fast_pass_overhead_ms_total": round(wasted_ms, 1),
+            },
+        }
+
+
+@dataclass
+class RaceStats:
+    """Статистика одного участника гонки"""
+    calls: int = 0
+    wins: int = 0
+    errors: int = 0
+    cancelled: int = 0  # Не успели стартовать до победы другого бэкенда
+    skipped: int = 0  # Пропустили гонку: ещё декодировали прошлую фразу
+    completed: int = 0
+    latency_ms_total: float = 0.0
+
+
+@dataclass
+class RacingSTTBackend(STTBackend):
+    """Гонка бэкендов: одна фраза уходит во все сразу, побеждает первый уверенный ответ
+
+    Задержка Google зависит от сети, Whisper — от загрузки CPU, поэтому
+    заранее выбрать быстрый бэкенд нельзя. Результат принимается, если
+    текст не пустой и уверенность не ниже порога (или бэкенд её не сообщает).
+    Оставшиеся запросы отменяются, если ещё не начались, иначе их ответ
+    игнорируется, но задержка всё равно учитывается в статистике. Если
+    ни один ответ не прошёл порог, возвращается самый уверенный из непустых.
+
+    У каждого бэкенда свой поток: медленный проигравший не занимает общий
+    пул, а бэкенд, который ещё декодирует прошлую фразу, в новой гонке
+    пропускается (если заняты все — фраза ждёт в их очередях).
+    """
+
+    backends: Dict[str, STTBackend] = field(default_factory=dict)
+    min_confidence: float = 0.5
+    min_confidence_by_backend: Dict[str, float] = field(default_factory=dict)  # Свой порог для бэкенда
+    deadline_s: float = 10.0
+    races: int = 0
+    no_winner: int = 0
+    race_stats: Dict[str, RaceStats] = field(default_factory=dict)
+    _pools: Dict[str, ThreadPoolExecutor] = field(default_factory=dict, init=False, repr=False)
+    _running: Dict[str, Future] = field(default_factory=dict, init=False, repr=False)
+    _lock: threading.Lock = field(default_factory=threading.Lock, init=False, repr=False)
+    _logger: logging.Logger = field(default_factory=lambda: logging.getLogger("jarvis"), init=False, repr=False)
+
+    def __post_init__(self) -> None:
+        if not self.backends:
+            raise ValueError("RacingSTTBackend: нужен хотя бы один бэкенд")
+        for name in self.backends:
+            self.race_stats.setdefault(name, RaceStats())
+            self._pools[name] = ThreadPoolExecutor(max_workers=1, thread_name_prefix=f"STT-Race-{name}")
+        self.supports_streaming = any(backend.supports_streaming for backend in self.backends.values())
+
+    def _get_model(self):
+        """Предзагрузка моделей локальных участников"""
+        for backend in self.backends.values():
+            if hasattr(backend, "_get_model"):
+                backend._get_model()
+
+    def warmup(self) -> None:
+        for backend in self.backends.values():
+            backend.warmup()
+
+    def recognize(self, audio: sr.AudioData) -> Optional[str]:
+        text, _ = self.recognize_with_confidence(audio)
+        return text
+
+    def recognize_partial(self, audio: sr.AudioData) -> Optional[str]:
+        """Промежуточные гипотезы — от первого участника с потоковым режимом"""
+        for backend in self.backends.values():
+            if backend.supports_streaming:
+                return backend.recognize_partial(audio)
+        return None
+
+    def recognize_with_confidence(self, audio: sr.AudioData) -> Tuple[Optional[str], Optional[float]]:
+        audio = AudioFrame.wrap(audio)
+        # Признаки считаем до старта: иначе каждый поток посчитает их заново
+        get_features(audio)
+        with self._lock:
+            self.races += 1
+            busy = {name for name, future in self._running.items() if not future.done()}
+            if len(busy) == len(self.backends):
+                busy = set()
+            for name in busy:
+                self.race_stats[name].skipped += 1
+        futures: Dict[Future, str] = {}
+        for name, backend in self.backends.items():
+            if name in busy:
+                continue
+            future = self._pools[name].submit(self._run, name, backend, audio)
+            self._running[name] = future
+            futures[future] = name
+        deadline = time.monotonic() + self.deadline_s
+        pending = set(futures)
+        winner: Optional[Tuple[str, str, Optional[float]]] = None
+        best: Optional[Tuple[str, str, Optional[float]]] = None
+        while pending and winner is None:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            done, pending = wait(pending, timeout=remaining, return_when=FIRST_COMPLETED)
+            for future in done:
+                name = futures[future]
+                text, confidence = future.result()
+                if not text:
+                    continue
+                if self._accepts(name, confidence):
+                    winner = (name, text, confidence)
+                    break
+                if best is None or (confidence or 0.0) > (best[2] or 0.0):
+                    best = (name, text, confidence)
+        for future in pending:
+            if future.cancel():
+                with self._lock:
+                    self.race_stats[futures[future]].cancelled += 1
+
+        if winner is None:
+            with self._lock:
+                self.no_winner += 1
+            winner = best
+        if winner is None:
+            return None, None
+        name, text, confidence = winner
+        with self._lock:
+            self.race_stats[name].wins += 1
+        self._logger.debug(f"RacingSTT: Победил {name}: '{text}' (уверенность: {confidence})")
+        return text, confidence
+
+    def _accepts(self, name: str, confidence: Optional[float]) -> bool:
+        threshold = self.min_confidence_by_backend.get(name, self.min_confidence)
+        return confidence is None or confidence >= threshold
+
+    def _run(self, name: str, backend: STTBackend, audio: AudioFrame) -> Tuple[Optional[str], Optional[float]]:
+        stats = self.race_stats[name]
+        with self._lock:
+            stats.calls += 1
+        start = time.perf_counter()
+        try:
+            return backend.recognize_with_confidence(audio)
+        except Exception as e:
+            with self._lock:
+                stats.errors += 1
+            self._logger.debug(f"RacingSTT: Ошибка бэкенда {name}: {e}")
+            return None, None
+        finally:
+            with self._lock:
+                stats.completed += 1
+                stats.latency_ms_total += (time.perf_counter() - start) * 1000.0
+
+    def snapshot(self) -> Dict[str, object]:
+        """Доля побед и средняя задержка по бэкендам (для performance.json)"""
+        with self._lock:
+            return {
+                "races": self.races,
+                "no_confident_winner": self.no_winner,
+                "backends": {
+                    name: {
+                        "calls": stats.calls,
+                        "wins": stats.wins,
+                        "win_rate": round(stats.wins / self.races, 3) if self.races else 0.0,
+                        "errors": stats.errors,
+                        "cancelled": stats.cancelled,
+                        "skipped": stats.skipped,
+                        "avg_latency_ms": round(stats.latency_ms_total / stats.completed, 1) if stats.completed else 0.0,
+                    }
+                    for name, stats in self.race_stats.items()
+                },
+            }
+
+
+@dataclass
+class VoskStats:
+    requests: int = 0
+    grammar_accepted: int = 0  # Команда из грамматики принята без основного бэкенда
+    fallbacks: int = 0
+    reasons: Dict[str, int] = field(default_factory=dict)  # Причины перехода к основному бэкенду: empty, unk, confidence
+    streamed_s: float = 0.0  # Аудио, поданное в распознаватель во время речи
+    tail_s: float = 0.0  # Аудио, поданное уже после конца фразы
+    final_ms: float = 0.0  # От конца фразы до результата Vosk
+    fallback_ms: float = 0.0
+
+
+@dataclass
+class VoskSTTBackend(STTBackend):
+    """Потоковое распознавание через Vosk (Kaldi) с грамматикой команд
+
+    Кадры подаются в распознаватель по мере записи: StreamingTranscriber
+    присылает растущее окно, а бэкенд дописывает только новые кадры (по
+    stream_range). К концу фразы почти всё аудио уже декодировано, и финал
+    готов через несколько миллисекунд.
+
+    В командном режиме (grammar) распознаватель ограничен известными
+    фразами роутера и wake word: закрытый словарь декодируется быстрее
+    и точнее. Если в результате есть [unk], он пуст или уверенность слов
+    ниже min_confidence — фраза не из словаря, и она уходит в основной
+    бэкенд (fallback) с открытым словарём.
+    """
+
+    supports_streaming = True
+    incremental = True
+
+    model_path: str = ""  # Каталог модели Vosk (например, vosk-model-small-ru-0.22)
+    grammar: List[str] = field(default_factory=list)  # Фразы командного режима (пусто — открытый словарь)
+    fallback: Optional[STTBackend] = None  # Основной бэкенд для фраз вне грамматики
+    min_confidence: float = 0.6  # Минимальная уверенность слова в командном режиме
+    vosk_stats: VoskStats = field(default_factory=VoskStats)
+    _model: Optional[object] = field(default=None, init=False, repr=False)
+    _grammar_json: Optional[str] = field(default=None, init=False, repr=False)
+    _stream: Optional[dict] = field(default=None, init=False, repr=False)
+    _lock: threading.Lock = field(default_factory=threading.Lock, init=False, repr=False)
+    _logger: logging.Logger = field(default_factory=lambda: logging.getLogger("jarvis"), init=False, repr=False)
+
+    def __post_init__(self) -> None:
+        if not VOSK_AVAILABLE:
+            raise ImportError("vosk не установлен. Установите: pip install vosk")
+        if not self.model_path or not Path(self.model_path).is_dir():
+            raise FileNotFoundError(f"VoskSTT: Модель не найдена: {self.model_path or '(не задана)'}")
+        if self.grammar:
+            phrases = list(dict.fromkeys(phrase.lower().strip() for phrase in self.grammar if phrase.strip()))
+            # [unk] ловит всё, что не из грамматики, — по нему фраза уходит в основной бэкенд
+            self._grammar_json = json.dumps(phrases + ["[unk]"], ensure_ascii=False)
+
+    def _get_model(self):
+        """Ленивая загрузка модели Vosk (и модели основного бэкенда)"""
+        if self._model is None:
+            self._logger.info(f"VoskSTT: Загрузка модели {self.model_path}...")
+            SetLogLevel(-1)
+            self._model = VoskModel(self.model_path)
+            self._logger.info(
+                f"VoskSTT: Модель загружена (грамматика: {len(json.loads(self._grammar_json)) - 1 if self._grammar_json else 'нет'})"
+            )
+        if self.fallback is not None and hasattr(self.fallback, "_get_model"):
+            self.fallback._get_model()
+        return self._model
+
+    def warmup(self) -> None:
+        self._get_model()
+        if self.fallback is not None:
+            self.fallback.warmup()
+
+    def recognize(self, audio: sr.AudioData) -> Optional[str]:
+        text, _ = self.recognize_with_confidence(audio)
+        return text
+
+    def recognize_partial(self, audio: sr.AudioData) -> Optional[str]:
+        """Дописывает в распознаватель новые кадры растущего окна и возвращает текущую гипотезу"""
+        audio = AudioFrame.wrap(audio)
+        with self._lock:
+            stream = self._feed(audio)
+            if stream is None:
+                return None
+            partial = json.loads(stream["recognizer"].PartialResult()).get("partial", "")
+            words = [word for text in stream["texts"] + [partial] for word in text.split() if word != "[unk]"]
+            return " ".join(words) or None
+
+    def recognize_with_confidence(self, audio: sr.AudioData) -> Tuple[Optional[str], Optional[float]]:
+        audio = AudioFrame.wrap(audio)
+        stats = self.vosk_stats
+        start = time.perf_counter()
+        with self._lock:
+            stats.requests += 1
+            stream = self._feed(audio, final=True)
+            self._stream = None
+            if stream is not None:
+                stream["results"].append(json.loads(stream["recognizer"].FinalResult()))
+                stats.final_ms += (time.perf_counter() - start) * 1000.0
+        # Запасной бэкенд декодирует уже без блокировки, как и остальные ветки ниже
+        if stream is None:
+            return self._fall_back(audio, "empty")
+        words = [word for result in stream["results"] for word in result.get("result", [])]
+        text = " ".join(word.get("word", "") for word in words).strip()
+        confidence = min((float(word.get("conf", 1.0)) for word in words), default=None)
+        if not text:
+            return self._fall_back(audio, "empty")
+        if self._grammar_json is not None:
+            if "[unk]" in text.split():
+                return self._fall_back(audio, "unk")
+            if confidence is not None and confidence < self.min_confidence:
+                return self._fall_back(audio, "confidence")
+            stats.grammar_accepted += 1
+        self._logger.debug(f"VoskSTT: Распознано: '{text}' (уверенность: {confidence})")
+        return text, confidence
+
+    def _feed(self, audio: AudioFrame, final: bool = False) -> Optional[dict]:
+        """Подаёт в распознаватель кадры, которых он ещё не видел (под self._lock)
+
+        Окно той же фразы (совпадает начало stream_range) продолжает текущий
+        поток; любое другое аудио начинает новый распознаватель.
+        """
+        stream_range = audio.stream_range
+        stream = self._stream
+        if stream is None or stream_range is None or stream["start"] != stream_range[0] or stream["rate"] != audio.sample_rate:
+            model = self._get_model()
+            if self._grammar_json is not None:
+                recognizer = KaldiRecognizer(model, audio.sample_rate, self._grammar_json)
+            else:
+                recognizer = KaldiRecognizer(model, audio.sample_rate)
+            recognizer.SetWords(True)
+            stream = {
+                "start": stream_range[0] if stream_range is not None else None,
+                "rate": audio.sample_rate,
+                "fed": 0,
+                "recognizer": recognizer,
+                "results": [],
+                "texts": [],
+            }
+            self._stream = stream
+        pcm = audio.frame_data if audio.sample_width == 2 else audio.samples.tobytes()
+        new = pcm[stream["fed"]:]
+        if new:
+            seconds = len(new) / (2.0 * audio.sample_rate)
+            if final:
+                self.vosk_stats.tail_s += seconds
+            else:
+                self.vosk_stats.streamed_s += seconds
+            if stream["recognizer"].AcceptWaveform(new):
+                # Vosk нашёл конец сегмента внутри фразы — забираем результат, иначе он потеряется
+                result = json.loads(stream["recognizer"].Result())
+                stream["results"].append(result)
+                stream["texts"].append(result.get("text", ""))
+            stream["fed"] = len(pcm)
+        return stream if stream["fed"] else None
+
+    def _fall_back(self, audio: AudioFrame, reason: str) -> Tuple[Optional[str], Optional[float]]:
+        stats = self.vosk_stats
+        if self.fallback is None:
+            return None, None
+        stats.fallbacks += 1
+        stats.reasons[reason] = stats.reasons.get(reason, 0) + 1
+        start = time.perf_counter()
+        try:
+            return self.fallback.recognize_with_confidence(audio)
+        finally:
+            stats.fallback_ms += (time.perf_counter() - start) * 1000.0
+            self._logger.debug(f"VoskSTT: Фраза вне грамматики ({reason}), распознаю основным бэкендом")
+
+    def snapshot(self) -> Dict[str, object]:
+        """Доля команд из грамматики, задержка финала и переходы к основному бэкенду (для performance.json)"""
+        stats = self.vosk_stats
+        return {
+            "requests": stats.requests,
+            "grammar": self._grammar_json is not None,
+            "grammar_accepted": stats.grammar_accepted,
+            "fallbacks": stats.fallbacks,
+            "fallback_rate": round(stats.fallbacks / stats.requests, 3) if stats.requests else 0.0,
+            "reasons": dict(stats.reasons),
+            "streamed_share": round(stats.streamed_s / (stats.streamed_s + stats.tail_s), 3) if stats.streamed_s + stats.tail_s else 0.0,
+            "avg_final_ms": round(stats.final_ms / stats.requests, 1) if stats.requests else 0.0,
+            "avg_fallback_ms": round(stats.fallback_ms / stats.fallbacks, 1) if stats.fallbacks else 0.0,
+        }
 
 
 @dataclass
@@ -175,6 +1002,8 @@ class SpeechToText:
     def recognize(self, audio: sr.AudioData) -> Optional[str]:
         """Распознаёт речь используя выбранный бэкенд"""
         self.stats.total_requests += 1
+        # Все бэкенды получают один и тот же AudioFrame с общим кэшем конвертаций
+        audio = AudioFrame.wrap(audio)
         try:
             text = self.backend.recognize(audio)
             if text:
@@ -188,3 +1017,136 @@ class SpeechToText:
             logger = logging.getLogger("jarvis")
             logger.warning(f"STT ошибка: {e}", exc_info=True)
             return None
+
+
+@dataclass
+class Hypothesis:
+    """Гипотеза потокового распознавания"""
+    text: Optional[str]
+    is_final: bool
+    audio_s: float  # Длительность декодированного окна
+    decode_ms: float  # Сколько заняло декодирование (0 — финал взят из последней гипотезы)
+
+
+class StreamingTranscriber:
+    """Потоковое распознавание поверх SpeechListener
+
+    Пока фраза произносится, каждые interval_ms заново декодирует растущее
+    окно (от пре-ролла до последнего кадра) и отдаёт промежуточные гипотезы.
+    Когда VAD закрывает фразу, выдаёт финальную гипотезу. Если последнее
+    промежуточное окно уже покрывало всю фразу (оно декодировалось во время
+    хвостовой тишины) и финальное распознавание дало бы тот же жадный
+    результат (beam_size=1, без закрытого набора команд), финал берётся из
+    него без повторного декодирования; с reuse_partial — всегда. Бэкенды без supports_streaming получают только финальное распознавание.
+    """
+
+    def __init__(
+        self,
+        stt: SpeechToText,
+        listener,
+        interval_ms: int = 300,
+        min_window_ms: int = 500,
+        on_partial: Optional[Callable[[Hypothesis], None]] = None,
+        preprocess: Optional[Callable[[AudioFrame], AudioFrame]] = None,
+        reuse_partial: bool = False,
+    ) -> None:
+        self.stt = stt
+        self.reuse_partial = reuse_partial  # True — финал из жадной гипотезы даже при beam_size > 1
+        self.listener = listener  # SpeechListener
+        self.interval_ms = interval_ms
+        self.min_window_ms = min_window_ms
+        self.on_partial = on_partial
+        self.preprocess = preprocess
+        self._logger = logging.getLogger("jarvis")
+
+    def hypotheses(self, timeout: Optional[float] = None) -> Iterator[Hypothesis]:
+        """Гипотезы одной фразы; последняя — финальная. Пусто, если фраза не началась за timeout"""
+        streaming = self.stt.backend.supports_streaming
+        poll_s = self.interval_ms / 1000.0
+        wait_s = self.listener.config.timeout_s if timeout is None else timeout
+        deadline = time.monotonic() + wait_s
+        last_range: Optional[Tuple[int, int]] = None
+        last_text: Optional[str] = None
+        while True:
+            audio = self.listener.listen_once(timeout=poll_s)
+            if audio is not None:
+                yield self._finalize(audio, last_range, last_text)
+                return
+            if self.listener.exhausted:
+                return
+            window = self.listener.current_utterance()
+            if window is None:
+                if time.monotonic() >= deadline:
+                    return
+                continue
+            # Фраза идёт — ждём её конца независимо от тайм-аута
+            deadline = time.monotonic() + wait_s
+            if not streaming or window.duration_s * 1000.0 < self.min_window_ms:
+                continue
+            if last_range is not None and last_range[0] == window.stream_range[0]:
+                new_ms = (window.stream_range[1] - last_range[1]) * self.listener.seconds_per_frame * 1000.0
+                if new_ms < self.interval_ms:
+                    continue
+            start = time.perf_counter()
+            text = self._decode_partial(window)
+            decode_ms = (time.perf_counter() - start) * 1000.0
+            last_range = window.stream_range
+            if text and text != last_text:
+                hypothesis = Hypothesis(text, False, window.duration_s, decode_ms)
+                if self.on_partial is not None:
+                    try:
+                        self.on_partial(hypothesis)
+                    except Exception:
+                        self._logger.debug("StreamingTranscriber: Ошибка обработчика гипотезы", exc_info=True)
+                yield hypothesis
+            last_text = text
+
+    def listen(self, timeout: Optional[float] = None) -> Tuple[bool, Optional[str]]:
+        """Ждёт одну фразу: (была ли фраза, финальный текст)"""
+        final: Optional[Hypothesis] = None
+        for hypothesis in self.hypotheses(timeout):
+            if hypothesis.is_final:
+                final = hypothesis
+        if final is None:
+            return False, None
+        return True, final.text
+
+    def _decode_partial(self, window: AudioFrame) -> Optional[str]:
+        self.stt.stats.partial_requests += 1
+        try:
+            if self.preprocess is not None:
+                window = self.preprocess(window)
+            return self.stt.backend.recognize_partial(window)
+        except Exception as e:
+            self._logger.debug(f"StreamingTranscriber: Ошибка промежуточного распознавания: {e}")
+            return None
+
+    def _partial_is_final(self) -> bool:
+        """Можно ли отдать последнюю промежуточную гипотезу как финал"""
+        if self.reuse_partial:
+            return True
+        backend = self.stt.backend
+        # Финал жадным поиском и без оценки команд совпал бы с промежуточным декодированием
+        return getattr(backend, "beam_size", None) == 1 and not getattr(backend, "commands", None)
+
+    def _finalize(self, audio: AudioFrame, last_range: Optional[Tuple[int, int]], last_text: Optional[str]) -> Hypothesis:
+        final_range = audio.stream_range
+        if (
+            self._partial_is_final()
+            and not self.stt.backend.incremental
+            and last_text
+            and last_range is not None
+            and final_range is not None
+            and last_range[0] == final_range[0]
+            and last_range[1] >= final_range[1]
+        ):
+            # Последнее окно уже содержало всю фразу — ответ готов сразу после конца речи
+            self.stt.stats.total_requests += 1
+            self.stt.stats.total_success += 1
+            self.stt.stats.finals_from_partial += 1
+            return Hypothesis(last_text, True, audio.duration_s, 0.0)
+        start = time.perf_counter()
+        if self.preprocess is not None:
+            audio = self.preprocess(audio)
+        text = self.stt.recognize(audio)
+        return Hypothesis(text, True, audio.duration_s, (time.perf_counter() - start) * 1000.0)
@@ -0,0 +1,377 @@
+from __future__ import annotations
+
+import atexit
+import logging
+import multiprocessing as mp
+import queue
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future
+from dataclasses import dataclass, field
+from multiprocessing import shared_memory
+from typing import Any, Deque, Dict, List, Optional, Tuple
+
+import numpy as np
+import speech_recognition as sr
+
+from jarvis.core.audio import TARGET_RATE, AudioFrame
+
+
+@dataclass
+class WorkerStats:
+    pid: int = 0
+    ready: bool = False
+    alive: bool = True  # False — процесс воркера завершился (упал, убит OOM killer)
+    requests: int = 0
+    busy_ms: float = 0.0
+    started_at: float = field(default_factory=time.monotonic)
+
+    @property
+    def utilisation(self) -> float:
+        """Доля времени, которое воркер занят распознаванием"""
+        uptime_ms = (time.monotonic() - self.started_at) * 1000.0
+        return self.busy_ms / uptime_ms if uptime_ms > 0 else 0.0
+
+
+def _stt_worker(
+    worker_id: int,
+    backend_cls: type,
+    backend_kwargs: Dict[str, Any],
+    shm_name: str,
+    tasks,
+    results,
+    current,
+) -> None:
+    """Процесс-воркер: держит бэкенд (модель Whisper) загруженным и распознаёт фразы из общей памяти"""
+    shm = shared_memory.SharedMemory(name=shm_name)
+    try:
+        backend = backend_cls(**backend_kwargs)
+        if hasattr(backend, "_get_model"):
+            backend._get_model()  # Модель загружается один раз на всё время жизни воркера
+        results.put(("ready", worker_id, None, None, 0.0))
+        while True:
+            task = tasks.get()
+            if task is None:
+                break
+            request_id, offset, nbytes, sample_rate, segmented = task
+            # Номер фразы в общей памяти (а не сообщением в очереди, которое умрёт вместе с процессом):
+            # если воркер упадёт, коллектор завершит именно её Future
+            current[worker_id] = request_id
+            start = time.perf_counter()
+            try:
+                pcm = bytes(shm.buf[offset:offset + nbytes])
+                # Признак segmented — как у исходной фразы: несегментированное аудио (файлы,
+                # listen_once без SpeechListener) проходит детектор речи в FeatureFrontend
+                text = backend.recognize(AudioFrame(pcm, sample_rate, 2, segmented=segmented))
+                error = None
+            except Exception as e:
+                text, error = None, f"{type(e).__name__}: {e}"
+            busy_ms = (time.perf_counter() - start) * 1000.0
+            results.put(("result", worker_id, request_id, (text, error), busy_ms))
+            current[worker_id] = -1
+    except Exception as e:
+        results.put(("failed", worker_id, None, f"{type(e).__name__}: {e}", 0.0))
+    finally:
+        shm.close()
+
+
+class STTExecutor:
+    """Пул процессов распознавания речи с результатами в виде Future
+
+    Каждый воркер один раз создаёт бэкенд (для Whisper — загружает модель)
+    и держит его в памяти. Аудио передаётся через слоты общей памяти
+    (16 кГц, 16-bit), по очереди задач идут только номера слотов, без pickle
+    самих данных. Пока воркеры декодируют, вызывающий поток свободен и может
+    принимать следующие фразы — в полёте может быть несколько фраз сразу.
+
+    У каждого воркера своя очередь задач, и фраза уходит только свободному
+    воркеру: пул всегда знает, чья это фраза. Если воркер упал на фразе, её
+    Future завершается пустым результатом с признаком lost; фраза, которую
+    он не успел начать, достаётся другому воркеру. Когда живых воркеров не
+    остаётся, пул закрывается (closed) — вызывающий код распознаёт сам.
+    """
+
+    def __init__(
+        self,
+        backend_cls: type,
+        backend_kwargs: Optional[Dict[str, Any]] = None,
+        workers: int = 1,
+        max_audio_s: float = 20.0,
+        slots: Optional[int] = None,
+        stats=None,
+        result_timeout_s: float = 60.0,
+    ) -> None:
+        self.workers = max(1, int(workers))
+        self.result_timeout_s = result_timeout_s  # Сколько вызывающий код ждёт Future, прежде чем сдаться
+        self.slot_bytes = int(max_audio_s * TARGET_RATE) * 2
+        self.n_slots = slots or self.workers
+        self.stats = stats  # STTStats SpeechToText, если нужно вести общий счёт
+        self._logger = logging.getLogger("jarvis")
+        self._shm = shared_memory.SharedMemory(create=True, size=self.slot_bytes * self.n_slots)
+        ctx = mp.get_context("spawn")
+        self._current = ctx.Array("q", [-1] * self.workers, lock=False)  # Фраза, которую декодирует воркер (-1 — нет)
+        self._tasks = [ctx.Queue() for _ in range(self.workers)]
+        self._results = ctx.Queue()
+        self._free_slots: Deque[int] = deque(range(self.n_slots))
+        self._pending: Deque[Tuple[int, Future, AudioFrame]] = deque()  # Ждут свободный слот и воркер
+        # request_id -> (future, слот, время отправки, воркер, фраза)
+        self._in_flight: Dict[int, Tuple[Future, int, float, int, AudioFrame]] = {}
+        self._lock = threading.Lock()
+        self._next_id = 0
+        self._closed = False  # Новые фразы не принимаются
+        self._released = False  # Воркеры остановлены, общая память освобождена
+        self.submitted = 0
+        self.completed = 0
+        self.errors = 0
+        self.lost = 0  # Фразы, потерянные вместе с упавшим воркером
+        self.max_queue_depth = 0
+        self.latency_ms_total = 0.0
+        self.worker_stats: List[WorkerStats] = [WorkerStats() for _ in range(self.workers)]
+        self._processes = []
+        for worker_id in range(self.workers):
+            process = ctx.Process(
+                target=_stt_worker,
+                args=(worker_id, backend_cls, dict(backend_kwargs or {}), self._shm.name, self._tasks[worker_id], self._results, self._current),
+                daemon=True,
+                name=f"STT-Worker-{worker_id}",
+            )
+            process.start()
+            self.worker_stats[worker_id].pid = process.pid
+            self._processes.append(process)
+        self._collector = threading.Thread(target=self._collect_loop, daemon=True, name="STT-Results")
+        self._collector.start()
+        atexit.register(self.shutdown)
+        self._logger.info(f"STTExecutor: Запущено воркеров: {self.workers} ({backend_cls.__name__})")
+
+    @property
+    def closed(self) -> bool:
+        """Пул больше не принимает фразы (остановлен или все воркеры завершились)"""
+        return self._closed
+
+    @property
+    def queue_depth(self) -> int:
+        """Фразы, которые ещё не распознаны (в воркерах и в ожидании слота)"""
+        with self._lock:
+            return len(self._in_flight) + len(self._pending)
+
+    def wait_ready(self, timeout: float = 120.0) -> bool:
+        """Ждёт, пока каждый воркер загрузит модель или завершится; True — готов хотя бы один"""
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            states = [(w.ready, p.is_alive()) for w, p in zip(self.worker_stats, self._processes)]
+            if all(ready or not alive for ready, alive in states):
+                return any(ready for ready, _ in states)
+            time.sleep(0.05)
+        return any(w.ready for w in self.worker_stats)
+
+    def submit(self, audio: sr.AudioData) -> Future:
+        """Отправляет фразу на распознавание; Future вернёт текст или None"""
+        future: Future = Future()
+        if self._closed:
+            future.lost = True
+            future.set_result(None)
+            return future
+        audio = AudioFrame.wrap(audio)
+        with self._lock:
+            request_id = self._next_id
+            self._next_id += 1
+            self.submitted += 1
+            if self.stats is not None:
+                self.stats.total_requests += 1
+            self._pending.append((request_id, future, audio))
+            self._dispatch_locked()
+            self.max_queue_depth = max(self.max_queue_depth, len(self._in_flight) + len(self._pending))
+        return future
+
+    def _dispatch_locked(self) -> None:
+        busy = {entry[3] for entry in self._in_flight.values()}
+        idle = deque(w for w, stats in enumerate(self.worker_stats) if stats.alive and w not in busy)
+        while self._pending and self._free_slots and idle:
+            request_id, future, audio = self._pending.popleft()
+            slot = self._free_slots.popleft()
+            worker_id = idle.popleft()
+            pcm = audio.samples.tobytes() if audio.sample_rate == TARGET_RATE and audio.sample_width == 2 else \
+                (np.clip(audio.float32(), -1.0, 1.0) * 32767.0).astype(np.int16).tobytes()
+            if len(pcm) > self.slot_bytes:
+                self._logger.warning(
+                    f"STTExecutor: Фраза длиннее {self.slot_bytes // (2 * TARGET_RATE)} с, хвост отброшен"
+                )
+                pcm = pcm[: self.slot_bytes]
+            offset = slot * self.slot_bytes
+            self._shm.buf[offset:offset + len(pcm)] = pcm
+            self._in_flight[request_id] = (future, slot, time.perf_counter(), worker_id, audio)
+            self._tasks[worker_id].put((request_id, offset, len(pcm), TARGET_RATE, audio.segmented))
+
+    def _collect_loop(self) -> None:
+        last_check = time.monotonic()
+        while not self._closed:
+            if time.monotonic() - last_check >= 0.5:
+                last_check = time.monotonic()
+                if not self._check_workers():
+                    break
+            try:
+                message = self._results.get(timeout=0.5)
+            except queue.Empty:
+                continue
+            except (EOFError, OSError):
+                break
+            self._handle(*message)
+
+    def _handle(self, kind: str, worker_id: int, request_id: Optional[int], payload: Any, busy_ms: float) -> None:
+        worker = self.worker_stats[worker_id]
+        if kind == "ready":
+            worker.ready = True
+            worker.started_at = time.monotonic()
+            return
+        if kind == "failed":
+            self._logger.error(f"STTExecutor: Воркер {worker_id} не запустился: {payload}")
+            return
+        text, error = payload
+        worker.requests += 1
+        worker.busy_ms += busy_ms
+        with self._lock:
+            entry = self._in_flight.pop(request_id, None)
+            if entry is None:
+                return
+            future, slot = entry[0], entry[1]
+            self._free_slots.append(slot)
+            self.completed += 1
+            latency_ms = (time.perf_counter() - entry[2]) * 1000.0
+            self.latency_ms_total += latency_ms
+            if error:
+                self.errors += 1
+            if self.stats is not None:
+                if text:
+                    self.stats.total_success += 1
+                else:
+                    self.stats.total_errors += 1
+                    if error:
+                        self.stats.last_error = error
+            self._dispatch_locked()
+        if error:
+            self._logger.warning(f"STTExecutor: Ошибка распознавания в воркере {worker_id}: {error}")
+        # Время работы воркера и номер воркера — для пофайловых замеров (пакетный режим)
+        future.busy_ms = busy_ms
+        future.latency_ms = latency_ms
+        future.worker_id = worker_id
+        future.error = error
+        future.set_result(text or None)
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Очередь, задержки и загрузка воркеров для performance.json"""
+        with self._lock:
+            in_flight, pending = len(self._in_flight), len(self._pending)
+        return {
+            "workers": self.workers,
+            "queue_depth": in_flight + pending,
+            "in_flight": in_flight,
+            "waiting_for_slot": pending,
+            "max_queue_depth": self.max_queue_depth,
+            "submitted": self.submitted,
+            "completed": self.completed,
+            "errors": self.errors,
+            "lost": self.lost,
+            "avg_latency_ms": round(self.latency_ms_total / self.completed, 1) if self.completed else 0.0,
+            "per_worker": [
+                {
+                    "pid": w.pid,
+                    "ready": w.ready,
+                    "alive": w.alive,
+                    "requests": w.requests,
+                    "avg_busy_ms": round(w.busy_ms / w.requests, 1) if w.requests else 0.0,
+                    "utilisation": round(w.utilisation, 3),
+                }
+                for w in self.worker_stats
+            ],
+        }
+
+    def _check_workers(self) -> bool:
+        """Отмечает завершившиеся воркеры и разбирает их фразы; False — живых воркеров не осталось"""
+        dead = [
+            worker_id
+            for worker_id, process in enumerate(self._processes)
+            if self.worker_stats[worker_id].alive and not process.is_alive()
+        ]
+        if dead:
+            # Результаты, которые воркер успел отправить перед смертью, ещё не потеряны
+            while True:
+                try:
+                    self._handle(*self._results.get_nowait())
+                except (queue.Empty, EOFError, OSError):
+                    break
+        for worker_id in dead:
+            worker = self.worker_stats[worker_id]
+            worker.alive = False
+            self._logger.error(
+                f"STTExecutor: Воркер {worker_id} (pid {worker.pid}) завершился с кодом {self._processes[worker_id].exitcode}"
+            )
+            self._fail_lost(worker_id)
+        if self._closed or any(w.alive for w in self.worker_stats):
+            return True
+        self._logger.error("STTExecutor: Все воркеры STT завершились, пул закрыт — распознавание в основном процессе")
+        self._fail_all()
+        return False
+
+    def _fail_lost(self, worker_id: int) -> None:
+        """Разбирает фразы упавшего воркера: начатую — завершает пустым результатом, не начатую — отдаёт другим"""
+        started = self._current[worker_id]
+        failed = []
+        with self._lock:
+            for request_id, (future, slot, _, owner, audio) in list(self._in_flight.items()):
+                if owner != worker_id:
+                    continue
+                del self._in_flight[request_id]
+                self._free_slots.append(slot)
+                if request_id != started:
+                    # Воркер умер, не успев взять фразу в работу: её распознает другой
+                    self._pending.appendleft((request_id, future, audio))
+                    continue
+                self.completed += 1
+                self.errors += 1
+                self.lost += 1
+                if self.stats is not None:
+                    self.stats.total_errors += 1
+                    self.stats.last_error = f"STT worker {worker_id} died"
+                failed.append((request_id, future))
+            self._dispatch_locked()
+        for request_id, future in failed:
+            self._logger.warning(f"STTExecutor: Фраза {request_id} потеряна вместе с воркером {worker_id}")
+            future.error = "worker died"
+            future.lost = True
+            if not future.done():
+                future.set_result(None)
+
+    def _fail_all(self) -> None:
+        """Завершает все незавершённые Future пустым результатом с признаком lost"""
+        self._closed = True
+        with self._lock:
+            futures = [entry[0] for entry in self._in_flight.values()] + [entry[1] for entry in self._pending]
+            self._in_flight.clear()
+            self._pending.clear()
+        for future in futures:
+            if not future.done():
+                future.error = getattr(future, "error", None) or "executor closed"
+                future.lost = True
+                future.set_result(None)
+
+    def shutdown(self) -> None:
+        if self._released:
+            return
+        self._released = True
+        self._closed = True
+        for tasks in self._tasks:
+            try:
+                tasks.put(None)
+            except Exception:
+                pass
+        for process in self._processes:
+            process.join(timeout=2.0)
+            if process.is_alive():
+                process.terminate()
+        self._fail_all()
+        self._shm.close()
+        try:
+            self._shm.unlink()
+        except FileNotFoundError:
+            pass
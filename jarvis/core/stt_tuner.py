@@ -0,0 +1,268 @@
+from __future__ import annotations
+
+import json
+import logging
+import os
+import platform
+import re
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import asdict, dataclass
+from datetime import datetime, timezone
+from itertools import product
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from jarvis.core.audio import TARGET_RATE, AudioFrame, read_wav
+from jarvis.core.batch_stt import find_wavs
+
+TUNING_FILE = "stt_tuning.json"  # В data_dir; читается AppConfig.load при запуске
+
+
+@dataclass(frozen=True)
+class TuneCandidate:
+    """Одна конфигурация Whisper для замера"""
+    model_size: str
+    compute_type: str
+    cpu_threads: int
+    beam_size: int
+    num_workers: int = 1
+
+    @property
+    def label(self) -> str:
+        label = f"{self.model_size}/{self.compute_type}/t{self.cpu_threads}/b{self.beam_size}"
+        return label if self.num_workers == 1 else f"{label}/w{self.num_workers}"
+
+
+@dataclass
+class TuneResult:
+    candidate: TuneCandidate
+    accuracy: float  # 1 - WER по всему набору
+    avg_ms: float  # Средняя задержка фразы при декодировании по одной (как в диалоге)
+    p95_ms: float  # То же, 95-й перцентиль
+    realtime_factor: float  # Секунды аудио на секунду вычислений (с num_workers > 1 — при параллельном декодировании)
+    load_ms: float
+    error: Optional[str] = None
+
+
+def normalize_words(text: Optional[str]) -> List[str]:
+    return re.sub(r"[^\w\s]", " ", (text or "").lower().replace("ё", "е")).split()
+
+
+def word_error_rate(reference: Optional[str], hypothesis: Optional[str]) -> float:
+    """WER по словам (расстояние Левенштейна / длина эталона)"""
+    ref, hyp = normalize_words(reference), normalize_words(hypothesis)
+    if not ref:
+        return 0.0 if not hyp else 1.0
+    row = list(range(len(hyp) + 1))
+    for i, r in enumerate(ref, 1):
+        prev, row[0] = row[0], i
+        for j, h in enumerate(hyp, 1):
+            prev, row[j] = row[j], min(row[j] + 1, row[j - 1] + 1, prev + (r != h))
+    return row[-1] / len(ref)
+
+
+def default_threads(cpu_count: Optional[int] = None) -> List[int]:
+    """Число потоков для перебора: степени двойки до числа ядер и само число ядер"""
+    cpu_count = cpu_count or os.cpu_count() or 1
+    threads = {cpu_count}
+    n = 1
+    while n < cpu_count:
+        threads.add(n)
+        n *= 2
+    return sorted(threads)
+
+
+class STTTuner:
+    """Подбор конфигурации Whisper под конкретную машину
+
+    Перебирает модель, тип вычислений, число потоков CTranslate2 и ширину
+    beam search на наборе WAV-файлов. Эталонный текст берётся из файла
+    NAME.txt рядом с NAME.wav; если эталонов нет, им служит результат
+    самой точной конфигурации (последняя модель и последний тип
+    вычислений из списков, beam_size=5).
+
+    Точность от числа потоков не зависит, поэтому перебор двухэтапный:
+    сначала каждая пара (модель, тип вычислений) с каждым beam_size
+    проверяется на всех ядрах, и не прошедшие порог точности отбрасываются;
+    затем для оставшихся перебираются потоки и num_workers (параллельные
+    декодирования одной модели; потоков на все декодирования вместе — не
+    больше ядер). Jarvis распознаёт фразы по одной, поэтому конфигурации
+    сравниваются по задержке отдельной фразы; пропускная способность
+    num_workers > 1 (набор одновременно в несколько потоков) замеряется
+    отдельно и идёт только в realtime_factor. Побеждает конфигурация
+    с наименьшей средней задержкой фразы и точностью не ниже floor.
+    """
+
+    def __init__(
+        self,
+        backend_cls: type,
+        models: Sequence[str] = ("tiny", "base", "small"),
+        compute_types: Sequence[str] = ("int8", "int8_float32", "float32"),
+        threads: Optional[Sequence[int]] = None,
+        beam_sizes: Sequence[int] = (1, 5),
+        num_workers: Sequence[int] = (1, 2),
+        floor: float = 0.9,
+        language: str = "ru",
+        model_root: str = "",
+    ) -> None:
+        self.backend_cls = backend_cls
+        self.models = list(models)
+        self.compute_types = list(compute_types)
+        self.threads = list(threads or default_threads())
+        self.beam_sizes = list(beam_sizes)
+        self.num_workers = list(num_workers)
+        self.floor = floor
+        self.language = language
+        self.model_root = model_root  # Хранилище моделей (пусто — загрузка по имени)
+        self.results: List[TuneResult] = []
+        self._measured: Dict[TuneCandidate, Tuple[TuneResult, List[Optional[str]]]] = {}
+        self._logger = logging.getLogger("jarvis")
+
+    def load_set(self, directory: Path) -> List[Tuple[str, AudioFrame, Optional[str]]]:
+        """(имя, аудио 16 кГц, эталон или None) для каждого WAV каталога"""
+        items = []
+        for path in find_wavs(directory):
+            reference_path = path.with_suffix(".txt")
+            reference = reference_path.read_text(encoding="utf-8").strip() if reference_path.exists() else None
+            audio = AudioFrame(read_wav(path, TARGET_RATE), TARGET_RATE, 2)
+            items.append((path.relative_to(directory).as_posix(), audio, reference))
+        return items
+
+    def tune(self, directory: Path) -> Optional[TuneResult]:
+        """Замеряет конфигурации на наборе и возвращает самую быструю из прошедших порог"""
+        items = self.load_set(directory)
+        if not items:
+            raise FileNotFoundError(f"В каталоге {directory} нет WAV-файлов")
+        references = [reference for _, _, reference in items]
+        if any(reference is None for reference in references):
+            reference_candidate = TuneCandidate(self.models[-1], self.compute_types[-1], max(self.threads), 5)
+            self._logger.info(f"STTTuner: Эталонов нет для части файлов, эталон — {reference_candidate.label}")
+            reference_result, texts = self._measure(reference_candidate, items, references=None)
+            references = [ref if ref is not None else text for ref, text in zip(references, texts)]
+            if reference_result.error is None:
+                # Эталонная конфигурация тоже проходит этап 1: оцениваем её по имеющимся эталонам,
+                # а не по собственному выводу
+                reference_result.accuracy = round(self._accuracy(references, texts), 4)
+
+        # Этап 1: точность каждой пары (модель, тип вычислений) на всех ядрах
+        all_threads = max(self.threads)
+        passed: List[TuneCandidate] = []
+        for model_size, compute_type in product(self.models, self.compute_types):
+            for beam_size in self.beam_sizes:
+                candidate = TuneCandidate(model_size, compute_type, all_threads, beam_size)
+                result, _ = self._measure(candidate, items, references)
+                if result.error is None and result.accuracy >= self.floor:
+                    passed.append(candidate)
+
+        # Этап 2: потоки и параллельные декодирования для прошедших порог
+        for candidate in passed:
+            for threads, workers in product(self.threads, self.num_workers):
+                if (threads, workers) == (all_threads, 1) or threads * workers > all_threads:
+                    continue
+                self._measure(
+                    TuneCandidate(candidate.model_size, candidate.compute_type, threads, candidate.beam_size, workers),
+                    items,
+                    references,
+                )
+
+        eligible = [r for r in self.results if r.error is None and r.accuracy >= self.floor]
+        if not eligible:
+            return None
+        return min(eligible, key=lambda r: r.avg_ms)
+
+    def _measure(
+        self,
+        candidate: TuneCandidate,
+        items: List[Tuple[str, AudioFrame, Optional[str]]],
+        references: Optional[List[Optional[str]]],
+    ) -> Tuple[TuneResult, List[Optional[str]]]:
+        if candidate in self._measured:
+            return self._measured[candidate]
+        texts: List[Optional[str]] = []
+        try:
+            load_start = time.perf_counter()
+            backend = self.backend_cls(
+                model_size=candidate.model_size,
+                device="cpu",
+                compute_type=candidate.compute_type,
+                language=self.language,
+                beam_size=candidate.beam_size,
+                cpu_threads=candidate.cpu_threads,
+                num_workers=candidate.num_workers,
+                model_root=self.model_root,
+            )
+            backend._get_model()
+            load_ms = (time.perf_counter() - load_start) * 1000.0
+            backend.recognize(items[0][1])  # Прогрев: первый вызов платит за выделение памяти
+
+            def recognize(audio: AudioFrame) -> Tuple[Optional[str], float]:
+                start = time.perf_counter()
+                text = backend.recognize(audio)
+                return text, (time.perf_counter() - start) * 1000.0
+
+            audios = [audio for _, audio, _ in items]
+            # Задержка фразы — как в диалоге: по одной
+            wall_start = time.perf_counter()
+            outputs = [recognize(audio) for audio in audios]
+            wall_ms = (time.perf_counter() - wall_start) * 1000.0
+            if candidate.num_workers > 1:
+                # Пропускная способность при параллельном декодировании — только для отчёта
+                wall_start = time.perf_counter()
+                with ThreadPoolExecutor(candidate.num_workers) as pool:
+                    list(pool.map(backend.recognize, audios))
+                wall_ms = (time.perf_counter() - wall_start) * 1000.0
+            texts = [text for text, _ in outputs]
+            durations = [duration for _, duration in outputs]
+            audio_s = sum(audio.duration_s for audio in audios)
+        except Exception as e:
+            self._logger.warning(f"STTTuner: {candidate.label}: ошибка: {e}")
+            result = TuneResult(candidate, 0.0, 0.0, 0.0, 0.0, 0.0, error=f"{type(e).__name__}: {e}")
+            self.results.append(result)
+            self._measured[candidate] = (result, texts)
+            return result, texts
+
+        accuracy = self._accuracy(references, texts) if references is not None else 1.0
+        result = TuneResult(
+            candidate=candidate,
+            accuracy=round(accuracy, 4),
+            avg_ms=round(float(np.mean(durations)), 1),
+            p95_ms=round(float(np.percentile(durations, 95)), 1),
+            realtime_factor=round(audio_s / (wall_ms / 1000.0), 1) if wall_ms else 0.0,
+            load_ms=round(load_ms, 1),
+        )
+        self.results.append(result)
+        self._measured[candidate] = (result, texts)
+        self._logger.info(
+            f"STTTuner: {candidate.label}: точность {result.accuracy:.3f}, {result.avg_ms:.0f} мс/фраза "
+            f"(p95 {result.p95_ms:.0f}), загрузка {result.load_ms:.0f} мс"
+        )
+        return result, texts
+
+    @staticmethod
+    def _accuracy(references: List[Optional[str]], texts: List[Optional[str]]) -> float:
+        """1 - WER по всему набору (ошибки взвешены длиной эталона)"""
+        errors = sum(word_error_rate(ref, text) * max(1, len(normalize_words(ref))) for ref, text in zip(references, texts))
+        words = sum(max(1, len(normalize_words(ref))) for ref in references)
+        return max(0.0, 1.0 - errors / words)
+
+    def save(self, best: TuneResult, data_dir: Path) -> Path:
+        """Сохраняет лучшую конфигурацию и все замеры в data_dir/stt_tuning.json"""
+        payload = {
+            "config": asdict(best.candidate),
+            "accuracy": best.accuracy,
+            "avg_ms": best.avg_ms,
+            "floor": self.floor,
+            "host": {"cpu_count": os.cpu_count(), "machine": platform.machine(), "processor": platform.processor()},
+            "timestamp": datetime.now(timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ"),
+            "results": [
+                dict(asdict(r), candidate=r.candidate.label)
+                for r in sorted(self.results, key=lambda r: (r.error is not None, r.avg_ms))
+            ],
+        }
+        path = data_dir / TUNING_FILE
+        data_dir.mkdir(parents=True, exist_ok=True)
+        path.write_text(json.dumps(payload, ensure_ascii=False, indent=2), encoding="utf-8")
+        return path
@@ -4,9 +4,10 @@ import logging
 import tempfile
 import threading
 from abc import ABC, abstractmethod
+from collections import OrderedDict
 from dataclasses import dataclass, field
 from pathlib import Path
-from typing import Optional
+from typing import Iterable, Optional
 
 import pyttsx3
 
@@ -29,6 +30,9 @@ class TTSBackend(ABC):
     def speak(self, text: str) -> None:  # pragma: no cover - interface
         raise NotImplementedError
 
+    def preload(self, texts: Iterable[str]) -> None:
+        """Заранее готовит аудио для фраз (по умолчанию нечего готовить)"""
+
 
 @dataclass
 class Pyttsx3Backend(TTSBackend):
@@ -72,26 +76,49 @@ class ElevenLabsBackend(TTSBackend):
     api_key: str
     voice_id: str = "pNInz6obpgDQGcFmaJgB"  # Adam - по умолчанию
     model: str = "eleven_turbo_v2_5"  # Быстрая модель для мгновенной реакции
+    cache_size: int = 64  # Фраз в кэше аудио (ответы Jarvis повторяются)
 
     def __post_init__(self) -> None:
         if not ELEVENLABS_AVAILABLE:
             raise ImportError("elevenlabs не установлен. Установите: pip install elevenlabs")
         self.client = ElevenLabs(api_key=self.api_key)
+        self._cache: OrderedDict[str, bytes] = OrderedDict()
+        self._cache_lock = threading.Lock()
+
+    def _synthesize(self, text: str) -> bytes:
+        """MP3 для фразы: из кэша или от ElevenLabs"""
+        with self._cache_lock:
+            audio_bytes = self._cache.get(text)
+            if audio_bytes is not None:
+                self._cache.move_to_end(text)
+                return audio_bytes
+        # Генерируем аудио с настройками для быстрого ответа
+        # convert() возвращает генератор, нужно собрать все байты
+        audio_generator = self.client.text_to_speech.convert(
+            text=text,
+            voice_id=self.voice_id,
+            model_id=self.model,
+            output_format="mp3_44100_128"
+        )
+        # Собираем все байты из генератора
+        audio_bytes = b"".join(audio_generator)
+        with self._cache_lock:
+            self._cache[text] = audio_bytes
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+        return audio_bytes
+
+    def preload(self, texts: Iterable[str]) -> None:
+        """Синтезирует фразы, которых ещё нет в кэше"""
+        for text in texts:
+            if text and text not in self._cache:
+                self._synthesize(text)
 
     def speak(self, text: str) -> None:
         if not text:
             return
         try:
-            # Генерируем аудио с настройками для быстрого ответа
-            # convert() возвращает генератор, нужно собрать все байты
-            audio_generator = self.client.text_to_speech.convert(
-                text=text,
-                voice_id=self.voice_id,
-                model_id=self.model,
-                output_format="mp3_44100_128"
-            )
-            # Собираем все байты из генератора
-            audio_bytes = b"".join(audio_generator)
+            audio_bytes = self._synthesize(text)
             # Воспроизводим аудио (Windows-совместимый способ)
             self._play_audio_windows(audio_bytes)
         except Exception as e:
@@ -176,6 +203,13 @@ class TextToSpeech:
         """Синхронное озвучивание (блокирует выполнение)"""
         self.backend.speak(text)
     
+    def preload(self, texts: Iterable[str]) -> None:
+        """Заранее готовит аудио для вероятных ответов; ошибки только логируются"""
+        try:
+            self.backend.preload(texts)
+        except Exception as e:
+            self._logger.warning(f"TTS: Не удалось подготовить аудио ответов: {e}")
+    
     def speak_async(self, text: str) -> None:
         """Асинхронное озвучивание (не блокирует выполнение)
         
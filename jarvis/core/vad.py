@@ -0,0 +1,214 @@
+from __future__ import annotations
+
+from dataclasses import dataclass, field
+from typing import List, Optional, Tuple
+
+import numpy as np
+
+
+def frame_energy_zcr(samples: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """Считает RMS-энергию и долю пересечений нуля для блока кадров
+
+    Args:
+        samples: int16 или float массив формы (n_frames, frame_len)
+
+    Returns:
+        Tuple[rms, zcr] — по одному значению на кадр
+    """
+    x = samples.astype(np.float32, copy=False)
+    rms = np.sqrt(np.mean(np.square(x), axis=1))
+    signs = np.signbit(x)
+    zcr = np.count_nonzero(signs[:, 1:] != signs[:, :-1], axis=1) / float(max(1, x.shape[1] - 1))
+    return rms, zcr
+
+
+def pcm_to_frames(pcm: bytes, frame_samples: int) -> np.ndarray:
+    """Представляет 16-bit PCM как матрицу кадров (без копирования)"""
+    samples = np.frombuffer(pcm, dtype=np.int16)
+    n_frames = len(samples) // frame_samples
+    return samples[: n_frames * frame_samples].reshape(n_frames, frame_samples)
+
+
+@dataclass
+class NoiseFloorTracker:
+    """Непрерывная оценка уровня фонового шума
+
+    Уровень шума — экспоненциально скользящий перцентиль энергии кадров
+    в дБ: на каждом кадре оценка сдвигается на step_db * percentile вверх,
+    если кадр громче, и на step_db * (1 - percentile) вниз, если тише.
+    Смена фона в комнате отслеживается за несколько секунд без отдельной
+    калибровки. Кадры внутри фразы поднимают оценку в speech_rise раз
+    медленнее: иначе за длинную фразу порог вырос бы и обрезал её конец.
+
+    Кадры обрабатываются векторно, группами по block_frames: кадры группы
+    сравниваются с оценкой на её начало, а итог не заходит за нижний
+    перцентиль уровней группы — покадровый проход тоже остановился бы около него.
+    """
+
+    percentile: float = 0.2
+    step_db: float = 0.5
+    margin_db: float = 8.0  # Насколько речь должна быть громче шума
+    min_threshold: float = 40.0  # Нижняя граница порога (RMS, int16)
+    speech_rise: float = 0.1  # Во сколько раз медленнее оценка растёт на кадрах фразы
+    block_frames: int = 16  # Кадров на одно векторное сравнение с оценкой
+
+    floor_db: float = field(default=0.0, init=False)
+    frames_seen: int = field(default=0, init=False)
+
+    @property
+    def warmed_up(self) -> bool:
+        return self.frames_seen > 0
+
+    @property
+    def floor_rms(self) -> float:
+        return float(10.0 ** (self.floor_db / 20.0))
+
+    @property
+    def threshold(self) -> float:
+        """Порог энергии речи (RMS), который используют VAD и SpeechListener"""
+        return max(self.min_threshold, float(10.0 ** ((self.floor_db + self.margin_db) / 20.0)))
+
+    def update(self, rms: np.ndarray, in_speech: Optional[np.ndarray] = None) -> float:
+        """Обновляет оценку по энергиям кадров и возвращает новый порог
+
+        in_speech — маска кадров, которые VAD отнёс к фразе (на них оценка растёт медленнее).
+        """
+        levels = 20.0 * np.log10(np.asarray(rms, dtype=np.float64) + 1.0)
+        if levels.size == 0:
+            return self.threshold
+        if not self.warmed_up:
+            # Стартовая оценка — нижний перцентиль первого блока
+            self.floor_db = float(np.percentile(levels, self.percentile * 100.0))
+        up = self.step_db * self.percentile
+        down = self.step_db * (1.0 - self.percentile)
+        rise = np.full(levels.size, up)
+        if in_speech is not None:
+            rise[np.asarray(in_speech, dtype=bool)] *= self.speech_rise
+        floor = self.floor_db
+        for start in range(0, levels.size, self.block_frames):
+            block = levels[start:start + self.block_frames]
+            above = block > floor
+            step = float(rise[start:start + self.block_frames][above].sum()) - down * int(np.count_nonzero(~above))
+            # Покадровый проход не проскакивает равновесие (перцентиль уровней), а колеблется около него
+            target = float(np.percentile(block, self.percentile * 100.0))
+            floor = max(floor + step, target) if floor >= target else min(floor + step, target)
+        self.floor_db = floor
+        self.frames_seen += int(levels.size)
+        return self.threshold
+
+
+@dataclass
+class VADEvent:
+    """Событие детектора: начало речи или конец фразы"""
+    kind: str  # "start", "end", "discard"
+    frame_offset: int  # Номер кадра внутри блока, на котором произошло событие
+    speech_frames: int = 0  # Сколько кадров речи набрано в фразе
+    truncated: bool = False  # Фраза закончилась по max_utterance, а не по тишине
+
+
+@dataclass
+class StreamingVAD:
+    """Потоковый детектор речи по энергии и zero-crossing rate
+
+    Работает на кадрах 10-30 мс. Фраза начинается на первом речевом кадре
+    и заканчивается, когда после речи набралось hangover_ms тишины.
+    Фразы короче min_speech_ms отбрасываются как шум (щелчки, кашель),
+    фразы длиннее max_utterance_s принудительно завершаются.
+    """
+
+    frame_ms: int = 30
+    hangover_ms: int = 400
+    min_speech_ms: int = 150
+    max_utterance_s: float = 15.0
+    zcr_max: float = 0.45  # Шипение и фоновый шум дают высокий ZCR
+    noise_floor: Optional[NoiseFloorTracker] = None  # Источник адаптивного порога
+
+    in_speech: bool = field(default=False, init=False)
+    speech_frames: int = field(default=0, init=False)
+    total_frames: int = field(default=0, init=False)
+    silence_run: int = field(default=0, init=False)
+
+    def __post_init__(self) -> None:
+        self._hangover_frames = max(1, int(round(self.hangover_ms / self.frame_ms)))
+        self._min_speech_frames = max(1, int(round(self.min_speech_ms / self.frame_ms)))
+        self._max_frames = max(1, int(round(self.max_utterance_s * 1000 / self.frame_ms)))
+
+    @property
+    def hangover_frames(self) -> int:
+        return self._hangover_frames
+
+    def reset(self) -> None:
+        self.in_speech = False
+        self.speech_frames = 0
+        self.total_frames = 0
+        self.silence_run = 0
+
+    def classify(self, rms: np.ndarray, zcr: np.ndarray, threshold: float) -> np.ndarray:
+        """Векторная классификация кадров: True — речь"""
+        # Громкие кадры считаем речью независимо от ZCR (взрывные и шипящие согласные)
+        return ((rms > threshold) & (zcr <= self.zcr_max)) | (rms > threshold * 3.0)
+
+    def process(self, frames: np.ndarray, threshold: Optional[float] = None) -> Tuple[np.ndarray, List[VADEvent]]:
+        """Пропускает блок кадров через детектор
+
+        Если threshold не задан, порог берётся из noise_floor (оценка на
+        начало блока), а после разметки noise_floor обновляется энергией блока.
+
+        Returns:
+            Tuple[маска речевых кадров, список событий]
+        """
+        rms, zcr = frame_energy_zcr(frames)
+        return self.process_energy(rms, zcr, threshold)
+
+    def process_energy(
+        self, rms: np.ndarray, zcr: np.ndarray, threshold: Optional[float] = None
+    ) -> Tuple[np.ndarray, List[VADEvent]]:
+        """То же, что process, но по уже посчитанным энергиям (например, из FeatureFrontend)"""
+        track = threshold is None
+        if track:
+            if self.noise_floor is None:
+                raise ValueError("StreamingVAD: не задан ни threshold, ни noise_floor")
+            if not self.noise_floor.warmed_up:
+                self.noise_floor.update(rms)  # Стартовая оценка по первому блоку
+                track = False
+            threshold = self.noise_floor.threshold
+        is_speech = self.classify(rms, zcr, threshold)
+        events: List[VADEvent] = []
+        in_utterance = np.zeros(len(is_speech), dtype=bool)
+        for i, speech in enumerate(is_speech):
+            event = self._step(bool(speech), i)
+            in_utterance[i] = self.in_speech or event is not None
+            if event is not None:
+                events.append(event)
+        if track:
+            # Шум оцениваем после разметки: кадры фразы почти не поднимают порог
+            self.noise_floor.update(rms, in_utterance)
+        return is_speech, events
+
+    def _step(self, speech: bool, offset: int) -> Optional[VADEvent]:
+        if not self.in_speech:
+            if speech:
+                self.in_speech = True
+                self.speech_frames = 1
+                self.total_frames = 1
+                self.silence_run = 0
+                return VADEvent("start", offset, 1)
+            return None
+
+        self.total_frames += 1
+        if speech:
+            self.speech_frames += 1
+            self.silence_run = 0
+        else:
+            self.silence_run += 1
+
+        if self.total_frames >= self._max_frames:
+            event = VADEvent("end", offset, self.speech_frames, truncated=True)
+            self.reset()
+            return event
+        if self.silence_run >= self._hangover_frames:
+            kind = "end" if self.speech_frames >= self._min_speech_frames else "discard"
+            event = VADEvent(kind, offset, self.speech_frames)
+            self.reset()
+            return event
+        return None
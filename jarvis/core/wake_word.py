@@ -1,25 +1,124 @@
+import re
+from dataclasses import dataclass
+from functools import lru_cache
 from typing import Optional
 
+WAKE_WORD = "джарвис"
 
-def has_wake_word(text: str) -> bool:
+# Распознавание возвращает wake word по-разному: «джервис», «jarvis», «жарвис», «джарвиз»,
+# «джар вис». Слова сравниваются по фонетическому ключу с ограниченным числом правок.
+MAX_EDITS = 1  # Правок фонетического ключа (замена, вставка, удаление)
+_MIN_KEY_LEN = 5  # Короткие слова не сравниваем: одна правка делает из них что угодно
+_CASE_SUFFIXES = ("ом", "а", "у", "е", "ы")  # «джарвиса», «джарвису», «джарвисом»
+
+_WORD_RE = re.compile(r"[a-zа-яё]+")
+_LATIN_DIGRAPHS = re.compile(r"sh|ch|zh|kh|ts|j")
+_LATIN_DIGRAPH_MAP = {"sh": "ш", "ch": "ч", "zh": "ж", "kh": "х", "ts": "ц", "j": "дж"}
+_LATIN_TABLE = str.maketrans({
+    "a": "а", "b": "б", "c": "к", "d": "д", "e": "е", "f": "ф", "g": "г", "h": "х", "i": "и",
+    "k": "к", "l": "л", "m": "м", "n": "н", "o": "о", "p": "п", "q": "к", "r": "р", "s": "с",
+    "t": "т", "u": "у", "v": "в", "w": "в", "x": "кс", "y": "и", "z": "з",
+})
+# Звуки, которые распознавание путает между собой, сводятся к одной букве
+_PHONETIC_TABLE = str.maketrans({"ё": "е", "э": "е", "ы": "и", "й": "и", "я": "а", "ю": "у", "ь": None, "ъ": None})
+_AFFRICATES = re.compile(r"д[жз]")
+_FINAL_DEVOICING = {"з": "с", "д": "т", "б": "п", "г": "к", "ж": "ш", "в": "ф"}
+
+
+@dataclass(frozen=True)
+class WakeMatch:
+    """Найденный wake word: границы в исходном тексте и число правок до эталона"""
+    start: int
+    end: int
+    text: str  # Как wake word записан в тексте
+    edits: int
+
+
+def phonetic_key(word: str) -> str:
+    """Фонетический ключ слова: латиница -> кириллица, «дж» -> «ж», оглушение на конце"""
+    word = word.lower()
+    if word.isascii():
+        word = _LATIN_DIGRAPHS.sub(lambda m: _LATIN_DIGRAPH_MAP[m.group()], word).translate(_LATIN_TABLE)
+    key = _AFFRICATES.sub(lambda m: m.group()[1], word.translate(_PHONETIC_TABLE))
+    if key and key[-1] in _FINAL_DEVOICING:
+        key = key[:-1] + _FINAL_DEVOICING[key[-1]]
+    return key
+
+
+_WAKE_KEY = phonetic_key(WAKE_WORD)
+
+
+def _edits_within(a: str, b: str, limit: int) -> Optional[int]:
+    """Расстояние Левенштейна, если оно не больше limit (иначе None, с ранним выходом)"""
+    if abs(len(a) - len(b)) > limit:
+        return None
+    row = list(range(len(b) + 1))
+    for i, ca in enumerate(a, 1):
+        prev, row[0] = row[0], i
+        for j, cb in enumerate(b, 1):
+            prev, row[j] = row[j], min(row[j] + 1, row[j - 1] + 1, prev + (ca != cb))
+        if min(row) > limit:
+            return None
+    return row[-1] if row[-1] <= limit else None
+
+
+@lru_cache(maxsize=4096)
+def _wake_edits(word: str) -> Optional[int]:
+    """Правок от слова до wake word (None — не wake word); результат кэшируется по слову"""
+    key = phonetic_key(word)
+    if len(key) < _MIN_KEY_LEN:
+        return None
+    candidates = [key] + [
+        key[: -len(suffix)] for suffix in _CASE_SUFFIXES
+        if key.endswith(suffix) and len(key) - len(suffix) >= _MIN_KEY_LEN
+    ]
+    edits = [e for e in (_edits_within(c, _WAKE_KEY, MAX_EDITS) for c in candidates) if e is not None]
+    return min(edits) if edits else None
+
+
+def find_wake_word(text: str) -> Optional[WakeMatch]:
+    """Ищет wake word в тексте с учётом фонетических вариантов; возвращает первое вхождение"""
     if not text:
-        return False
-    return "джарвис" in text.lower()
+        return None
+    lower = text.lower()
+    exact = lower.find(WAKE_WORD)
+    if exact >= 0:
+        # Точное вхождение — без разбора на слова; падежное окончание («джарвиса») входит в wake word
+        end = exact + len(WAKE_WORD)
+        tail = _WORD_RE.match(lower, end)
+        if tail is not None and tail.group() in _CASE_SUFFIXES:
+            end = tail.end()
+        return WakeMatch(exact, end, text[exact:end], 0)
+    words = list(_WORD_RE.finditer(lower))
+    for i, word in enumerate(words):
+        edits = _wake_edits(word.group())
+        if edits is None and i + 1 < len(words) and words[i + 1].start() - word.end() <= 1:
+            # Распознавание иногда делит wake word на два слова: «джар вис»
+            edits = _wake_edits(word.group() + words[i + 1].group())
+            if edits is not None:
+                end = words[i + 1].end()
+                return WakeMatch(word.start(), end, text[word.start():end], edits)
+        if edits is not None:
+            return WakeMatch(word.start(), word.end(), text[word.start():word.end()], edits)
+    return None
+
+
+def has_wake_word(text: str) -> bool:
+    return find_wake_word(text) is not None
 
 
 def extract_command(text: str) -> Optional[str]:
     """Извлекает команду из фразы, содержащей wake word.
-    Например: 'Джарвис открой браузер' -> 'открой браузер'
+    Например: 'Джарвис открой браузер' -> 'открой браузер', 'Джервис, открой браузер' -> 'открой браузер'
     """
-    if not text:
+    match = find_wake_word(text)
+    if match is None:
         return None
-    text_lower = text.lower()
-    if "джарвис" not in text_lower:
-        return None
-    # Убираем wake word и лишние пробелы
-    parts = text_lower.split("джарвис", 1)
-    if len(parts) > 1:
-        cmd = parts[1].strip()
-        return cmd if cmd else None
-    return None
+    return command_after(text, match)
+
 
+def command_after(text: str, match: WakeMatch) -> Optional[str]:
+    """Команда после найденного wake word — без повторного поиска"""
+    # Убираем wake word, знаки препинания после него и лишние пробелы
+    cmd = text[match.end:].lower().strip(" \t,.!?:;—-")
+    return cmd if cmd else None
@@ -0,0 +1,41 @@
+import numpy as np
+import pytest
+
+from jarvis.core.audio import AudioFrame, StreamResampler, resample
+
+
+@pytest.mark.parametrize("src_rate, dst_rate", [(44100, 16000), (48000, 16000), (8000, 16000), (22050, 16000)])
+def test_stream_resampler_matches_one_shot(src_rate, dst_rate):
+    rng = np.random.default_rng(1)
+    x = rng.uniform(-0.5, 0.5, src_rate // 2).astype(np.float32)
+    expected = resample(x, src_rate, dst_rate)
+    assert len(expected) == -(-len(x) * dst_rate // src_rate)
+
+    resampler = StreamResampler(src_rate, dst_rate)
+    pieces, pos = [], 0
+    for size in [1, 7, 480, 333, 1024, 5, 4096] * 10:
+        pieces.append(resampler.process(x[pos:pos + size]))
+        pos += size
+        if pos >= len(x):
+            break
+    pieces.append(resampler.process(x[pos:]))
+    pieces.append(resampler.flush())
+    np.testing.assert_allclose(np.concatenate(pieces), expected, atol=1e-6)
+
+
+def test_resample_preserves_in_band_tone():
+    t = np.arange(48000) / 48000.0
+    y = resample(np.sin(2 * np.pi * 440.0 * t).astype(np.float32), 48000, 16000)
+    spectrum = np.abs(np.fft.rfft(y))
+    assert np.argmax(spectrum) * 16000 / len(y) == pytest.approx(440.0, abs=2.0)
+
+
+def test_audio_frame_views_and_crop():
+    samples = (np.arange(16000) % 100).astype(np.int16)
+    frame = AudioFrame(samples.tobytes(), 16000, 2)
+    assert frame.duration_s == pytest.approx(1.0)
+    assert frame.samples.base is not None  # view на frame_data, без копии
+    assert frame.float32() is frame.float32()  # Конвертация кэшируется
+    part = frame.crop(0.25, 0.5)
+    assert part.segmented and len(part.samples) == 4000
+    np.testing.assert_array_equal(part.samples, samples[4000:8000])
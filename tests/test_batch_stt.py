@@ -0,0 +1,78 @@
+import json
+import wave
+
+import numpy as np
+
+from jarvis.core.audio import TARGET_RATE, AudioFrame
+from jarvis.core.batch_stt import BatchTranscriber, split_audio
+
+
+class DurationBackend:
+    """Бэкенд-заглушка: «распознаёт» кусок как его длительность в секундах"""
+
+    def __init__(self, **kwargs) -> None:
+        pass
+
+    def recognize(self, audio: AudioFrame) -> str:
+        assert not audio.segmented
+        return f"{audio.duration_s:.2f}"
+
+
+def _tone(seconds: float, freq: float = 220.0) -> np.ndarray:
+    t = np.arange(int(seconds * TARGET_RATE)) / TARGET_RATE
+    return (0.3 * np.sin(2 * np.pi * freq * t) * 32767).astype(np.int16)
+
+
+def _silence(seconds: float) -> np.ndarray:
+    rng = np.random.default_rng(0)
+    return rng.normal(0, 20, int(seconds * TARGET_RATE)).astype(np.int16)
+
+
+def _write(path, samples: np.ndarray):
+    with wave.open(str(path), "wb") as wav:
+        wav.setnchannels(1)
+        wav.setsampwidth(2)
+        wav.setframerate(TARGET_RATE)
+        wav.writeframes(samples.tobytes())
+    return path
+
+
+def test_split_audio_cuts_in_pauses_and_keeps_every_sample():
+    # Речь по 8 с с паузами по 1 с: граница 10-секундного куска должна попасть в паузу
+    samples = np.concatenate([np.concatenate([_tone(8.0), _silence(1.0)]) for _ in range(5)])
+    audio = AudioFrame(samples.tobytes(), TARGET_RATE, 2)
+    chunks = list(split_audio(audio, chunk_s=10.0))
+    assert b"".join(chunk.frame_data for chunk in chunks) == audio.frame_data
+    assert all(chunk.duration_s <= 10.0 for chunk in chunks)
+    offset = 0.0
+    for chunk in chunks[:-1]:
+        offset += chunk.duration_s
+        assert offset % 9.0 > 7.9  # Граница — внутри паузы (8..9 с каждого периода)
+
+
+def test_long_file_is_chunked_and_silent_file_is_skipped(tmp_path):
+    corpus = tmp_path / "corpus"
+    corpus.mkdir()
+    _write(corpus / "long.wav", np.concatenate([np.concatenate([_tone(8.0), _silence(1.0)]) for _ in range(5)]))
+    _write(corpus / "silent.wav", _silence(20.0))
+    transcriber = BatchTranscriber(DurationBackend, workers=1, chunk_s=10.0)
+    summary = transcriber.transcribe_directory(corpus)
+    assert summary["files"] == 2 and summary["failed"] == 0
+    records = {r["file"]: r for r in map(json.loads, (corpus / "transcripts.jsonl").read_text().splitlines())}
+    long_item = records["long.wav"]
+    assert long_item["chunks"] == 5
+    assert abs(sum(float(x) for x in long_item["text"].split()) - 45.0) < 0.05
+    assert records["silent.wav"]["chunks"] == 0 and records["silent.wav"]["text"] is None
+
+
+def test_unreadable_wav_counts_as_failed_file(tmp_path):
+    corpus = tmp_path / "corpus"
+    corpus.mkdir()
+    _write(corpus / "good.wav", _tone(2.0))
+    (corpus / "bad.wav").write_bytes(b"not a wav file at all")
+    transcriber = BatchTranscriber(DurationBackend, workers=1, chunk_s=10.0)
+    summary = transcriber.transcribe_directory(corpus)
+    assert summary["files"] == 2 and summary["failed"] == 1
+    records = {r["file"]: r for r in map(json.loads, (corpus / "transcripts.jsonl").read_text().splitlines())}
+    assert records["bad.wav"]["error"] and records["bad.wav"]["text"] is None
+    assert records["good.wav"]["error"] is None
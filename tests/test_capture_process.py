@@ -0,0 +1,64 @@
+import pytest
+
+from jarvis.core.capture_process import STATE_FINISHED, SharedFrameRing
+
+FRAME = 4
+
+
+def _frame(i: int) -> bytes:
+    return bytes([i % 256]) * FRAME
+
+
+@pytest.fixture
+def rings():
+    reader = SharedFrameRing(capacity_frames=4, frame_bytes=FRAME)
+    writer = SharedFrameRing(capacity_frames=4, frame_bytes=FRAME, name=reader.name)
+    yield reader, writer
+    writer.release()
+    reader.release()
+
+
+def test_reads_frames_in_order(rings):
+    reader, writer = rings
+    for i in range(3):
+        writer.write(_frame(i))
+    data, index = reader.read_many(0, 10, timeout=0)
+    assert data == _frame(0) + _frame(1) + _frame(2)
+    assert index == 3 and reader.reader_lag() == 0
+    assert reader.overruns == 0 and reader.dropped_frames == 0
+
+
+def test_overrun_skips_overwritten_frames_and_counts_them(rings):
+    reader, writer = rings
+    for i in range(10):
+        writer.write(_frame(i))
+    # Слот кадра index освобождается, когда писатель доходит до index + capacity - 1: читаются 7, 8, 9
+    data, index = reader.read_many(0, 10, timeout=0)
+    assert data == _frame(7) + _frame(8) + _frame(9)
+    assert index == 10
+    assert reader.overruns == 1 and reader.dropped_frames == 7
+    # Читатель успевает — новых потерь нет
+    writer.write(_frame(10))
+    assert reader.read_many(index, 10, timeout=0) == (_frame(10), 11)
+    assert reader.overruns == 1 and reader.dropped_frames == 7
+
+
+def test_read_range_clamps_to_available_frames(rings):
+    reader, writer = rings
+    for i in range(6):
+        writer.write(_frame(i))
+    assert reader.read_range(0, 6) == _frame(3) + _frame(4) + _frame(5)
+    assert reader.read_range(4, 100) == _frame(4) + _frame(5)
+    assert reader.read_range(6, 8) == b""
+
+
+def test_read_returns_none_when_source_finished(rings):
+    reader, writer = rings
+    writer.state = STATE_FINISHED
+    assert reader.read_many(0, 10, timeout=1.0) == (None, 0)
+
+
+def test_short_frames_are_padded(rings):
+    reader, writer = rings
+    writer.write(b"\x01")
+    assert reader.read_many(0, 1, timeout=0)[0] == b"\x01" + b"\x00" * (FRAME - 1)
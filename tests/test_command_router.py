@@ -0,0 +1,23 @@
+import pytest
+
+from jarvis.core.command_router import APP_COMMANDS, SYSTEM_KEYWORDS, UPDATE_JARVIS_KEYWORDS, UPDATE_KEYWORDS, CommandRouter
+
+
+def test_phrases_cover_every_dispatch_table():
+    phrases = set(CommandRouter.phrases())
+    tables = [keyword for _, keywords, _ in APP_COMMANDS for keyword in keywords]
+    tables += UPDATE_KEYWORDS + UPDATE_JARVIS_KEYWORDS + SYSTEM_KEYWORDS
+    assert phrases == set(tables)
+    assert len(CommandRouter.phrases()) == len(phrases)
+
+
+@pytest.mark.parametrize("text", ["выключи компьютер", "Отключи звук, пожалуйста", "перезагрузить компьютер"])
+def test_system_commands_are_routable(text):
+    router = CommandRouter()
+    assert router.can_route(text)
+    assert router.handle(text) is not None
+
+
+@pytest.mark.parametrize("text", ["", "   ", "какая сегодня погода"])
+def test_unknown_text_is_not_routable(text):
+    assert not CommandRouter().can_route(text)
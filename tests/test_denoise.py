@@ -0,0 +1,32 @@
+import numpy as np
+
+from jarvis.core.audio import TARGET_RATE, AudioFrame
+from jarvis.core.denoise import NoiseProfile, SpectralGate
+from jarvis.core.record import quiet_runs
+
+
+def test_spectral_gate_keeps_stream_range():
+    rng = np.random.default_rng(0)
+    samples = (rng.normal(0, 300, TARGET_RATE)).astype(np.int16)
+    audio = AudioFrame(samples.tobytes(), TARGET_RATE, 2, segmented=True)
+    audio.stream_range = (120, 170)
+    cleaned = SpectralGate().process(audio)
+    assert cleaned is not audio
+    assert cleaned.stream_range == (120, 170)
+    assert cleaned.segmented
+
+
+def test_quiet_runs_are_contiguous():
+    is_speech = np.array([0, 0, 0, 0, 1, 1, 0, 0, 1, 0, 0, 0, 0, 0], dtype=bool)
+    assert quiet_runs(is_speech) == [(0, 4), (6, 8), (9, 14)]
+    assert quiet_runs(is_speech, min_frames=4) == [(0, 4), (9, 14)]
+    assert quiet_runs(np.ones(5, dtype=bool)) == []
+    assert quiet_runs(np.zeros(3, dtype=bool)) == [(0, 3)]
+
+
+def test_noise_profile_skips_short_blocks():
+    profile = NoiseProfile(n_fft=512)
+    profile.update(np.zeros(100, dtype=np.int16))
+    assert profile.spectrum is None
+    profile.update(np.full(2048, 100, dtype=np.int16))
+    assert profile.blocks_seen == 1 and profile.spectrum.shape == (257,)
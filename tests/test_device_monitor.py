@@ -0,0 +1,88 @@
+import threading
+
+import pytest
+
+from jarvis.core.device_monitor import AudioDevice, DeviceMonitor
+
+
+class FakeEnumerator:
+    """Вместо PortAudio: список устройств меняется из теста"""
+
+    def __init__(self, *devices: AudioDevice) -> None:
+        self.devices = list(devices)
+        self.fail = False
+        self.calls = 0
+
+    def __call__(self):
+        self.calls += 1
+        if self.fail:
+            raise OSError("PortAudio недоступен")
+        return list(self.devices)
+
+
+def _device(index: int, name: str, is_default: bool = False) -> AudioDevice:
+    return AudioDevice(index=index, name=name, host_api=0, max_input_channels=1, default_sample_rate=16000.0, is_default=is_default)
+
+
+BUILTIN = _device(0, "Встроенный микрофон", is_default=True)
+HEADSET = _device(1, "USB-гарнитура")
+
+
+def test_refresh_reports_added_and_removed_devices():
+    fake = FakeEnumerator(BUILTIN)
+    monitor = DeviceMonitor(enumerate_fn=fake)
+    assert monitor.refresh() == ([], [])
+
+    fake.devices.append(HEADSET)
+    assert monitor.refresh() == ([HEADSET], [])
+    # Индекс сдвинулся, но устройство то же: не добавление и не удаление
+    fake.devices = [_device(3, "USB-гарнитура"), BUILTIN]
+    assert monitor.refresh() == ([], [])
+    assert monitor.find("USB-гарнитура").index == 3
+
+    fake.devices = [BUILTIN]
+    assert monitor.refresh() == ([], [_device(3, "USB-гарнитура")])
+    assert monitor.refreshes == 4
+
+
+def test_failed_refresh_keeps_cached_devices():
+    fake = FakeEnumerator(BUILTIN, HEADSET)
+    monitor = DeviceMonitor(enumerate_fn=fake)
+    monitor.refresh()
+    fake.fail = True
+    assert monitor.refresh() == ([], [])
+    assert monitor.devices() == [BUILTIN, HEADSET]
+
+    empty = DeviceMonitor(enumerate_fn=fake)
+    assert empty.devices() == []
+    assert fake.calls == 3  # Повторный devices() не опрашивает заново
+
+
+@pytest.mark.parametrize(
+    "preferred, expected",
+    [("USB-гарнитура", HEADSET), ("Нет такого", BUILTIN), (None, BUILTIN)],
+)
+def test_best_input_prefers_configured_then_default(preferred, expected):
+    monitor = DeviceMonitor(enumerate_fn=FakeEnumerator(HEADSET, BUILTIN))
+    assert monitor.best_input(preferred) == expected
+
+
+def test_poke_notifies_listeners_about_plugged_device():
+    fake = FakeEnumerator(BUILTIN)
+    monitor = DeviceMonitor(interval_s=60.0, enumerate_fn=fake)
+    monitor.devices()
+    events = []
+    notified = threading.Event()
+
+    def listener(added, removed):
+        events.append((added, removed))
+        notified.set()
+
+    monitor.subscribe(listener)
+    try:
+        fake.devices.append(HEADSET)
+        monitor.poke()
+        assert notified.wait(2.0)
+        assert events == [([HEADSET], [])]
+    finally:
+        monitor.stop()
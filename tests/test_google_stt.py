@@ -0,0 +1,108 @@
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+import speech_recognition as sr
+
+from jarvis.core.google_stt import GoogleSpeechClient, parse_google_response
+
+
+def _response(transcript: str, confidence: float = 0.9) -> bytes:
+    # Как у Speech API v2: сначала пустой результат, затем гипотезы
+    lines = [{"result": []}, {"result": [{"alternative": [{"transcript": transcript, "confidence": confidence}], "final": True}]}]
+    return "\n".join(json.dumps(line, ensure_ascii=False) for line in lines).encode("utf-8")
+
+
+class FakeAudio:
+    """Вместо AudioFrame: клиенту нужен только FLAC"""
+
+    def flac_bytes(self) -> bytes:
+        return b"fLaC-test"
+
+
+class StandIn:
+    """Локальная замена Speech API: задержка ответа по номеру запроса, учёт клиентских соединений"""
+
+    def __init__(self) -> None:
+        self.delays = {}  # Номер запроса (с 0) -> задержка, с
+        self.confidences = {}  # Номер запроса -> уверенность ответа (по умолчанию 0.9)
+        self.requests = 0
+        self.client_ports = set()
+        self.lock = threading.Lock()
+        stand_in = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"  # keep-alive
+
+            def do_POST(self):
+                self.rfile.read(int(self.headers["Content-Length"]))
+                with stand_in.lock:
+                    index = stand_in.requests
+                    stand_in.requests += 1
+                    stand_in.client_ports.add(self.client_address[1])
+                time.sleep(stand_in.delays.get(index, 0.0))
+                body = _response(f"ответ {index}", stand_in.confidences.get(index, 0.9))
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                try:
+                    self.wfile.write(body)
+                except OSError:
+                    pass  # Клиент уже не ждёт (срок истёк)
+
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.server.daemon_threads = True
+        self.url = f"http://127.0.0.1:{self.server.server_address[1]}/speech-api/v2/recognize"
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+    def close(self) -> None:
+        self.server.shutdown()
+        self.server.server_close()
+
+
+@pytest.fixture
+def stand_in():
+    server = StandIn()
+    yield server
+    server.close()
+
+
+def test_parse_google_response_picks_most_confident_alternative():
+    text = json.dumps({"result": [{"alternative": [{"transcript": "открой ютуб"}, {"transcript": "открой браузер", "confidence": 0.8}]}]})
+    assert parse_google_response('{"result":[]}\n' + text) == ("открой браузер", 0.8)
+    assert parse_google_response('{"result":[]}\n') == (None, None)
+
+
+def test_keep_alive_connection_is_reused(stand_in):
+    client = GoogleSpeechClient(endpoint=stand_in.url, hedge=False)
+    texts = [client.recognize(FakeAudio())[0] for _ in range(3)]
+    assert texts == ["ответ 0", "ответ 1", "ответ 2"]
+    assert client.stats.new_connections == 1
+    assert client.stats.reused_connections == 2
+    assert len(stand_in.client_ports) == 1
+
+
+def test_deadline_expiry_raises_request_error(stand_in):
+    stand_in.delays[0] = 1.0
+    client = GoogleSpeechClient(endpoint=stand_in.url, hedge=False, deadline_s=0.3)
+    start = time.monotonic()
+    with pytest.raises(sr.RequestError):
+        client.recognize(FakeAudio())
+    assert time.monotonic() - start < 0.8
+    assert client.stats.deadline_exceeded == 1
+
+
+def test_hedge_wins_when_primary_is_slow(stand_in):
+    stand_in.delays[0] = 1.5  # Первый запрос «застрял», дубль отвечает сразу
+    client = GoogleSpeechClient(endpoint=stand_in.url, hedge=True, hedge_after_s=0.1, deadline_s=3.0)
+    start = time.monotonic()
+    text, confidence = client.recognize(FakeAudio())
+    assert time.monotonic() - start < 1.0
+    assert text == "ответ 1" and confidence == pytest.approx(0.9)
+    assert client.stats.hedged == 1 and client.stats.hedge_wins == 1
@@ -0,0 +1,32 @@
+import time
+
+import pytest
+
+from jarvis.core.record import RecordConfig, SpeechListener, SyntheticSource
+
+
+@pytest.mark.parametrize("capture_process", [False, True])
+def test_idle_mode_reads_device_in_blocks_and_keeps_onset(capture_process):
+    source = SyntheticSource(segments=[("silence", 1.5), ("tone", 0.6), ("silence", 1.0)], pace=True)
+    config = RecordConfig(
+        source=source, frame_ms=20, idle_after_s=0.5, idle_poll_ms=100,
+        capture_process=capture_process, hotplug_monitor=False,
+    )
+    listener = SpeechListener(config)
+    try:
+        assert listener.start()
+        deadline = time.monotonic() + 1.4
+        while not listener.idle and time.monotonic() < deadline:
+            time.sleep(0.02)
+        assert listener.idle
+        assert listener.power_stats()["capture_block_ms"] == 100
+        utterance = listener.listen_once(timeout=5.0)
+        assert utterance is not None
+        # Начало тона (1.5 с) попало во фразу вместе с пре-роллом, несмотря на блочный захват
+        start, end = utterance.stream_range
+        assert start * 0.02 <= 1.5 <= end * 0.02
+        assert 0.6 <= utterance.duration_s <= 1.4
+        assert not listener.idle
+        assert listener.power_stats()["capture_block_ms"] == 20
+    finally:
+        listener.close()
@@ -0,0 +1,67 @@
+import io
+import tarfile
+import zipfile
+
+import pytest
+
+from jarvis.core.model_store import ModelStore, ModelStoreError
+
+
+def _zip(path, files):
+    with zipfile.ZipFile(path, "w") as zf:
+        for name, data in files.items():
+            zf.writestr(name, data)
+    return path
+
+
+def test_import_names_model_after_top_level_dir(tmp_path):
+    archive = _zip(tmp_path / "fw.zip", {"faster-whisper-tiny/model.bin": b"weights", "faster-whisper-tiny/config.json": b"{}"})
+    store = ModelStore(tmp_path / "models")
+    entry = store.import_archive(archive)
+    assert entry.name == "faster-whisper-tiny"
+    assert sorted(entry.files) == ["config.json", "model.bin"]
+    assert (store.resolve("faster-whisper-tiny") / "model.bin").read_bytes() == b"weights"
+
+
+@pytest.mark.parametrize("member", ["../evil.bin", "model/../../evil.bin", "/abs/evil.bin"])
+def test_import_rejects_unsafe_zip_paths(tmp_path, member):
+    archive = _zip(tmp_path / "bad.zip", {member: b"x"})
+    store = ModelStore(tmp_path / "models")
+    with pytest.raises(ModelStoreError):
+        store.import_archive(archive, name="bad")
+    assert not (tmp_path / "evil.bin").exists()
+    assert store.get("bad") is None
+
+
+def test_import_rejects_unsafe_tar_paths(tmp_path):
+    archive = tmp_path / "bad.tar"
+    with tarfile.open(archive, "w") as tf:
+        info = tarfile.TarInfo("../evil.bin")
+        info.size = 1
+        tf.addfile(info, io.BytesIO(b"x"))
+    with pytest.raises(ModelStoreError):
+        ModelStore(tmp_path / "models").import_archive(archive, name="bad")
+
+
+def test_import_skips_tar_symlinks(tmp_path):
+    archive = tmp_path / "model.tar"
+    with tarfile.open(archive, "w") as tf:
+        info = tarfile.TarInfo("model/weights.bin")
+        info.size = 3
+        tf.addfile(info, io.BytesIO(b"abc"))
+        link = tarfile.TarInfo("model/passwd")
+        link.type = tarfile.SYMTYPE
+        link.linkname = "/etc/passwd"
+        tf.addfile(link)
+    entry = ModelStore(tmp_path / "models").import_archive(archive)
+    assert list(entry.files) == ["weights.bin"]
+
+
+def test_resolve_detects_missing_and_corrupted_models(tmp_path):
+    store = ModelStore(tmp_path / "models")
+    with pytest.raises(ModelStoreError):
+        store.resolve("faster-whisper-base")
+    store.import_archive(_zip(tmp_path / "m.zip", {"m/model.bin": b"weights"}))
+    (tmp_path / "models" / "m" / "model.bin").write_bytes(b"WEIGHTS")  # Тот же размер, другое содержимое
+    with pytest.raises(ModelStoreError):
+        ModelStore(tmp_path / "models").resolve("m")
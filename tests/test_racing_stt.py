@@ -0,0 +1,124 @@
+import threading
+import time
+
+import numpy as np
+import pytest
+
+from jarvis.core.audio import TARGET_RATE, AudioFrame
+from jarvis.core.speech_to_text import GoogleSTTBackend, RacingSTTBackend, STTBackend
+from tests.test_google_stt import StandIn
+
+
+class StubBackend(STTBackend):
+    """Локальный бэкенд-заглушка: фиксированный ответ после задержки или события"""
+
+    def __init__(self, text, confidence, delay: float = 0.0, release: threading.Event = None) -> None:
+        self.text = text
+        self.confidence = confidence
+        self.delay = delay
+        self.release = release
+        self.calls = 0
+
+    def recognize(self, audio):
+        return self.recognize_with_confidence(audio)[0]
+
+    def recognize_with_confidence(self, audio):
+        self.calls += 1
+        if self.release is not None:
+            self.release.wait(5.0)
+        time.sleep(self.delay)
+        return self.text, self.confidence
+
+
+def _phrase() -> AudioFrame:
+    t = np.arange(int(0.5 * TARGET_RATE)) / TARGET_RATE
+    samples = (0.3 * np.sin(2 * np.pi * 220.0 * t) * 32767).astype(np.int16)
+    return AudioFrame(samples.tobytes(), TARGET_RATE, 2, segmented=True)
+
+
+def _wait_completed(racer: RacingSTTBackend, name: str, count: int) -> None:
+    deadline = time.monotonic() + 5.0
+    while racer.race_stats[name].completed < count and time.monotonic() < deadline:
+        time.sleep(0.01)
+
+
+@pytest.fixture
+def stand_in():
+    server = StandIn()
+    yield server
+    server.close()
+
+
+def _racer(stand_in, local: STTBackend, **kwargs) -> RacingSTTBackend:
+    google = GoogleSTTBackend(endpoint=stand_in.url, hedge=False)
+    return RacingSTTBackend(backends={"google": google, "local": local}, **kwargs)
+
+
+def test_first_confident_answer_wins_and_counts_win_rate(stand_in):
+    stand_in.delays[1] = 1.0
+    racer = _racer(stand_in, StubBackend("локально", 0.8, delay=0.3))
+    assert racer.recognize_with_confidence(_phrase()) == ("ответ 0", pytest.approx(0.9))
+    _wait_completed(racer, "local", 1)
+    assert racer.recognize_with_confidence(_phrase()) == ("локально", 0.8)
+
+    snapshot = racer.snapshot()
+    assert snapshot["races"] == 2 and snapshot["no_confident_winner"] == 0
+    assert snapshot["backends"]["google"]["win_rate"] == 0.5
+    assert snapshot["backends"]["local"]["win_rate"] == 0.5
+    assert snapshot["backends"]["local"]["avg_latency_ms"] >= 300
+
+
+def test_low_confidence_answer_waits_for_a_confident_one(stand_in):
+    stand_in.confidences[0] = 0.3
+    racer = _racer(stand_in, StubBackend("локально", 0.7, delay=0.2), min_confidence=0.5)
+    assert racer.recognize_with_confidence(_phrase()) == ("локально", 0.7)
+    assert racer.race_stats["local"].wins == 1
+
+    stand_in.confidences[1] = 0.3
+    racer.min_confidence_by_backend["google"] = 0.2
+    _wait_completed(racer, "local", 1)
+    assert racer.recognize_with_confidence(_phrase()) == ("ответ 1", pytest.approx(0.3))
+
+
+def test_busy_loser_is_skipped_in_the_next_race(stand_in):
+    release = threading.Event()
+    local = StubBackend("локально", 0.9, release=release)
+    racer = _racer(stand_in, local)
+    try:
+        assert racer.recognize(_phrase()) == "ответ 0"
+        assert racer.recognize(_phrase()) == "ответ 1"
+        assert local.calls == 1
+        assert racer.race_stats["local"].skipped == 1
+        assert racer.snapshot()["backends"]["local"]["skipped"] == 1
+    finally:
+        release.set()
+
+
+def test_queued_loser_is_cancelled_when_every_backend_is_busy(stand_in):
+    stand_in.delays[0] = 0.5
+    release = threading.Event()
+    local = StubBackend("локально", 0.9, release=release)
+    racer = _racer(stand_in, local, deadline_s=0.2)
+    try:
+        # Никто не успел: оба бэкенда заняты, следующая фраза встаёт в их очереди
+        assert racer.recognize_with_confidence(_phrase()) == (None, None)
+        racer.deadline_s = 2.0
+        assert racer.recognize(_phrase()) == "ответ 1"
+        assert racer.race_stats["local"].cancelled == 1
+        assert racer.race_stats["local"].skipped == 0
+        assert local.calls == 1
+    finally:
+        release.set()
+
+
+def test_no_confident_winner_falls_back_to_most_confident_text(stand_in):
+    stand_in.confidences[0] = 0.3
+    racer = _racer(stand_in, StubBackend("локально", 0.4), min_confidence=0.5)
+    assert racer.recognize_with_confidence(_phrase()) == ("локально", 0.4)
+    assert racer.no_winner == 1
+    assert racer.race_stats["local"].wins == 1
+
+    empty = RacingSTTBackend(backends={"local": StubBackend(None, None)})
+    assert empty.recognize_with_confidence(_phrase()) == (None, None)
+    assert empty.no_winner == 1
+    assert empty.race_stats["local"].wins == 0
@@ -0,0 +1,97 @@
+import os
+
+import numpy as np
+
+from jarvis.core.audio import TARGET_RATE, AudioFrame
+from jarvis.core.stt_executor import STTExecutor
+
+CRASH = 12345  # Первый отсчёт фразы, на которой воркер падает
+
+
+class EchoBackend:
+    """Бэкенд-заглушка: возвращает длину фразы и признак segmented; на метке CRASH процесс умирает"""
+
+    def __init__(self, **kwargs) -> None:
+        pass
+
+    def recognize(self, audio: AudioFrame) -> str:
+        if int(audio.samples[0]) == CRASH:
+            os._exit(1)
+        return f"{len(audio.samples)}:{audio.segmented}"
+
+
+class BrokenBackend:
+    def __init__(self, **kwargs) -> None:
+        raise RuntimeError("model not found")
+
+
+def _frame(n: int, first: int = 1, segmented: bool = False) -> AudioFrame:
+    samples = np.ones(n, dtype=np.int16)
+    samples[0] = first
+    return AudioFrame(samples.tobytes(), TARGET_RATE, 2, segmented=segmented)
+
+
+def test_passes_segmented_flag_to_worker():
+    executor = STTExecutor(EchoBackend, workers=1, max_audio_s=1.0)
+    try:
+        assert executor.wait_ready(timeout=30)
+        assert executor.submit(_frame(160)).result(timeout=30) == "160:False"
+        assert executor.submit(_frame(320, segmented=True)).result(timeout=30) == "320:True"
+    finally:
+        executor.shutdown()
+
+
+def test_dead_worker_fails_its_futures_while_others_keep_working():
+    executor = STTExecutor(EchoBackend, workers=2, max_audio_s=1.0)
+    try:
+        assert executor.wait_ready(timeout=30)
+        lost = executor.submit(_frame(160, first=CRASH))
+        assert lost.result(timeout=30) is None
+        assert lost.error == "worker died"
+        # Оставшийся воркер продолжает распознавать
+        assert executor.submit(_frame(160)).result(timeout=30) == "160:False"
+        snapshot = executor.snapshot()
+        assert snapshot["lost"] == 1
+        assert sorted(w["alive"] for w in snapshot["per_worker"]) == [False, True]
+    finally:
+        executor.shutdown()
+
+
+def test_wait_ready_is_false_when_no_worker_loads():
+    executor = STTExecutor(BrokenBackend, workers=2, max_audio_s=1.0)
+    try:
+        assert not executor.wait_ready(timeout=30)
+        assert executor.submit(_frame(160)).result(timeout=30) is None
+    finally:
+        executor.shutdown()
+
+
+def test_unstarted_phrase_of_dead_worker_goes_to_another_worker():
+    executor = STTExecutor(EchoBackend, workers=2, max_audio_s=1.0)
+    try:
+        assert executor.wait_ready(timeout=30)
+        # Воркер 0 умирает простаивая: пул узнаёт об этом не сразу и успевает отдать ему фразу
+        executor._processes[0].kill()
+        executor._processes[0].join(timeout=5)
+        future = executor.submit(_frame(160))
+        assert future.result(timeout=5) == "160:False"
+        assert future.worker_id == 1
+        assert executor.lost == 0
+    finally:
+        executor.shutdown()
+
+
+def test_pool_closes_when_every_worker_dies():
+    executor = STTExecutor(EchoBackend, workers=1, max_audio_s=1.0)
+    try:
+        assert executor.wait_ready(timeout=30)
+        assert not executor.closed
+        crashed = executor.submit(_frame(160, first=CRASH))
+        queued = executor.submit(_frame(160))
+        assert crashed.result(timeout=30) is None and crashed.lost
+        assert queued.result(timeout=30) is None and queued.lost
+        assert executor.closed
+        late = executor.submit(_frame(160))
+        assert late.result(timeout=1) is None and late.lost
+    finally:
+        executor.shutdown()
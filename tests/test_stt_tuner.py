@@ -0,0 +1,104 @@
+import time
+import wave
+
+import numpy as np
+import pytest
+
+from jarvis.core.audio import TARGET_RATE
+from jarvis.core.stt_tuner import STTTuner, default_threads, word_error_rate
+
+
+@pytest.mark.parametrize(
+    "reference, hypothesis, expected",
+    [
+        ("открой браузер", "открой браузер", 0.0),
+        ("Открой, браузер!", "открой браузер", 0.0),
+        ("ёлка", "елка", 0.0),
+        ("открой браузер", "открой", 0.5),
+        ("открой браузер", "закрой браузер сейчас", 1.0),
+        ("", "", 0.0),
+        ("", "шум", 1.0),
+        ("открой браузер", None, 1.0),
+    ],
+)
+def test_word_error_rate(reference, hypothesis, expected):
+    assert word_error_rate(reference, hypothesis) == pytest.approx(expected)
+
+
+def test_default_threads():
+    assert default_threads(1) == [1]
+    assert default_threads(6) == [1, 2, 4, 6]
+    assert default_threads(8) == [1, 2, 4, 8]
+
+
+# Что «распознаёт» каждая модель по длительности файла (в десятых долях секунды)
+TRANSCRIPTS = {
+    "tiny": {10: "открой браузер", 15: "закрой окно"},
+    "small": {10: "открой браузер", 15: "открой ютуб"},  # Самая точная модель ошибается на втором файле
+}
+
+
+class FakeWhisper:
+    def __init__(self, model_size: str, **kwargs) -> None:
+        self.model_size = model_size
+
+    def _get_model(self):
+        return self
+
+    def recognize(self, audio):
+        return TRANSCRIPTS[self.model_size][round(audio.duration_s * 10)]
+
+
+def _write(path, seconds: float) -> None:
+    with wave.open(str(path), "wb") as wav:
+        wav.setnchannels(1)
+        wav.setsampwidth(2)
+        wav.setframerate(TARGET_RATE)
+        wav.writeframes(np.zeros(int(seconds * TARGET_RATE), dtype=np.int16).tobytes())
+
+
+def test_reference_config_is_scored_against_real_references(tmp_path):
+    _write(tmp_path / "a.wav", 1.0)  # Без эталона: эталон — вывод самой точной конфигурации
+    _write(tmp_path / "b.wav", 1.5)
+    (tmp_path / "b.txt").write_text("закрой окно", encoding="utf-8")
+    tuner = STTTuner(
+        FakeWhisper, models=("tiny", "small"), compute_types=("int8",), threads=(1, 2), beam_sizes=(5,),
+        num_workers=(1, 2), floor=0.9,
+    )
+    best = tuner.tune(tmp_path)
+    by_label = {r.candidate.label: r for r in tuner.results}
+    # Эталонная конфигурация не проходит порог только потому, что её вывод был эталоном
+    assert by_label["small/int8/t2/b5"].accuracy == pytest.approx(0.5)
+    assert best.candidate.model_size == "tiny"
+    # Этап 2 перебирает num_workers, не превышая числа ядер на все декодирования
+    assert "tiny/int8/t1/b5/w2" in by_label
+    assert "tiny/int8/t2/b5/w2" not in by_label
+    assert not any(label.startswith("small") and label != "small/int8/t2/b5" for label in by_label)
+
+
+class SleepyWhisper(FakeWhisper):
+    """Фраза декодируется тем дольше, чем меньше потоков у одного декодирования"""
+
+    def __init__(self, model_size: str, cpu_threads: int = 1, **kwargs) -> None:
+        super().__init__(model_size)
+        self.cpu_threads = cpu_threads
+
+    def recognize(self, audio):
+        time.sleep(0.04 / self.cpu_threads)
+        return super().recognize(audio)
+
+
+def test_candidates_are_ranked_by_per_utterance_latency(tmp_path):
+    for i in range(4):
+        _write(tmp_path / f"{i}.wav", 1.0)
+        (tmp_path / f"{i}.txt").write_text("открой браузер", encoding="utf-8")
+    tuner = STTTuner(
+        SleepyWhisper, models=("tiny",), compute_types=("int8",), threads=(1, 2), beam_sizes=(5,),
+        num_workers=(1, 2), floor=0.9,
+    )
+    best = tuner.tune(tmp_path)
+    by_label = {r.candidate.label: r for r in tuner.results}
+    # Два декодирования по потоку вдвое выгоднее по пропускной способности, но каждая фраза вдвое дольше
+    assert best.candidate.label == "tiny/int8/t2/b5"
+    assert by_label["tiny/int8/t1/b5/w2"].avg_ms > best.avg_ms * 1.5
+    assert by_label["tiny/int8/t1/b5/w2"].realtime_factor > by_label["tiny/int8/t1/b5"].realtime_factor
@@ -0,0 +1,92 @@
+import numpy as np
+
+from jarvis.core.vad import NoiseFloorTracker, StreamingVAD, frame_energy_zcr
+
+
+def _energies(pattern):
+    """RMS и ZCR кадров по шаблону: 's' — речь, '.' — тишина, 'h' — шипение (громко, но высокий ZCR)"""
+    rms = np.array([{"s": 1000.0, ".": 10.0, "h": 150.0}[c] for c in pattern], dtype=np.float32)
+    zcr = np.array([{"s": 0.1, ".": 0.5, "h": 0.8}[c] for c in pattern], dtype=np.float32)
+    return rms, zcr
+
+
+def _events(vad, pattern, threshold=100.0):
+    _, events = vad.process_energy(*_energies(pattern), threshold)
+    return [(e.kind, e.frame_offset) for e in events]
+
+
+def test_utterance_ends_after_hangover():
+    vad = StreamingVAD(frame_ms=10, hangover_ms=50, min_speech_ms=30)
+    assert _events(vad, "..sssss.......") == [("start", 2), ("end", 11)]
+
+
+def test_short_burst_is_discarded():
+    vad = StreamingVAD(frame_ms=10, hangover_ms=50, min_speech_ms=30)
+    assert _events(vad, ".ss.....") == [("start", 1), ("discard", 7)]
+
+
+def test_short_pause_does_not_split_utterance():
+    vad = StreamingVAD(frame_ms=10, hangover_ms=50, min_speech_ms=30)
+    assert _events(vad, "sss...sss.....") == [("start", 0), ("end", 13)]
+
+
+def test_hiss_is_not_speech():
+    vad = StreamingVAD(frame_ms=10, hangover_ms=50, min_speech_ms=30)
+    assert _events(vad, "hhhhhhhhhh") == []
+
+
+def test_long_utterance_is_truncated_and_state_carries_across_blocks():
+    vad = StreamingVAD(frame_ms=10, hangover_ms=50, min_speech_ms=30, max_utterance_s=0.1)
+    assert _events(vad, "sssss") == [("start", 0)]
+    _, events = vad.process_energy(*_energies("sssss"), 100.0)
+    assert [(e.kind, e.frame_offset, e.truncated) for e in events] == [("end", 4, True)]
+
+
+def test_frame_energy_zcr():
+    frames = np.array([[1000, -1000, 1000, -1000], [0, 0, 0, 0]], dtype=np.int16)
+    rms, zcr = frame_energy_zcr(frames)
+    np.testing.assert_allclose(rms, [1000.0, 0.0])
+    np.testing.assert_allclose(zcr, [1.0, 0.0])
+
+
+def _walk(tracker, rms):
+    """Покадровый проход, который заменило векторное обновление"""
+    levels = 20.0 * np.log10(np.asarray(rms, dtype=np.float64) + 1.0)
+    up, down = tracker.step_db * tracker.percentile, tracker.step_db * (1.0 - tracker.percentile)
+    floor = tracker.floor_db
+    for level in levels:
+        floor += up if level > floor else -down
+    return floor
+
+
+def test_vectorised_floor_follows_frame_by_frame_walk():
+    rng = np.random.default_rng(0)
+    tracker = NoiseFloorTracker()
+    tracker.update(np.full(16, 50.0))
+    for level in (50.0, 50.0, 200.0, 200.0, 200.0, 20.0, 20.0):
+        block = level * rng.uniform(0.5, 1.5, 32)
+        expected = _walk(tracker, block)
+        tracker.update(block)
+        assert abs(tracker.floor_db - expected) < 3.0
+
+
+def test_floor_does_not_overshoot_quiet_block():
+    tracker = NoiseFloorTracker()
+    tracker.update(np.full(4, 1000.0))
+    tracker.update(np.full(64, 100.0))
+    assert tracker.floor_db >= 20.0 * np.log10(101.0) - 0.5
+
+
+def test_floor_barely_rises_during_long_utterance():
+    tracker = NoiseFloorTracker()
+    vad = StreamingVAD(frame_ms=30, hangover_ms=300, max_utterance_s=60.0, noise_floor=tracker)
+    silence = np.stack([np.full(480, 10, dtype=np.int16), np.full(480, -10, dtype=np.int16)] * 16)
+    vad.process(silence)
+    start_db = tracker.floor_db
+    t = np.arange(480) / 16000.0
+    speech = np.tile((3000 * np.sin(2 * np.pi * 200 * t)).astype(np.int16), (32, 1))
+    for _ in range(10):  # ~10 с речи без пауз
+        is_speech, _ = vad.process(speech)
+        assert is_speech.all()
+    assert vad.in_speech
+    assert tracker.floor_db - start_db < 5.0
@@ -0,0 +1,46 @@
+import pytest
+
+from jarvis.core.wake_word import command_after, extract_command, find_wake_word, has_wake_word, phonetic_key
+
+
+@pytest.mark.parametrize(
+    "text, wake_text",
+    [
+        ("Джарвис, открой браузер", "Джарвис"),
+        ("джервис открой браузер", "джервис"),
+        ("Jarvis открой браузер", "Jarvis"),
+        ("жарвис открой браузер", "жарвис"),
+        ("джарвиз открой браузер", "джарвиз"),
+        ("джар вис открой браузер", "джар вис"),
+        ("позови джарвиса", "джарвиса"),
+        ("спасибо джарвису", "джарвису"),
+    ],
+)
+def test_finds_wake_word_variants(text, wake_text):
+    match = find_wake_word(text)
+    assert match is not None
+    assert text[match.start:match.end] == wake_text == match.text
+
+
+@pytest.mark.parametrize("text", ["", "открой браузер", "сервис не работает", "джинсы", "давай"])
+def test_ignores_other_words(text):
+    assert find_wake_word(text) is None
+    assert not has_wake_word(text)
+
+
+def test_exact_match_costs_no_edits():
+    assert find_wake_word("джарвис").edits == 0
+    assert find_wake_word("джервис").edits == 1
+
+
+def test_command_after_span():
+    text = "Джервис, открой браузер!"
+    match = find_wake_word(text)
+    assert command_after(text, match) == "открой браузер"
+    assert extract_command("джарвис") is None
+    assert extract_command("Джарвис — открой ютуб") == "открой ютуб"
+    assert extract_command("открой ютуб") is None
+
+
+def test_phonetic_key_merges_latin_and_cyrillic():
+    assert phonetic_key("jarvis") == phonetic_key("джарвис") == phonetic_key("джарвиз")